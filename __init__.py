@@ -1,5 +1,15 @@
 from CashFlow.src import Amortization
-from CashFlow.src import CashFlow_ExtMod
 from CashFlow.src import CashFlows
 from CashFlow.src import CashFlowUser
 from CashFlow.src import main as CashFlow
+
+def __getattr__(name):
+  """
+    Imports the RAVEN plugin module only when it's used, since it needs RAVEN
+    @ In, name, str, attribute of this package
+    @ Out, attribute, module, CashFlow_ExtMod
+  """
+  if name == 'CashFlow_ExtMod':
+    from CashFlow.src import CashFlow_ExtMod
+    return CashFlow_ExtMod
+  raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
@@ -0,0 +1,30 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Performance benchmarks for the TEAL evaluation pipeline.
+
+Synthetic portfolios (see portfolios) are scaled in number of components, cash flows per component,
+component lifetimes (including combinations whose least common multiple makes for long projects) and
+number of samples. Each stage of the pipeline is timed and its peak memory measured (see stages):
+reading the XML input, creating the evaluation sequence, compiling the evaluation plan, the lifetime
+and project cash flows, the FCFF, the economic indicators and the NPV search.
+
+Run from the TEAL directory (with RAVEN's framework importable, as for the tests):
+  python -m benchmarks                   # all scenarios
+  python -m benchmarks --quick           # a smaller set of scenarios
+  python -m benchmarks --save            # also store the results as the local baseline
+  python -m benchmarks --compare         # compare against the local baseline, fail on regressions
+Baselines are JSON files (by default in benchmarks/baselines/, which is not tracked), since timings
+only compare on the same machine.
+"""
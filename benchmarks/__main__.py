@@ -0,0 +1,114 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Runs the TEAL benchmarks, see the package description
+"""
+import os
+import sys
+import json
+import fnmatch
+import argparse
+import platform
+
+import numpy as np
+
+from . import portfolios
+from . import stages
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', 'baseline.json')
+
+def report(name, description, measured):
+  """
+    Prints the measurements of a scenario
+    @ In, name, str, scenario name
+    @ In, description, dict, scenario parameters
+    @ In, measured, dict, stage name: {'seconds': float, 'peakBytes': int}
+    @ Out, None
+  """
+  print('{} {}'.format(name, description))
+  for stage, values in measured.items():
+    print('  {:<24s} {:12.6f} s {:12.3f} MiB'.format(stage, values['seconds'], values['peakBytes'] / 2.0**20))
+
+def compare(results, baseline, tolerance, minSeconds):
+  """
+    Compares measurements against a baseline
+    @ In, results, dict, scenario name: {'stages': {stage name: measurements}}
+    @ In, baseline, dict, the same, from an earlier run
+    @ In, tolerance, float, allowed relative increase in time or memory
+    @ In, minSeconds, float, time differences below this are not considered (noise)
+    @ Out, regressions, list, descriptions of the regressions found
+  """
+  regressions = []
+  for name, result in results.items():
+    previous = baseline.get('scenarios', {}).get(name)
+    if previous is None:
+      continue
+    for stage, values in result['stages'].items():
+      old = previous['stages'].get(stage)
+      if old is None:
+        continue
+      seconds, oldSeconds = values['seconds'], old['seconds']
+      if seconds > oldSeconds * (1.0 + tolerance) and seconds - oldSeconds > minSeconds:
+        regressions.append('{} {}: {:.6f} s, was {:.6f} s'.format(name, stage, seconds, oldSeconds))
+      memory, oldMemory = values['peakBytes'], old['peakBytes']
+      if memory > oldMemory * (1.0 + tolerance) and memory - oldMemory > 2**20:
+        regressions.append('{} {}: {:.3f} MiB, was {:.3f} MiB'.format(name, stage, memory / 2.0**20, oldMemory / 2.0**20))
+  return regressions
+
+def main():
+  """
+    Runs the benchmarks from the command line
+    @ In, None
+    @ Out, status, int, exit status (1 if regressions were found)
+  """
+  parser = argparse.ArgumentParser(description='Benchmarks of the TEAL evaluation pipeline')
+  parser.add_argument('--quick', action='store_true', help='Only run a smaller set of scenarios')
+  parser.add_argument('--scenario', default='*', help='Only run the scenarios matching this pattern', metavar='pattern')
+  parser.add_argument('--repeat', type=int, default=3, help='Timed calls per stage (the shortest is kept)')
+  parser.add_argument('--save', nargs='?', const=DEFAULT_BASELINE, help='Store the results as baseline', metavar='baseline')
+  parser.add_argument('--compare', nargs='?', const=DEFAULT_BASELINE, help='Compare against a baseline', metavar='baseline')
+  parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed relative increase over the baseline')
+  parser.add_argument('--min-seconds', type=float, default=1e-3, help='Smallest time increase considered a regression')
+  args = parser.parse_args()
+
+  results = {}
+  for scenario in portfolios.scenarios(quick=args.quick):
+    if not fnmatch.fnmatch(scenario.name, args.scenario):
+      continue
+    measured = stages.runScenario(scenario, repeat=args.repeat)
+    report(scenario.name, scenario.describe(), measured)
+    results[scenario.name] = {'description': scenario.describe(), 'stages': measured}
+
+  status = 0
+  if args.compare:
+    with open(args.compare, 'r') as f:
+      baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance, args.min_seconds)
+    for regression in regressions:
+      print('REGRESSION: {}'.format(regression))
+    if regressions:
+      status = 1
+    else:
+      print('No regressions against {}'.format(args.compare))
+  if args.save:
+    os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+    baseline = {'python': platform.python_version(), 'numpy': np.__version__, 'machine': platform.node(),
+                'scenarios': results}
+    with open(args.save, 'w') as f:
+      json.dump(baseline, f, indent=2)
+    print('Baseline stored in {}'.format(args.save))
+  return status
+
+if __name__ == '__main__':
+  sys.exit(main())
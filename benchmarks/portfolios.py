@@ -0,0 +1,158 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Synthetic portfolios for the TEAL benchmarks
+
+Each component has a capital expenditure (amortized by MACRS, except for the first cash flow of
+every other component) and recurring revenues, all driven by sampled variables.
+"""
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+INDICATORS = ['NPV', 'IRR', 'PI', 'NPV_search']
+
+class Scenario:
+  """
+    Description of one synthetic portfolio and its samples
+  """
+  def __init__(self, name, numComponents, cashflowsPerComponent, lifetimes, numSamples, projectTime=None):
+    """
+      Constructor.
+      @ In, name, str, scenario name
+      @ In, numComponents, int, number of components
+      @ In, cashflowsPerComponent, int, cash flows per component (alternating capex and recurring, at least 2)
+      @ In, lifetimes, list, component lifetimes, assigned to the components in turn
+      @ In, numSamples, int, number of samples evaluated at once (1 for a single run)
+      @ In, projectTime, int, optional, project years (least common multiple of the lifetimes if None)
+      @ Out, None
+    """
+    self.name = name
+    self.numComponents = numComponents
+    self.cashflowsPerComponent = max(2, cashflowsPerComponent)
+    self.lifetimes = list(lifetimes)
+    self.numSamples = numSamples
+    self.projectTime = projectTime
+
+  def describe(self):
+    """
+      Describes the scenario for reports and baselines
+      @ In, None
+      @ Out, description, dict, scenario parameters
+    """
+    return {'components': self.numComponents,
+            'cashflowsPerComponent': self.cashflowsPerComponent,
+            'lifetimes': self.lifetimes,
+            'samples': self.numSamples,
+            'projectTime': self.projectTime}
+
+  def lifetime(self, c):
+    """
+      Gets the lifetime of a component
+      @ In, c, int, component index
+      @ Out, lifetime, int, component lifetime
+    """
+    return self.lifetimes[c % len(self.lifetimes)]
+
+  def cashflowNames(self, c):
+    """
+      Gets the cash flows of a component
+      @ In, c, int, component index
+      @ Out, cashflows, list, (name, type, driver variable) of each cash flow
+    """
+    cashflows = []
+    for f in range(self.cashflowsPerComponent):
+      typ = 'Capex' if f % 2 == 0 else 'Recurring'
+      cashflows.append(('{}{}'.format('CA' if typ == 'Capex' else 'RE', f // 2), typ, 'C{}_{}_driver{}'.format(c, typ, f // 2)))
+    return cashflows
+
+  def buildXml(self):
+    """
+      Builds the TEAL input of the portfolio
+      @ In, None
+      @ Out, root, xml.etree.ElementTree.Element, root node holding the <Economics> node, as read by main.readFromXml
+    """
+    root = ET.Element('ROOT')
+    econ = ET.SubElement(root, 'Economics')
+    glob = ET.SubElement(econ, 'Global')
+    ET.SubElement(glob, 'DiscountRate').text = '0.08'
+    ET.SubElement(glob, 'tax').text = '0.21'
+    ET.SubElement(glob, 'inflation').text = '0.02'
+    if self.projectTime is not None:
+      ET.SubElement(glob, 'ProjectTime').text = str(self.projectTime)
+    active = []
+    for c in range(self.numComponents):
+      comp = ET.SubElement(econ, 'Component', name='C{}'.format(c))
+      ET.SubElement(comp, 'Life_time').text = str(self.lifetime(c))
+      cashflows = ET.SubElement(comp, 'CashFlows')
+      for name, typ, driver in self.cashflowNames(c):
+        active.append('C{}|{}'.format(c, name))
+        if typ == 'Capex':
+          cf = ET.SubElement(cashflows, 'Capex', name=name, tax='false', inflation='none', mult_target='false')
+          ET.SubElement(cf, 'driver').text = driver
+          ET.SubElement(cf, 'alpha').text = '-1000000'
+          ET.SubElement(cf, 'reference').text = '100.0'
+          ET.SubElement(cf, 'X').text = '0.8'
+          if name == 'CA0' and c % 2 == 0:
+            ET.SubElement(cf, 'depreciation', scheme='MACRS').text = '5'
+        else:
+          cf = ET.SubElement(cashflows, 'Recurring', name=name, tax='true', inflation='real', mult_target='true')
+          ET.SubElement(cf, 'driver').text = driver
+          ET.SubElement(cf, 'alpha').text = '1.0'
+    indicator = ET.SubElement(glob, 'Indicator', name=','.join(INDICATORS), target='0')
+    indicator.text = ' '.join(active)
+    return root
+
+  def sampleVariables(self, seed=42):
+    """
+      Samples the driver variables of the portfolio
+      @ In, seed, int, optional, random seed
+      @ Out, variables, dict, variables stacked by sample (one value per variable if a single sample)
+    """
+    rng = np.random.RandomState(seed)
+    variables = {}
+    for c in range(self.numComponents):
+      for _, typ, driver in self.cashflowNames(c):
+        if typ == 'Capex':
+          value = 100.0 * rng.uniform(0.8, 1.2, self.numSamples)
+        else:
+          # yearly revenue (zero in the construction year), enough to pay back the capex
+          value = 1.5e5 * rng.uniform(0.8, 1.2, (self.numSamples, self.lifetime(c) + 1))
+          value[:, 0] = 0.0
+        variables[driver] = value[0] if self.numSamples == 1 else value
+    return variables
+
+def scenarios(quick=False):
+  """
+    Gets the benchmark scenarios
+    @ In, quick, bool, optional, if True then only a smaller set
+    @ Out, scenarios, list, Scenario instances
+  """
+  if quick:
+    return [Scenario('components_10', 10, 2, [30], 1, projectTime=30),
+            Scenario('cashflows_8', 10, 8, [30], 1, projectTime=30),
+            Scenario('lifetimes_lcm', 6, 2, [20, 30, 40], 1),
+            Scenario('samples_100', 10, 2, [30], 100, projectTime=30)]
+  found = []
+  for numComponents in [1, 10, 100, 1000]:
+    found.append(Scenario('components_{}'.format(numComponents), numComponents, 2, [30], 1, projectTime=30))
+  for cashflows in [4, 16]:
+    found.append(Scenario('cashflows_{}'.format(cashflows), 10, cashflows, [30], 1, projectTime=30))
+  # without a project time, the project lasts as long as the least common multiple of the lifetimes
+  found.append(Scenario('lifetimes_lcm', 6, 2, [20, 30, 40], 1))
+  found.append(Scenario('lifetimes_lcm_exploding', 6, 2, [7, 11, 13], 1))
+  for numSamples in [100, 10000]:
+    found.append(Scenario('samples_{}'.format(numSamples), 10, 2, [30], numSamples, projectTime=30))
+  found.append(Scenario('samples_1000_components_100', 100, 2, [20, 30, 40], 1000))
+  return found
@@ -0,0 +1,101 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Timing and memory measurement of the stages of the TEAL evaluation pipeline
+"""
+import os
+import sys
+import time
+import tracemalloc
+from collections import OrderedDict, defaultdict
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import main
+
+def measure(func, repeat):
+  """
+    Times a function (best of several calls), then measures the peak memory it allocates in one more call
+    @ In, func, callable, function without arguments
+    @ In, repeat, int, number of timed calls
+    @ Out, result, object, what the function returns
+    @ Out, seconds, float, shortest time of a call
+    @ Out, peakBytes, int, peak memory allocated during a call
+  """
+  seconds = float('inf')
+  for _ in range(repeat):
+    start = time.perf_counter()
+    result = func()
+    seconds = min(seconds, time.perf_counter() - start)
+  # measured apart, since tracing slows the calls down
+  tracemalloc.start()
+  try:
+    func()
+    peakBytes = tracemalloc.get_traced_memory()[1]
+  finally:
+    tracemalloc.stop()
+  return result, seconds, peakBytes
+
+def runScenario(scenario, repeat=3):
+  """
+    Measures each stage of the pipeline for a scenario
+    @ In, scenario, portfolios.Scenario, scenario to evaluate
+    @ In, repeat, int, optional, number of timed calls per stage
+    @ Out, stages, OrderedDict, stage name: {'seconds': float, 'peakBytes': int}
+  """
+  stages = OrderedDict()
+  def record(name, func):
+    """
+      Measures a stage and records the measurement
+      @ In, name, str, stage name
+      @ In, func, callable, stage, without arguments
+      @ Out, result, object, what the stage returns
+    """
+    result, seconds, peakBytes = measure(func, repeat)
+    stages[name] = {'seconds': seconds, 'peakBytes': peakBytes}
+    return result
+
+  root = scenario.buildXml()
+  variables = scenario.sampleVariables()
+  settings, components = record('readFromXml', lambda: main.readFromXml(root))
+  main.checkRunSettings(settings, components)
+  # the evaluation sequence only checks the variables of one sample
+  single = variables if scenario.numSamples == 1 else dict((k, v[0]) for k, v in variables.items())
+  record('checkDrivers', lambda: main.checkDrivers(settings, components, single))
+  plan = record('compilePlan', lambda: main.compilePlan(settings, components))
+  if scenario.numSamples > 1:
+    variables = main.stackSamples(variables)[0]
+  def lifetimes():
+    """
+      Computes the lifetime cash flows, as in main.run (without reusing any)
+      @ In, None
+      @ Out, lifetimeCashflows, dict, component: cashflow: lifetime cash flow
+    """
+    lifetimeCashflows = defaultdict(dict)
+    for comp, cf in plan.ordered:
+      lifetimeCashflows[comp.name][cf.name] = main.componentLifeCashflow(comp, cf, variables, lifetimeCashflows)
+    return lifetimeCashflows
+  lifetimeCashflows = record('componentLifeCashflow', lifetimes)
+  projectLength = plan.projectLength
+  # the plan only keeps project cash flows for reuse when the lifetime ones come from its own memo, so none are reused here
+  projectCashflows = record('projectLifeCashflows',
+                            lambda: main.projectLifeCashflows(settings, components, lifetimeCashflows, projectLength, plan=plan))
+  rate = settings.getDiscountRate()
+  record('FCFF', lambda: main.FCFF(components, projectCashflows, projectLength))
+  record('NPV', lambda: main.NPV(components, projectCashflows, projectLength, rate))
+  record('IRR', lambda: main.IRR(components, projectCashflows, projectLength))
+  record('PI', lambda: main.PI(components, projectCashflows, projectLength, rate))
+  record('npvSearch', lambda: main.npvSearch(settings, components, projectCashflows, projectLength))
+  stages['total'] = {'seconds': sum(stage['seconds'] for stage in stages.values()),
+                     'peakBytes': max(stage['peakBytes'] for stage in stages.values())}
+  return stages
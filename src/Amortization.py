@@ -16,8 +16,14 @@
 
 This module contains the Ammortization schemes used by TEAL.CashFlow plugin module
 """
+import logging
+import functools
+
 import numpy as np
 
+logger = logging.getLogger('TEAL.Amortization')
+logger.addHandler(logging.NullHandler())
+
 MACRS = { 20: 0.01 * np.array([3.750, 7.219, 6.677, 6.177, 5.713, 5.285, 4.888, 4.522, 4.462 , 4.461, 4.462, \
               4.461, 4.462, 4.461, 4.462, 4.461, 4.462, 4.461, 4.462, 4.461, 2.231]),
           15: 0.01 * np.array([5.0, 9.5, 8.55, 7.7, 6.93, 6.23, 5.9, 5.9, 5.91, 5.9, 5.91, 5.9, 5.91, 5.9, 5.91, 2.95]),
@@ -31,20 +37,44 @@ def amortize(scheme, plan, startValue, componentLife):
     return the amortization plan
     @ In, scheme, str, 'macrs' or 'custom'
     @ In, plan, list or array like, list of provided MACRS values
-    @ In, startValue, float, the given initial Capex value
+    @ In, startValue, float or np.array, the given initial Capex value, or one per sample
+    @ In, componentLife, int, the life of component
+    @ Out, alpha, numpy.array, array of alpha values for given scheme (samples x life for many initial values)
+  """
+  # one outer product for all the initial values
+  return np.multiply.outer(startValue, schedule(scheme, plan, componentLife))
+
+def schedule(scheme, plan, componentLife):
+  """
+    Gets the amortization fraction of each year of the component life (the plan for a unit initial value).
+    Shared between calls, so the returned array is read-only.
+    @ In, scheme, str, 'macrs' or 'custom'
+    @ In, plan, list or array like, list of provided MACRS values
+    @ In, componentLife, int, the life of component
+    @ Out, fractions, numpy.array, amortized fraction of the initial value in each year (life + 1)
+  """
+  return _schedule(scheme.lower(), tuple(float(p) for p in np.atleast_1d(plan)), int(componentLife))
+
+@functools.lru_cache(maxsize=128)
+def _schedule(scheme, plan, componentLife):
+  """
+    Creates the amortization schedule, see schedule
+    @ In, scheme, str, 'macrs' or 'custom', lower case
+    @ In, plan, tuple, provided MACRS values
     @ In, componentLife, int, the life of component
-    @ Out, alpha, numpy.array, array of alpha values for given scheme
+    @ Out, fractions, numpy.array, amortized fraction of the initial value in each year (life + 1), read-only
   """
-  alpha = np.zeros(componentLife + 1, dtype=float)
-  lscheme = scheme.lower()
-  if lscheme == 'macrs':
-    ys = plan[0]
+  fractions = np.zeros(componentLife + 1, dtype=float)
+  if scheme == 'macrs':
+    ys = int(plan[0])
     pcts = MACRS.get(ys, None)
     if pcts is None:
       raise IOError('Provided MACRS "{}" is not allowed.'.format(ys))
-    alpha[1:len(pcts)+1] = pcts * startValue
-  elif lscheme == 'custom':
-    alpha[1:len(plan)+1] = np.asarray(plan)/100. * startValue
+    fractions[1:len(pcts)+1] = pcts
+  elif scheme == 'custom':
+    fractions[1:len(plan)+1] = np.asarray(plan)/100.
   else:
     raise NotImplementedError('Amortization scheme "{}" not yet implemented.'.format(scheme))
-  return alpha
+  logger.debug('Amortization "%s" %s over %d years: %s', scheme, plan, componentLife, fractions)
+  fractions.setflags(write=False)
+  return fractions
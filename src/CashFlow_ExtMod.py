@@ -26,20 +26,23 @@ warnings.simplefilter('default', DeprecationWarning)
 # NOTE this import exception is ONLY to allow RAVEN to directly import this module.
 try:
   from TEAL.src import main
+  from TEAL.src import ParallelDriver
+  from TEAL.src import SampleIO
+  from TEAL.src import Profiling
+  from TEAL.src import Snapshot
+  from TEAL.src import Raven
 except ImportError:
   import main
+  import ParallelDriver
+  import SampleIO
+  import Profiling
+  import Snapshot
+  import Raven
 
-# This plugin imports RAVEN modules. if run in stand-alone, RAVEN needs to be installed and this file
-# needs to be in the propoer plugin directory.
-dirPath = os.path.dirname(os.path.realpath(__file__))
-# TODO fix with plugin relative path
-ravenPath = os.path.dirname(__file__) + '/../../../framework'
-sys.path.append(os.path.expanduser(ravenPath))
-
+# the plugin itself is a RAVEN class, so RAVEN is needed from here on (see Raven for where it's looked for)
 try:
-  from utils.graphStructure import graphObject
-  from PluginsBaseClasses.ExternalModelPluginBase import ExternalModelPluginBase
-except:
+  ExternalModelPluginBase = Raven.module('PluginsBaseClasses.ExternalModelPluginBase').ExternalModelPluginBase
+except ImportError:
   raise IOError("CashFlow ERROR (Initialisation): RAVEN needs to be installed and CashFlow needs to be in its plugin directory for the plugin to work!'")
 
 
@@ -59,9 +62,19 @@ class CashFlow(ExternalModelPluginBase):
       @ Out, None
     """
     # read in XML to global settings, component list
-    settings, components = main.readFromXml(xmlNode)
+    econ = xmlNode.find('Economics')
+    snapshot = econ.attrib.get('snapshot') if econ is not None else None
+    if snapshot is None:
+      settings, components = main.readFromXml(xmlNode)
+      plan = None
+    else:
+      # already checked and compiled, if the input didn't change since the snapshot was taken
+      settings, components, plan, key = Snapshot.readFromXml(xmlNode, snapshot)
+      snapshot = (snapshot, key)
     container._globalSettings = settings
     container._components = components
+    container._plan = plan
+    container._snapshot = snapshot
 
   # =====================================================================================================================
 
@@ -76,7 +89,15 @@ class CashFlow(ExternalModelPluginBase):
     """
     settings = container._globalSettings
     components = container._components
+    if getattr(container, '_plan', None) is not None:
+      # from a snapshot
+      return
     main.checkRunSettings(settings, components)
+    # the evaluation order, project length etc. are the same for every run, so only compile them once
+    container._plan = main.compilePlan(settings, components, v=settings._verbosity)
+    snapshot = getattr(container, '_snapshot', None)
+    if snapshot is not None:
+      Snapshot.save(snapshot[0], snapshot[1], settings, components, container._plan)
   # =====================================================================================================================
 
   # =====================================================================================================================
@@ -89,7 +110,12 @@ class CashFlow(ExternalModelPluginBase):
     """
     globalSettings = container._globalSettings
     components = container._components
-    metrics = main.run(globalSettings, components, Inputs)
+    profiler = getattr(container, '_profiler', None)
+    outputs = main.run(globalSettings, components, Inputs, plan=container._plan,
+                       profile=profiler if profiler is not None else False, returnPlan=True)
+    metrics = outputs[0]
+    # keep the plan recompiled for outdated settings or components, so the next runs reuse it
+    container._plan = outputs[-1]
     for k, v in metrics.items():
       setattr(container, k, v)
 
@@ -112,25 +138,35 @@ if __name__ == "__main__":
         @ Out, None
       """
       pass
-  import xml.etree.ElementTree as ET
   import argparse
   import csv
   # read and process input arguments
   # ================================
   inpPar = argparse.ArgumentParser(description = 'Run RAVEN CashFlow plugin as stand-alone code')
   inpPar.add_argument('-iXML', nargs=1, required=True, help='XML CashFlow input file name', metavar='inp_file')
-  inpPar.add_argument('-iINP', nargs=1, required=True, help='CashFlow input file name with the input variable list', metavar='inp_file')
+  inpVars = inpPar.add_mutually_exclusive_group(required=True)
+  inpVars.add_argument('-iINP', nargs=1, help='CashFlow input file name with the input variable list', metavar='inp_file')
+  inpVars.add_argument('-iSamples', nargs=1, help='Samples file: CSV with one sample per row (vector entries as name[i]), '+
+                       '.npz, directory of .npy files, .parquet or .h5 with one (samples x entries) array per variable', metavar='samples_file')
   inpPar.add_argument('-o', nargs=1, required=True, help='Output file name', metavar='out_file')
+  inpPar.add_argument('-j', nargs=1, type=int, default=[None], help='Number of worker processes for -iSamples (default: all cores)', metavar='workers')
+  inpPar.add_argument('-chunk', nargs=1, type=int, default=[256], help='Samples per worker task for -iSamples', metavar='size')
+  inpPar.add_argument('-details', action='store_true', help='For -iSamples, also write the yearly FCFF and project cash flows of each sample')
+  inpPar.add_argument('-snapshot', nargs=1, help='Snapshot file of the checked XML input, used instead of the XML input '+
+                      'if taken from the same file, otherwise (re)written', metavar='snapshot_file')
+  inpPar.add_argument('-profile', nargs=1, help='For -iINP, write the profiling report of the run as JSON, or as a Chrome trace '+
+                      'if the name ends with .trace.json', metavar='profile_file')
   inpOpt = inpPar.parse_args()
+  varFile = inpOpt.iINP[0] if inpOpt.iINP else inpOpt.iSamples[0]
 
   # check if files exist
   print ("CashFlow INFO (Run as Code): XML input file: %s" %inpOpt.iXML[0])
-  print ("CashFlow INFO (Run as Code): Variable input file: %s" %inpOpt.iINP[0])
+  print ("CashFlow INFO (Run as Code): Variable input file: %s" %varFile)
   print ("CashFlow INFO (Run as Code): Output file: %s" %inpOpt.o[0])
   if not os.path.exists(inpOpt.iXML[0]) :
     raise IOError('\033[91m' + "CashFlow INFO (Run as Code): : XML input file " + inpOpt.iXML[0] + " does not exist.. " + '\033[0m')
-  if not os.path.exists(inpOpt.iINP[0]) :
-    raise IOError('\033[91m' + "CashFlow INFO (Run as Code): : Variable input file " + inpOpt.iINP[0] + " does not exist.. " + '\033[0m')
+  if not os.path.exists(varFile) :
+    raise IOError('\033[91m' + "CashFlow INFO (Run as Code): : Variable input file " + varFile + " does not exist.. " + '\033[0m')
   if os.path.exists(inpOpt.o[0]) :
     print ("CashFlow WARNING (Run as Code): Output file %s already exists. Will be overwritten. " %inpOpt.o[0])
 
@@ -138,21 +174,33 @@ if __name__ == "__main__":
   # ================================
   # create a CashFlow class instance
   myCashFlow = CashFlow()
-  # read the XML input file inpOpt.iXML[0]
+  # read the XML input file inpOpt.iXML[0] (as it's parsed, instead of as a whole, as in _readMoreXML)
   myContainer = FakeSelf()
-  notroot = ET.parse(open(inpOpt.iXML[0], 'r')).getroot()
-  root = ET.Element('ROOT')
-  root.append(notroot)
-  myCashFlow._readMoreXML(myContainer, root)
+  if inpOpt.snapshot:
+    myContainer._globalSettings, myContainer._components, myContainer._plan, key = Snapshot.readFromFile(inpOpt.iXML[0], inpOpt.snapshot[0])
+    myContainer._snapshot = (inpOpt.snapshot[0], key)
+    if myContainer._plan is not None:
+      print("CashFlow INFO (Run as Code): XML input loaded from snapshot %s" %inpOpt.snapshot[0])
+  else:
+    myContainer._globalSettings, myContainer._components = main.readFromFile(inpOpt.iXML[0])
   myCashFlow.initialize(myContainer, {}, [])
   #if Myverbosity < 2:
   print("CashFlow INFO (Run as Code): XML input read ")
+  if inpOpt.iSamples:
+    # many samples: evaluate them in parallel, writing the results as they come
+    with SampleIO.readSamples(varFile) as samples:
+      print("CashFlow INFO (Run as Code): %d samples read " %ParallelDriver.countSamples(samples))
+      with SampleIO.openResultWriter(inpOpt.o[0]) as writer:
+        for results in ParallelDriver.runSamples(myContainer._globalSettings, myContainer._components, samples,
+                                                 workers=inpOpt.j[0], chunkSize=inpOpt.chunk[0], details=inpOpt.details):
+          if inpOpt.details:
+            writer.write(*results)
+          else:
+            writer.write(results)
+    print("CashFlow INFO (Run as Code): %d samples written to file" %writer.numSamples)
+    sys.exit(0)
   # read the values from input file into dictionary inpOpt.iINP[0]
-  myInputs = {}
-  with open(inpOpt.iINP[0]) as f:
-    for l in f:
-      (key, val) = l.split(' ', 1)
-      myInputs[key] = np.array([float(n) for n in val.split(",")])
+  myInputs = SampleIO.readVariables(inpOpt.iINP[0])
   #if Myverbosity < 2:
   print("CashFlow INFO (Run as Code): Variable input read ")
   #if Myverbosity < 1:
@@ -162,7 +210,16 @@ if __name__ == "__main__":
   # ================================
   #if Myverbosity < 2:
   print("CashFlow INFO (Run as Code): Running the code")
+  if inpOpt.profile:
+    myContainer._profiler = Profiling.Profiler()
   myCashFlow.run(myContainer, myInputs)
+  if inpOpt.profile:
+    report = myContainer._profiler.report()
+    if inpOpt.profile[0].endswith('.trace.json'):
+      Profiling.dumpChromeTrace(report, inpOpt.profile[0])
+    else:
+      Profiling.dumpJson(report, inpOpt.profile[0])
+    print("CashFlow INFO (Run as Code): Profiling report written to %s" %inpOpt.profile[0])
 
   # create output file
   # ================================
@@ -18,8 +18,8 @@ Defines the Economics entity.
 Each component (or source?) can have one of these to describe its economics.
 """
 from __future__ import unicode_literals, print_function
-import os
-import sys
+import logging
+import functools
 from collections import defaultdict
 import xml.etree.ElementTree as ET
 
@@ -29,19 +29,27 @@ import time
 # NOTE this import exception is ONLY to allow RAVEN to directly import this module.
 try:
   from TEAL.src import Amortization
+  from TEAL.src import Intrayear
+  from TEAL.src import Raven
+  from TEAL.src import TypeChecks
 except ImportError:
   import Amortization
-# TODO fix with plugin relative path
-path1 = os.path.dirname(__file__)
-path2 = '/../raven/framework'
-path3=os.path.abspath(os.path.expanduser(path1+'/..'+path2))
-path4=os.path.abspath(os.path.expanduser(path1+path2))
-path5=os.path.abspath(os.path.expanduser(path1+'/../../../framework'))
-sys.path.extend([path3,path4,path5])
+  import Intrayear
+  import Raven
+  import TypeChecks
 
-from utils import mathUtils as utils
-from utils import InputData, InputTypes, TreeStructure
+logger = logging.getLogger('TEAL.CashFlows')
+logger.addHandler(logging.NullHandler())
 
+@functools.lru_cache(maxsize=None)
+def cachedInputSpecs(cls):
+  """
+    Provides the input specifications of a class, only collecting them once. Building the specs takes much
+    longer than parsing a node with them, and they can be instantiated to parse any number of nodes.
+    @ In, cls, type, class with input specs (GlobalSettings or Component)
+    @ Out, specs, type, InputData.ParameterInput subclass
+  """
+  return cls.getInputSpecs()
 
 class GlobalSettings:
   """
@@ -57,6 +65,8 @@ class GlobalSettings:
       @ In, None
       @ Out, glob, InputData, specs
     """
+    InputData = Raven.module('utils.InputData')
+    InputTypes = Raven.module('utils.InputTypes')
     glob = InputData.parameterInputFactory('Global')
     glob.addSub(InputData.parameterInputFactory('DiscountRate', contentType=InputTypes.FloatType))
     glob.addSub(InputData.parameterInputFactory('tax', contentType=InputTypes.FloatType))
@@ -64,7 +74,7 @@ class GlobalSettings:
     glob.addSub(InputData.parameterInputFactory('ProjectTime', contentType=InputTypes.IntegerType))
     ind = InputData.parameterInputFactory('Indicator', contentType=InputTypes.StringListType)
     ind.addParam('name', param_type=InputTypes.StringListType, required=True)
-    ind.addParam('target', param_type=InputTypes.FloatType)
+    ind.addParam('target', param_type=InputTypes.FloatListType)
     glob.addSub(ind)
     return glob
 
@@ -93,8 +103,8 @@ class GlobalSettings:
       @ Out, None
     """
     # TODO make readInput call setParams so there's a uniform place to change things!
-    if isinstance(source, (ET.Element, TreeStructure.InputNode)):
-      specs = self.getInputSpecs()()
+    if isinstance(source, ET.Element) or isinstance(source, Raven.module('utils.TreeStructure').InputNode):
+      specs = cachedInputSpecs(type(self))()
       specs.parseNode(source)
     else:
       specs = source
@@ -112,6 +122,8 @@ class GlobalSettings:
       elif name == 'Indicator':
         self._indicators = node.parameterValues['name']
         self._metricTarget = node.parameterValues.get('target', None)
+        if self._metricTarget is not None:
+          self._metricTarget = np.atleast_1d(np.asarray(self._metricTarget, dtype=float))
         activeCf = val
         self._activeComponents = defaultdict(list)
         for request in activeCf:
@@ -140,6 +152,8 @@ class GlobalSettings:
       elif name == 'Indicator':
         self._indicators = val['name']
         self._metricTarget = val.get('target', None)
+        if self._metricTarget is not None:
+          self._metricTarget = np.atleast_1d(np.asarray(self._metricTarget, dtype=float))
         activeCf = val['active']
         self._activeComponents = defaultdict(list)
         for request in activeCf:
@@ -211,9 +225,9 @@ class GlobalSettings:
 
   def getMetricTarget(self):
     """
-      Get the metric target
+      Get the metric targets
       @ In, None
-      @ Out, self._metricTarget, float, the target metric
+      @ Out, self._metricTarget, np.array, the target metric values (one per requested NPV search)
     """
     return self._metricTarget
 
@@ -255,6 +269,8 @@ class Component:
       @ In, None
       @ Out, comp, InputData, specs
     """
+    InputData = Raven.module('utils.InputData')
+    InputTypes = Raven.module('utils.InputTypes')
     comp = InputData.parameterInputFactory('Component')
     comp.addParam('name', param_type=InputTypes.StringType, required=True)
     comp.addSub(InputData.parameterInputFactory('Life_time', contentType=InputTypes.IntegerType))
@@ -291,10 +307,10 @@ class Component:
       @ In, source, InputData.ParameterInput, input from user
       @ Out, None
     """
-    print(' ... loading economics ...')
+    logger.debug(' ... loading economics ...')
     # allow readInput argument to be either xml or input specs
-    if isinstance(source, (ET.Element, TreeStructure.InputNode)):
-      specs = self.getInputSpecs()()
+    if isinstance(source, ET.Element) or isinstance(source, Raven.module('utils.TreeStructure').InputNode):
+      specs = cachedInputSpecs(type(self))()
       specs.parseNode(source)
     else:
       specs = source
@@ -453,7 +469,7 @@ class Component:
     """
     created = []
     # get the type of this node, whether we're talking XML or RAVEN.InputData
-    if not isinstance(specs, InputData.ParameterInput):
+    if not isinstance(specs, Raven.module('utils.InputData').ParameterInput):
       raise TypeError('Unrecognized source specifications type: {}'.format(type(specs)))
     # create the appropriate cash flows
     typ = specs.getName()
@@ -486,10 +502,11 @@ class Component:
     amort = ocf.getAmortization()
     if amort is None:
       return []
-    print('DEBUGG amortizing cf:', ocf.name)
+    logger.debug('Amortizing cash flow "%s" of component "%s"', ocf.name, self.name)
     originalValue = ocf.getParam('alpha') * -1.0 #start with a positive value
     scheme, plan = amort
-    alpha = Amortization.amortize(scheme, plan, 1.0, self._lifetime)
+    # shared schedule (read-only), since the initial value comes in through the driver
+    alpha = Amortization.schedule(scheme, plan, self._lifetime)
     # first cash flow is POSITIVE on the balance sheet, is not taxed, and is a percent of the target
     pos = Amortizor(component=self.name, verbosity=self._verbosity)
     params = {'name': '{}_{}_{}'.format(self.name, 'amortize', ocf.name),
@@ -506,8 +523,8 @@ class Component:
     neg = Amortizor(component=self.name, verbosity=self._verbosity)
     nalpha = np.zeros(len(alpha))
     nalpha[alpha != 0] = -1
-    print('DEBUGG amort alpha:', alpha)
-    print('DEBUGG depre alpha:', nalpha)
+    logger.debug('Amortization alpha: %s', alpha)
+    logger.debug('Depreciation alpha: %s', nalpha)
     params = {'name': '{}_{}_{}'.format(self.name, 'depreciate', ocf.name),
               'driver': '{}|{}'.format(self.name, pos.name),
               'tax': True,
@@ -543,6 +560,8 @@ class CashFlow:
       @ Out, specs, InputData, specs
     """
     # ONLY appends to existinc specs!
+    InputData = Raven.module('utils.InputData')
+    InputTypes = Raven.module('utils.InputTypes')
     #cf = InputData.parameterInputFactory('CashFlow')
 
     specs.addParam('name', param_type=InputTypes.StringType, required=True)
@@ -588,7 +607,7 @@ class CashFlow:
       @ Out, None
     """
     self.name = item.parameterValues['name']
-    print(' ... ... loading cash flow "{}"'.format(self.name))
+    logger.debug(' ... ... loading cash flow "%s"', self.name)
     # driver and alpha are specific to cashflow types # self._driver = item.parameterValues['driver']
     for key, value in item.parameterValues.items():
       if key == 'tax':
@@ -605,9 +624,9 @@ class CashFlow:
       elif sub.getName() == 'driver':
         self._driver = self.setVariableOrFloats(sub.value)
       if sub.getName() == 'reference':
-        self._reference = sub.value
+        self._reference = self.setVariableOrFloats(sub.value)
       elif sub.getName() == 'X':
-        self._scale = sub.value
+        self._scale = self.setVariableOrFloats(sub.value)
     self.checkInitialization()
 
   def setParams(self, paramDict):
@@ -720,13 +739,13 @@ class CashFlow:
     if len(value) == 1:
       # single entry should be either a float (price) or string (raven variable)
       value = value[0]
-      if utils.isAString(value) or utils.isAFloatOrInt(value):
+      if TypeChecks.isAString(value) or TypeChecks.isAFloatOrInt(value):
         ret = value
       else:
         raise IOError('Unrecognized alpha/driver type: "{}" with type "{}"'.format(value, type(value)))
     else:
       # should be floats; InputData assures the entries are the same type already
-      if not utils.isAFloatOrInt(value[0]):
+      if not TypeChecks.isAFloatOrInt(value[0]):
         raise IOError('Multiple non-number entries for alpha/driver found, but require either a single variable name or multiple float entries: {}'.format(value))
       ret = np.asarray(value)
     return ret
@@ -742,7 +761,7 @@ class CashFlow:
     """
     # load variable values from variables or other cash flows, as needed (ha!)
     for name, source in need.items():
-      if utils.isAString(source):
+      if TypeChecks.isAString(source):
         # as a string, this is either from the variables or other cashflows
         # look in variables first
         value = variables.get(source, None)
@@ -768,6 +787,21 @@ class CashFlow:
     # should be overwritten in the inheriting classes!
     raise NotImplementedError
 
+  @staticmethod
+  def isPerSampleScalar(value):
+    """
+      Checks if a parameter holds a single number, either directly or as one entry per sample
+      (shape (1,) for a single sample, (samples, 1) for a batch of samples)
+      @ In, value, object, parameter value to check
+      @ Out, isPerSampleScalar, bool, True if value is a single number (per sample)
+    """
+    if value is None or TypeChecks.isAString(value):
+      return False
+    if TypeChecks.isAFloatOrInt(value):
+      return True
+    value = np.asarray(value)
+    return value.ndim > 0 and value.shape[-1] == 1 and np.issubdtype(value.dtype, np.number)
+
 
 class Capex(CashFlow):
   """
@@ -780,10 +814,13 @@ class Capex(CashFlow):
       @ In, specs, InputData, specs
       @ Out, specs, InputData, specs
     """
+    InputData = Raven.module('utils.InputData')
+    InputTypes = Raven.module('utils.InputTypes')
     specs = InputData.parameterInputFactory('Capex')
     specs = CashFlow.getInputSpecs(specs)
-    specs.addSub(InputData.parameterInputFactory('reference', contentType=InputTypes.FloatType))
-    specs.addSub(InputData.parameterInputFactory('X', contentType=InputTypes.FloatType))
+    # either a number or the name of a (sampled) variable
+    specs.addSub(InputData.parameterInputFactory('reference', contentType=InputTypes.InterpretedListType))
+    specs.addSub(InputData.parameterInputFactory('X', contentType=InputTypes.InterpretedListType))
     deprec = InputData.parameterInputFactory('depreciation', contentType=InputTypes.InterpretedListType)
     deprecSchemes = InputTypes.makeEnumType('deprec_types', 'deprec_types', ['MACRS', 'custom'])
     deprec.addParam('scheme', param_type=deprecSchemes, required=True)
@@ -830,6 +867,10 @@ class Capex(CashFlow):
       raise IOError(self.missingNodeTemplate.format(comp=self._component, cf=self.name, node='reference'))
     if self._scale is None:
       raise IOError(self.missingNodeTemplate.format(comp=self._component, cf=self.name, node='X'))
+    for node, value in [('reference', self._reference), ('X', self._scale)]:
+      if isinstance(value, np.ndarray) and value.size > 1:
+        raise IOError('Component "{comp}" CashFlow "{cf}" node <{node}> takes a single number or variable name, but got {value}!'
+                      .format(comp=self._component, cf=self.name, node=node, value=value))
     if self._driver is None:
       raise IOError(self.missingNodeTemplate.format(comp=self._component, cf=self.name, node='driver'))
     if self._alpha is None:
@@ -873,11 +914,13 @@ class Capex(CashFlow):
       @ Out, toExtend, dict, dict to extend
     """
     # for capex, both the Driver and Alpha are nonzero in year 1 and zero thereafter
+    ## the last axis is the lifetime axis; any leading axis is the sample axis of a batch
     for name, value in toExtend.items():
       if name.lower() in ['alpha', 'driver']:
-        if utils.isAFloatOrInt(value) or (len(value) == 1 and utils.isAFloatOrInt(value[0])):
-          new = np.zeros(t)
-          new[0] = float(value)
+        if self.isPerSampleScalar(value):
+          value = np.atleast_1d(value)
+          new = np.zeros(value.shape[:-1] + (t,))
+          new[..., 0] = value[..., 0]
           toExtend[name] = new
     return toExtend
 
@@ -892,23 +935,26 @@ class Capex(CashFlow):
     """
     ## FIXME what if I have set the values already?
     # get variable values, if needed
-    need = {'alpha': self._alpha, 'driver': self._driver}
-    # load alpha, driver from variables if need be
+    need = {'alpha': self._alpha, 'driver': self._driver, 'reference': self._reference, 'scale': self._scale}
+    # load alpha, driver (and possibly reference, scale) from variables if need be;
+    ## alpha and driver are (samples x lifetime) for a batch, reference and scale (samples x 1), so all of the
+    ## samples are evaluated in one broadcast
     need = self.loadFromVariables(need, variables, lifetimeCashflows, lifetime)
     # for Capex, use m * alpha * (D/D')^X
     alpha = need['alpha']
     driver = need['driver']
-    reference = self.getParam('reference')
+    reference = need['reference']
     if reference is None:
       reference = 1.0
-    scale = self.getParam('scale')
+    scale = need['scale']
     if scale is None:
       scale = 1.0
-    mult = self.getMultiplier()
+    mult = self._multiplier
     if mult is None:
       mult = 1.0
-    elif utils.isAString(mult):
-      mult = float(variables[mult])
+    elif TypeChecks.isAString(mult):
+      # one entry, or one entry per sample as (samples, 1) so it broadcasts along the lifetime
+      mult = np.asarray(variables[mult], dtype=float)
     result = mult * alpha * (driver / reference) ** scale
     if verbosity > 1:
       ret = {'result': result}
@@ -931,7 +977,7 @@ class Capex(CashFlow):
     for param in ['alpha', 'driver']:
       val = self.getParam(param)
       # if a string, then it's probably a variable, so don't check it now
-      if utils.isAString(val):
+      if TypeChecks.isAString(val):
         continue
       # if it's valued, then it better be the same length as the lifetime (which is comp lifetime + 1)
       elif len(val) != lifetime:
@@ -956,6 +1002,8 @@ class Recurring(CashFlow):
       @ In, specs, InputData, specs
       @ Out, specs, InputData, specs
     """
+    InputData = Raven.module('utils.InputData')
+    InputTypes = Raven.module('utils.InputTypes')
     specs = InputData.parameterInputFactory('Recurring')
     specs = CashFlow.getInputSpecs(specs)
     # nothing new to add
@@ -996,14 +1044,47 @@ class Recurring(CashFlow):
     mult = self.getMultiplier()
     if mult is None:
       mult = 1.0
-    elif utils.isAString(mult):
+    elif TypeChecks.isAString(mult):
       raise NotImplementedError
     try:
       self._yearlyCashflow[year] = mult * (alpha * driver).sum() # +1 is for initial construct year
     except ValueError as e:
-      print('Error while computing yearly cash flow! Check alpha shape ({}) and driver shape ({})'.format(alpha.shape, driver.shape))
+      logger.error('Error while computing yearly cash flow! Check alpha shape (%s) and driver shape (%s)', alpha.shape, driver.shape)
       raise e
 
+  def accumulateIntrayearCashflows(self, chunks):
+    """
+      Computes the yearly summaries of recurring interactions from intrayear data that comes in chunks,
+      and sets them to self._yearlyCashflow (for the years found in the data).
+      Like computeIntrayearCashflow, but the data of a year can be split over chunks and a chunk can hold
+      several years, so only one chunk has to be in memory at a time.
+      @ In, chunks, iterable, (years, alpha, driver) chunks with the project year index of each entry, as from
+                    Intrayear.intrayearChunks (e.g. over memory-mapped hourly data); entries past the lifetime are skipped.
+                    With (samples x entries) alpha and driver, the yearly cash flow gets one row per sample.
+      @ Out, None
+    """
+    mult = self.getMultiplier()
+    if mult is None:
+      mult = 1.0
+    elif TypeChecks.isAString(mult):
+      raise NotImplementedError
+    sums, found = Intrayear.yearlySums(chunks, self._yearlyCashflow.shape[-1])
+    if sums.ndim > self._yearlyCashflow.ndim:
+      # one yearly cash flow per sample from now on, served as a batch by calculateCashflow
+      self._yearlyCashflow = np.broadcast_to(self._yearlyCashflow, sums.shape).copy()
+    self._yearlyCashflow[..., found] = mult * sums[..., found]
+
+  def computeIntrayearCashflowBatch(self, years, alpha, driver):
+    """
+      Computes the yearly summaries of recurring interactions of many samples at once, and sets them
+      to self._yearlyCashflow, which then holds one row per sample (for use with main.runBatch)
+      @ In, years, np.array, project year index of each intrayear entry (e.g. of each hour)
+      @ In, alpha, np.array, array of "prices" (samples x entries)
+      @ In, driver, np.array, array of "quantities sold" (samples x entries)
+      @ Out, None
+    """
+    self.accumulateIntrayearCashflows([(years, alpha, driver)])
+
   def computeYearlyCashflow(self, alpha, driver):
     """
       Computes the yearly summary of recurring interactions, and sets them to self._yearlyCashflow
@@ -1017,12 +1098,12 @@ class Recurring(CashFlow):
     mult = self.getMultiplier()
     if mult is None:
       mult = 1.0
-    elif utils.isAString(mult):
+    elif TypeChecks.isAString(mult):
       raise NotImplementedError
     try:
       self._yearlyCashflow = mult * (alpha * driver)
     except ValueError as e:
-      print('Error while computing yearly cash flow! Check alpha shape ({}) and driver shape ({})'.format(alpha.shape, driver.shape))
+      logger.error('Error while computing yearly cash flow! Check alpha shape (%s) and driver shape (%s)', alpha.shape, driver.shape)
       raise e
 
   def calculateCashflow(self, variables, lifetimeCashflows, lifetime, verbosity):
@@ -1034,9 +1115,10 @@ class Recurring(CashFlow):
       @ In, verbosity, int, used to control the output information
       @ Out, calculateCashflow, dict, the dict of calculated cashflow
     """
-    # by now, self._yearlyCashflow should have been filled with appropriate values
-    ## if not, then they're being provided directly through array data/variables
-    if self._yearlyCashflow is None:
+    # if alpha and driver are not given, self._yearlyCashflow should have been filled already
+    ## (e.g. through computeIntrayearCashflow); otherwise they're provided through array data/variables,
+    ## which can change from one call to the next, so always re-evaluate them
+    if self._alpha is not None or self._driver is not None:
       # get variable values, if needed
       need = {'alpha': self.getParam('alpha'), 'driver': self.getParam('driver')}
       # load needed variables from variables as needed
@@ -1065,9 +1147,11 @@ class Recurring(CashFlow):
     # FIXME: we're going to integrate alpha * D over time (not year time, intrayear time)
     for name, value in toExtend.items():
       if name.lower() in ['alpha']:
-        if utils.isAFloatOrInt(value) or (len(value) == 1 and utils.isAFloatOrInt(value[0])):
-          new = np.ones(t) * float(value)
-          new[0] = 0
+        if self.isPerSampleScalar(value):
+          value = np.atleast_1d(value)
+          new = np.empty(value.shape[:-1] + (t,))
+          new[...] = value[..., :1]
+          new[..., 0] = 0
           toExtend[name] = new
     return toExtend
 
@@ -1088,13 +1172,15 @@ class Amortizor(Capex):
     driver = toExtend['driver']
     # how we treat the driver depends on if this is the amortizer or the depreciator
     if self.name.split('_')[-2] == 'amortize':
-      if not utils.isAString(driver):
-        toExtend['driver'] = np.ones(t) * driver[0] * -1.0
-        toExtend['driver'][0] = 0.0
+      if not TypeChecks.isAString(driver):
+        # the driver is the lifetime cash flow of the capex (one row per sample for batches)
+        toExtend['driver'] = np.ones(t) * np.atleast_1d(driver)[..., :1] * -1.0
+        toExtend['driver'][..., 0] = 0.0
       for name, value in toExtend.items():
         if name.lower() in ['driver']:
-          if utils.isAFloatOrInt(value) or (len(value) == 1 and utils.isAFloatOrInt(value[0])):
-            new = np.zeros(t)
-            new[1:] = float(value)
+          if self.isPerSampleScalar(value):
+            value = np.atleast_1d(value)
+            new = np.zeros(value.shape[:-1] + (t,))
+            new[..., 1:] = value[..., :1]
             toExtend[name] = new
     return toExtend
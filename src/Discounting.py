@@ -0,0 +1,88 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+This module contains the discounting kernel used by TEAL.CashFlow plugin module
+
+The economic indicators based on discounted cash flows (NPV, PI) are all taken from a single
+discounting pass over the free cash flow to the firm (FCFF), using discount factors that are
+computed once per (discount rate, project length).
+"""
+import functools
+
+import numpy as np
+
+@functools.lru_cache(maxsize=128)
+def discountFactors(discountRate, projectLength):
+  """
+    Discount factor of each project year, (1 + discountRate)^-year.
+    Cached, so the returned array is read-only.
+    @ In, discountRate, float, firm discount rate
+    @ In, projectLength, int, project years
+    @ Out, factors, np.array, discount factors (projectLength,)
+  """
+  factors = np.power(1.0 + discountRate, -np.arange(projectLength, dtype=float))
+  factors.setflags(write=False)
+  return factors
+
+def discount(fcff, discountRate):
+  """
+    Discounts yearly cash flows
+    @ In, fcff, np.array, yearly cash flows (years,) or (samples x years)
+    @ In, discountRate, float, firm discount rate
+    @ Out, discounted, np.array, discounted yearly cash flows, same shape as fcff
+  """
+  return fcff * discountFactors(discountRate, fcff.shape[-1])
+
+def evaluate(fcff, discountRate):
+  """
+    Gets the discounted indicators from one discounting pass
+    @ In, fcff, np.array, yearly free cash flow to the firm (years,) or (samples x years)
+    @ In, discountRate, float, firm discount rate
+    @ Out, npv, float or np.array, net present value (one per sample for a batch)
+    @ Out, pi, float or np.array, profitability index (one per sample for a batch)
+    @ Out, discounted, np.array, discounted yearly free cash flow to the firm, same shape as fcff
+  """
+  discounted = discount(fcff, discountRate)
+  npv = np.sum(discounted, axis=-1)
+  return npv, profitabilityIndex(npv, fcff), discounted
+
+def evaluateBatch(fcff, discountRate, keepDiscounted=False):
+  """
+    Gets the discounted indicators for many samples at once. The NPVs are taken as one matrix-vector
+    product, so the discounted cash flows are only created if requested.
+    @ In, fcff, np.array, yearly free cash flow to the firm (samples x years)
+    @ In, discountRate, float, firm discount rate
+    @ In, keepDiscounted, bool, optional, if True then provide the discounted cash flows as well
+    @ Out, npv, np.array, net present value per sample
+    @ Out, pi, np.array, profitability index per sample
+    @ Out, discounted, np.array, discounted yearly free cash flow to the firm (samples x years), None if not kept
+  """
+  fcff = np.atleast_2d(fcff)
+  factors = discountFactors(discountRate, fcff.shape[-1])
+  if keepDiscounted:
+    discounted = fcff * factors
+    npv = np.sum(discounted, axis=-1)
+  else:
+    discounted = None
+    npv = np.dot(fcff, factors)
+  return npv, profitabilityIndex(npv, fcff), discounted
+
+def profitabilityIndex(npv, fcff):
+  """
+    Gets the profitability index from the NPV and the initial investment
+    @ In, npv, float or np.array, net present value (one per sample for a batch)
+    @ In, fcff, np.array, yearly free cash flow to the firm (years,) or (samples x years)
+    @ Out, pi, float or np.array, profitability index (one per sample for a batch)
+  """
+  return -1.0 * npv / fcff[..., 0] # yes, really! This seems strange, but it also seems to be right.
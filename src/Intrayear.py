@@ -0,0 +1,117 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+This module contains the intrayear (e.g. hourly) aggregation used by TEAL.CashFlow plugin module
+
+Recurring cash flows can be given as many entries within each year (prices alpha and quantities sold
+driver, e.g. one per hour), collapsed to one yearly sum of alpha * driver. Here the data comes as a
+sequence of chunks, each tagged with the project year of its entries, so the yearly sums are built up
+one chunk at a time and the full (possibly multi-decade) data never has to be in memory at once.
+Data for many samples, as (samples x entries) alpha and driver, is summed for all samples at once.
+Memory-mapped arrays, or any other arrays that can be sliced, are split in chunks by intrayearChunks.
+"""
+import numpy as np
+
+DEFAULT_CHUNK_SIZE = 8760 * 16 # entries per chunk, e.g. 16 years of hourly data
+
+def yearIndices(timestamps, firstYear):
+  """
+    Gets the project year index of timestamps
+    @ In, timestamps, np.array, timestamps (datetime64 or anything np.datetime64 understands, e.g. ISO strings)
+    @ In, firstYear, int, calendar year of project year 0 (the construction year)
+    @ Out, years, np.array, project year of each timestamp
+  """
+  calendar = np.asarray(timestamps, dtype='datetime64[ns]').astype('datetime64[Y]').astype(int) + 1970
+  return calendar - firstYear
+
+def intrayearChunks(years, alpha, driver, firstYear=None, chunkSize=DEFAULT_CHUNK_SIZE):
+  """
+    Splits intrayear data in chunks (views, so memory-mapped data is only read one chunk at a time)
+    @ In, years, np.array, project year of each entry, or timestamps of each entry if firstYear is given
+    @ In, alpha, np.array or float, "prices", one per entry (or one for all), possibly (samples x entries)
+    @ In, driver, np.array or float, "quantities sold", one per entry (or one for all), possibly (samples x entries)
+    @ In, firstYear, int, optional, calendar year of project year 0, to get the project years from timestamps
+    @ In, chunkSize, int, optional, entries per chunk
+    @ Out, chunks, generator, (years, alpha, driver) of each chunk
+  """
+  numEntries = len(years)
+  for start in range(0, numEntries, chunkSize):
+    end = min(start + chunkSize, numEntries)
+    chunkYears = years[start:end]
+    if firstYear is not None:
+      chunkYears = yearIndices(chunkYears, firstYear)
+    yield chunkYears, _chunkOf(alpha, start, end), _chunkOf(driver, start, end)
+
+def yearlySums(chunks, numYears):
+  """
+    Sums alpha * driver by project year over a sequence of chunks
+    @ In, chunks, iterable, (years, alpha, driver) chunks as np.array (see intrayearChunks), with one project year
+                  per entry and alpha, driver as (entries,) or (samples x entries); entries outside of the years
+                  0 to numYears - 1 are skipped
+    @ In, numYears, int, number of project years to sum for
+    @ Out, sums, np.array, sum of alpha * driver of each year, (years,) or (samples x years)
+    @ Out, found, np.array, True for each year with entries in any chunk
+  """
+  sums = None
+  counts = np.zeros(numYears, dtype=int)
+  for years, alpha, driver in chunks:
+    years = np.asarray(years, dtype=int)
+    values = np.asarray(alpha, dtype=float) * np.asarray(driver, dtype=float)
+    values = np.broadcast_to(values, values.shape[:-1] + years.shape)
+    inside = (years >= 0) & (years < numYears)
+    if not np.all(inside):
+      years = years[inside]
+      values = values[..., inside]
+    chunkSums = sumByYear(years, values, numYears)
+    sums = chunkSums if sums is None else sums + chunkSums
+    counts += np.bincount(years, minlength=numYears)
+  if sums is None:
+    sums = np.zeros(numYears)
+  return sums, counts > 0
+
+def sumByYear(years, values, numYears):
+  """
+    Sums values by project year, for all samples in one pass
+    @ In, years, np.array, project year of each entry, all in 0 to numYears - 1
+    @ In, values, np.array, values (entries,) or (samples x entries)
+    @ In, numYears, int, number of project years
+    @ Out, sums, np.array, sum of the values of each year, (years,) or (samples x years)
+  """
+  if values.ndim == 1:
+    return np.bincount(years, weights=values, minlength=numYears)
+  sums = np.zeros(values.shape[:-1] + (numYears,))
+  if len(years) == 0:
+    return sums
+  if np.all(years[1:] >= years[:-1]):
+    # time-ordered data (the usual case): each year is a contiguous block of entries
+    starts = np.flatnonzero(np.concatenate(([True], years[1:] != years[:-1])))
+    sums[..., years[starts]] = np.add.reduceat(values, starts, axis=-1)
+  else:
+    # otherwise one bincount over (sample, year) pairs
+    rows = values.reshape(-1, len(years))
+    index = (np.arange(len(rows))[:, np.newaxis] * numYears + years).ravel()
+    sums = np.bincount(index, weights=rows.ravel(), minlength=len(rows) * numYears).reshape(sums.shape)
+  return sums
+
+def _chunkOf(value, start, end):
+  """
+    Gets the entries of a chunk
+    @ In, value, np.array or float, one value per entry (along the last axis), or one for all
+    @ In, start, int, first entry of the chunk
+    @ In, end, int, entry after the last of the chunk
+    @ Out, chunk, np.array or float, values of the chunk
+  """
+  if np.ndim(value) == 0:
+    return value
+  return value[..., start:end]
@@ -0,0 +1,170 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+This module contains the internal rate of return (IRR) solver used by TEAL.CashFlow plugin module
+
+The IRR is the rate r for which the NPV of the yearly cash flows c_t is zero. The search is done in
+u = log(1 + r), where the NPV is scaled so it can't overflow for long projects:
+  h(u) = sum_t c_t exp(u (k - t)), with k = 0 for u >= 0 and k = projectLength - 1 for u < 0
+which has the same sign and roots as the NPV. A root is first bracketed on a fixed grid, taking the
+root closest to r = 0 like the former np.irr, then refined by Newton iterations with the analytic
+derivative, falling back to bisection whenever a Newton step leaves the bracket. A guess (e.g. the
+previous IRR of a sweep) only sets where the iterations start inside that bracket, so it never
+changes which root is found. All samples are solved at once.
+"""
+import numpy as np
+
+# diagnostic codes, one per sample
+CONVERGED = 0
+NO_ROOT = 1        # the NPV doesn't change sign for any rate on the search grid
+NOT_CONVERGED = 2  # the maximum number of iterations was reached
+INVALID = 3        # the cash flows are not finite, or are all zero
+
+DEFAULT_TOL = 1e-10
+DEFAULT_MAX_ITER = 100
+
+# search grid in u = log(1 + r), from r = -0.999 to r = ~1100, finer close to r = 0 to tell close roots apart;
+# includes u = 0 so no bracket crosses it
+_GRID = 0.01 * np.sinh(np.linspace(-7.26, 7.26, 401))
+
+def solve(fcff, guess=None, tol=DEFAULT_TOL, maxIter=DEFAULT_MAX_ITER):
+  """
+    Finds the internal rate of return of yearly cash flows
+    @ In, fcff, np.array, yearly cash flows (years,) or (samples x years)
+    @ In, guess, float or np.array, optional, starting IRR (e.g. the previous one in a sweep), one or one per sample;
+                 only used if it falls in the bracket of the root closest to zero
+    @ In, tol, float, optional, absolute tolerance on the rate
+    @ In, maxIter, int, optional, maximum number of Newton/bisection iterations
+    @ Out, irr, float or np.array, internal rate of return (NaN where not found)
+    @ Out, status, int or np.array, diagnostic code (see CONVERGED, NO_ROOT, NOT_CONVERGED, INVALID)
+  """
+  fcff = np.asarray(fcff, dtype=float)
+  single = fcff.ndim == 1
+  fcff = np.atleast_2d(fcff)
+  numSamples, projectLength = fcff.shape
+  years = np.arange(projectLength, dtype=float)
+  irr = np.full(numSamples, np.nan)
+  status = np.full(numSamples, NO_ROOT)
+  valid = np.all(np.isfinite(fcff), axis=-1) & np.any(fcff != 0.0, axis=-1)
+  status[~valid] = INVALID
+  lower = np.full(numSamples, np.nan)
+  upper = np.full(numSamples, np.nan)
+  if np.any(valid):
+    lower[valid], upper[valid] = _bracket(fcff[valid], _GRID, years, np.abs(np.expm1(_GRID)))
+  # starting points in u, NaN where there's no usable guess
+  start = np.full(numSamples, np.nan)
+  if guess is not None:
+    guess = np.broadcast_to(np.asarray(guess, dtype=float), (numSamples,))
+    usable = np.isfinite(guess) & (guess > -1.0)
+    start[usable] = np.log1p(guess[usable])
+  bracketed = ~np.isnan(lower)
+  if np.any(bracketed):
+    irr[bracketed], status[bracketed] = _refine(fcff[bracketed], lower[bracketed], upper[bracketed], years, tol, maxIter,
+                                                start=start[bracketed])
+  if single:
+    return float(irr[0]), int(status[0])
+  return irr, status
+
+def _scaledNpv(fcff, u, years):
+  """
+    Evaluates the scaled NPV h(u), see module description
+    @ In, fcff, np.array, yearly cash flows (samples x years)
+    @ In, u, np.array, log(1 + rate) to evaluate at, shared (points,) or per sample (samples x points)
+    @ In, years, np.array, project years
+    @ Out, h, np.array, scaled NPV (samples x points)
+  """
+  power = np.where(u < 0.0, years[-1], 0.0)[..., np.newaxis] - years # k - t
+  weights = np.exp(u[..., np.newaxis] * power)
+  if u.ndim == 1:
+    # same points for all samples, as one matrix product
+    return np.dot(fcff, weights.T)
+  return np.einsum('sy,spy->sp', fcff, weights)
+
+def _bracket(fcff, points, years, distance):
+  """
+    Finds, for each sample, the pair of consecutive points between which the NPV changes sign,
+    preferring the smallest distance.
+    @ In, fcff, np.array, yearly cash flows (samples x years)
+    @ In, points, np.array, increasing values of u to check, shared (points,) or per sample (samples x points)
+    @ In, years, np.array, project years
+    @ In, distance, np.array, preference of each point, smaller is better (points,)
+    @ Out, lower, np.array, lower end of the bracket in u (NaN if none)
+    @ Out, upper, np.array, upper end of the bracket in u (NaN if none)
+  """
+  sign = np.sign(_scaledNpv(fcff, points, years))
+  change = (sign[:, :-1] * sign[:, 1:] <= 0.0) & ((sign[:, :-1] != 0.0) | (sign[:, 1:] != 0.0))
+  rank = np.where(change, np.minimum(distance[:-1], distance[1:]), np.inf)
+  best = np.argmin(rank, axis=-1)
+  rows = np.arange(len(fcff))
+  points = np.broadcast_to(points, sign.shape)
+  found = np.isfinite(rank[rows, best])
+  lower = np.where(found, points[rows, best], np.nan)
+  upper = np.where(found, points[rows, best + 1], np.nan)
+  return lower, upper
+
+def _refine(fcff, lower, upper, years, tol, maxIter, start=None):
+  """
+    Safeguarded Newton iterations inside the brackets
+    @ In, fcff, np.array, yearly cash flows (samples x years)
+    @ In, lower, np.array, lower end of the brackets in u
+    @ In, upper, np.array, upper end of the brackets in u
+    @ In, years, np.array, project years
+    @ In, tol, float, absolute tolerance on the rate
+    @ In, maxIter, int, maximum number of iterations
+    @ In, start, np.array, optional, starting points in u (the middle of the bracket where NaN or outside it)
+    @ Out, irr, np.array, internal rate of return (NaN if not converged)
+    @ Out, status, np.array, diagnostic code
+  """
+  # keep one scaling per sample along the iterations, so the sign at the bracket ends stays meaningful
+  shift = np.where(lower < 0.0, years[-1], 0.0)[:, np.newaxis]
+  def evaluate(u, active):
+    """
+      Scaled NPV and derivative at one point per sample
+      @ In, u, np.array, log(1 + rate) for the active samples
+      @ In, active, np.array, mask of the samples to evaluate
+      @ Out, h, np.array, scaled NPV
+      @ Out, dh, np.array, derivative
+    """
+    power = shift[active] - years
+    terms = fcff[active] * np.exp(u[:, np.newaxis] * power)
+    return np.sum(terms, axis=-1), np.sum(terms * power, axis=-1)
+  u = 0.5 * (lower + upper)
+  if start is not None:
+    inside = (start > lower) & (start < upper)
+    u = np.where(inside, start, u)
+  status = np.full(len(u), NOT_CONVERGED)
+  active = np.ones(len(u), dtype=bool)
+  signLower = np.sign(evaluate(lower, active)[0])
+  for _ in range(maxIter):
+    h, dh = evaluate(u[active], active)
+    # shrink the brackets around the root
+    below = np.sign(h) == signLower[active]
+    lower[active] = np.where(below, u[active], lower[active])
+    upper[active] = np.where(below, upper[active], u[active])
+    with np.errstate(divide='ignore', invalid='ignore'):
+      step = u[active] - h / dh
+    # bisect where Newton would leave the bracket
+    outside = ~((step > lower[active]) & (step < upper[active]))
+    step = np.where(outside, 0.5 * (lower[active] + upper[active]), step)
+    # tolerance is on the rate: dr = (1 + r) du
+    converged = (np.abs(step - u[active]) * np.exp(step) < tol) | (h == 0.0) | \
+                ((upper[active] - lower[active]) * np.exp(upper[active]) < tol)
+    u[active] = np.where(h == 0.0, u[active], step)
+    indices = np.flatnonzero(active)[converged]
+    status[indices] = CONVERGED
+    active[indices] = False
+    if not np.any(active):
+      break
+  irr = np.where(status == CONVERGED, np.expm1(u), np.nan)
+  return irr, status
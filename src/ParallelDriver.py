@@ -0,0 +1,108 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+This module contains the parallel evaluation of large sample sets for the stand-alone mode of
+the TEAL.CashFlow plugin module
+
+The samples are split in chunks, each evaluated at once with main.runBatch by a pool of worker
+processes. Each worker gets the settings and components (and compiles its evaluation plan) once,
+when it starts, so tasks only carry the sampled variables. Results come back in sample order.
+"""
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+  from TEAL.src import main
+except (ImportError, ModuleNotFoundError):
+  import main
+
+# settings, components and evaluation plan of this (worker) process
+_worker = {}
+
+def _initWorker(settings, components, analytic, details):
+  """
+    Prepares a worker process to evaluate chunks of samples
+    @ In, settings, CashFlows.GlobalSettings, global settings
+    @ In, components, list, list of CashFlows.Component instances
+    @ In, analytic, bool, if True then get NPV and NPV_search straight from the lifetime cash flows
+    @ In, details, bool, if True then also provide the yearly FCFF and project cash flows
+    @ Out, None
+  """
+  _worker['settings'] = settings
+  _worker['components'] = components
+  _worker['analytic'] = analytic
+  _worker['details'] = details
+  _worker['plan'] = main.compilePlan(settings, components, v=settings._verbosity)
+
+def _runChunk(chunk):
+  """
+    Evaluates a chunk of samples in a worker process
+    @ In, chunk, dict, variables stacked by sample
+    @ Out, results, dict, economic metric results with one entry per sample (with the details, if requested)
+  """
+  return main.runBatch(_worker['settings'], _worker['components'], chunk, plan=_worker['plan'],
+                       analytic=_worker['analytic'], returnDetails=_worker['details'])
+
+def countSamples(samples):
+  """
+    Gets the number of samples in a sample set
+    @ In, samples, dict, variables stacked by sample
+    @ Out, numSamples, int, number of samples
+  """
+  sizes = set(len(value) for value in samples.values())
+  if len(sizes) != 1:
+    raise IOError('All sampled variables should have the same number of samples, but got {}!'.format(sorted(sizes)))
+  return sizes.pop()
+
+def chunkSamples(samples, chunkSize):
+  """
+    Splits a sample set in consecutive chunks (views, no copies)
+    @ In, samples, dict, variables stacked by sample
+    @ In, chunkSize, int, samples per chunk
+    @ Out, chunks, generator, dicts of variables stacked by sample
+  """
+  numSamples = countSamples(samples)
+  for start in range(0, numSamples, chunkSize):
+    yield dict((name, value[start:start+chunkSize]) for name, value in samples.items())
+
+def runSamples(settings, components, samples, workers=None, chunkSize=256, analytic=False, details=False):
+  """
+    Evaluates a sample set in chunks, in parallel over a pool of processes
+    @ In, settings, CashFlows.GlobalSettings, global settings
+    @ In, components, list, list of CashFlows.Component instances
+    @ In, samples, dict, variables stacked by sample, as (samples,) for scalars or (samples x years) for arrays
+    @ In, workers, int, optional, number of worker processes (all cores if None, no pool if 1)
+    @ In, chunkSize, int, optional, samples per task
+    @ In, analytic, bool, optional, if True then get NPV and NPV_search straight from the lifetime cash flows
+    @ In, details, bool, optional, if True then also provide the yearly FCFF and project cash flows
+    @ Out, results, generator, results of each chunk (as from main.runBatch, with returnDetails=details), in sample order
+  """
+  if workers is None:
+    workers = os.cpu_count() or 1
+  chunks = chunkSamples(samples, chunkSize)
+  if workers == 1:
+    _initWorker(settings, components, analytic, details)
+    for chunk in chunks:
+      yield _runChunk(chunk)
+    return
+  with ProcessPoolExecutor(max_workers=workers, initializer=_initWorker, initargs=(settings, components, analytic, details)) as pool:
+    # only keep a few chunks in flight, so results can be written out as they come
+    pending = deque()
+    for chunk in chunks:
+      pending.append(pool.submit(_runChunk, chunk))
+      if len(pending) >= 2 * workers:
+        yield pending.popleft().result()
+    while pending:
+      yield pending.popleft().result()
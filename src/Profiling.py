@@ -0,0 +1,210 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+This module contains the profiling of runs of TEAL.CashFlow plugin module
+
+A Profiler times the stages of a run (evaluation plan, lifetime cash flows, project cash flows, FCFF,
+indicators), counts what was computed or reused and the arrays created, and breaks the time down per
+component and per cash flow. Profiling is opt-in: with run(..., profile=True) the stage totals are kept
+(see EvaluationPlan.timings) and the full report is provided as well, and can be written out as JSON or as
+a Chrome trace (to open in chrome://tracing or https://ui.perfetto.dev). Otherwise run uses a NullProfiler,
+which does nothing.
+"""
+import os
+import json
+import time
+import contextlib
+from collections import OrderedDict, defaultdict
+
+class Profiler:
+  """
+    Collects the timings and counters of a run
+  """
+  def __init__(self, detailed=True):
+    """
+      Constructor.
+      @ In, detailed, bool, optional, if False then only keep the total time of each stage and the counters
+                      (no events, no breakdown per component and cash flow)
+      @ Out, None
+    """
+    self.detailed = detailed
+    self.origin = time.perf_counter()
+    self.stages = OrderedDict() # stage name: seconds
+    self.counters = defaultdict(int) # counter name: count
+    self.breakdown = {'components': OrderedDict(), 'cashflows': OrderedDict()} # kind: name: step: seconds
+    self.events = [] # (name, category, start, duration, args), times in seconds from origin
+
+  @contextlib.contextmanager
+  def stage(self, name):
+    """
+      Times a stage of the run
+      @ In, name, str, stage name
+      @ Out, None
+    """
+    start = time.perf_counter()
+    try:
+      yield
+    finally:
+      duration = time.perf_counter() - start
+      self.stages[name] = self.stages.get(name, 0.0) + duration
+      if self.detailed:
+        self.events.append((name, 'stage', start - self.origin, duration, {}))
+
+  def item(self, kind, name, step, **args):
+    """
+      Times a step for one component or cash flow (only if detailed)
+      @ In, kind, str, 'components' or 'cashflows'
+      @ In, name, str, component name, or 'Component|CashFlow'
+      @ In, step, str, what is done, e.g. 'lifetime' or 'project'
+      @ In, args, dict, optional, extra information for the trace
+      @ Out, context, context manager, timer
+    """
+    if not self.detailed:
+      return contextlib.nullcontext()
+    return self._item(kind, name, step, args)
+
+  @contextlib.contextmanager
+  def _item(self, kind, name, step, args):
+    """
+      Times a step for one component or cash flow, see item
+      @ In, kind, str, 'components' or 'cashflows'
+      @ In, name, str, component name, or 'Component|CashFlow'
+      @ In, step, str, what is done
+      @ In, args, dict, extra information for the trace
+      @ Out, None
+    """
+    start = time.perf_counter()
+    try:
+      yield
+    finally:
+      duration = time.perf_counter() - start
+      steps = self.breakdown[kind].setdefault(name, OrderedDict())
+      steps[step] = steps.get(step, 0.0) + duration
+      self.events.append(('{} {}'.format(step, name), kind, start - self.origin, duration, args))
+
+  def count(self, name, value=1):
+    """
+      Increases a counter
+      @ In, name, str, counter name
+      @ In, value, int, optional, increase
+      @ Out, None
+    """
+    self.counters[name] += value
+
+  def countArray(self, array):
+    """
+      Counts a newly created array, and its size
+      @ In, array, np.array, array
+      @ Out, None
+    """
+    self.counters['arrays'] += 1
+    self.counters['bytes'] += int(getattr(array, 'nbytes', 0))
+
+  def report(self):
+    """
+      Provides everything collected so far
+      @ In, None
+      @ Out, report, dict, {'stages': {name: seconds}, 'counters': {name: count},
+                            'components': {name: {step: seconds}}, 'cashflows': {name: {step: seconds}},
+                            'events': [{'name', 'category', 'start', 'duration', 'args'}]} (times in seconds)
+    """
+    return {'stages': dict(self.stages),
+            'counters': dict(self.counters),
+            'components': dict((name, dict(steps)) for name, steps in self.breakdown['components'].items()),
+            'cashflows': dict((name, dict(steps)) for name, steps in self.breakdown['cashflows'].items()),
+            'events': [{'name': name, 'category': category, 'start': start, 'duration': duration, 'args': args}
+                       for name, category, start, duration, args in self.events]}
+
+class NullProfiler:
+  """
+    Stands in for a Profiler when not profiling, so runs don't pay for any timing or counting
+  """
+  # reused by every stage and item, as it holds no state
+  _nothing = contextlib.nullcontext()
+
+  def __init__(self):
+    """
+      Constructor.
+      @ In, None
+      @ Out, None
+    """
+    self.detailed = False
+    self.stages = {}
+
+  def stage(self, name):
+    """
+      Does not time a stage of the run
+      @ In, name, str, stage name
+      @ Out, context, context manager, doing nothing
+    """
+    return self._nothing
+
+  def item(self, kind, name, step, **args):
+    """
+      Does not time a step for one component or cash flow
+      @ In, kind, str, 'components' or 'cashflows'
+      @ In, name, str, component name, or 'Component|CashFlow'
+      @ In, step, str, what is done
+      @ In, args, dict, optional, extra information for the trace
+      @ Out, context, context manager, doing nothing
+    """
+    return self._nothing
+
+  def count(self, name, value=1):
+    """
+      Does not increase a counter
+      @ In, name, str, counter name
+      @ In, value, int, optional, increase
+      @ Out, None
+    """
+    pass
+
+  def countArray(self, array):
+    """
+      Does not count an array
+      @ In, array, np.array, array
+      @ Out, None
+    """
+    pass
+
+def dumpJson(report, path):
+  """
+    Writes a profiling report as JSON
+    @ In, report, dict, as from Profiler.report
+    @ In, path, str, output file
+    @ Out, None
+  """
+  with open(path, 'w') as f:
+    json.dump(report, f, indent=2)
+
+def dumpChromeTrace(report, path):
+  """
+    Writes the events of a profiling report in the Chrome trace event format
+    @ In, report, dict, as from Profiler.report
+    @ In, path, str, output file
+    @ Out, None
+  """
+  pid = os.getpid()
+  events = []
+  for event in report['events']:
+    events.append({'name': event['name'],
+                   'cat': event['category'],
+                   'ph': 'X', # complete event, with its duration
+                   'ts': event['start'] * 1e6, # microseconds
+                   'dur': event['duration'] * 1e6,
+                   'pid': pid,
+                   'tid': 0,
+                   'args': event['args']})
+  with open(path, 'w') as f:
+    json.dump({'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': {'counters': report['counters']}}, f)
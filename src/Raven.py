@@ -0,0 +1,54 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+This module provides the RAVEN modules used by TEAL.CashFlow plugin module
+
+Only reading the XML input (InputData specs) and the plugin itself need RAVEN, so the RAVEN modules are
+imported on first use rather than when TEAL is imported: the numeric core (CashFlows, main) can be used
+with NumPy alone, e.g. through the object-oriented API. RAVEN is looked for as already importable
+(within RAVEN, or with its framework on the path), as the ravenframework package, and only then in the
+usual places relative to this plugin.
+"""
+import os
+import sys
+import importlib
+
+# RAVEN framework locations relative to this plugin, only searched if RAVEN can't be imported as is
+_FRAMEWORK_PATHS = [os.path.join(os.path.dirname(__file__), '..', '..', 'raven', 'framework'),
+                    os.path.join(os.path.dirname(__file__), '..', 'raven', 'framework'),
+                    os.path.join(os.path.dirname(__file__), '..', '..', '..', 'framework')]
+
+def module(name):
+  """
+    Imports a RAVEN module
+    @ In, name, str, module name within the RAVEN framework, e.g. 'utils.InputData'
+    @ Out, module, module, imported module
+  """
+  loaded = sys.modules.get(name)
+  if loaded is not None:
+    return loaded
+  for candidate in (name, 'ravenframework.' + name):
+    try:
+      return importlib.import_module(candidate)
+    except ImportError:
+      pass
+  for path in _FRAMEWORK_PATHS:
+    path = os.path.abspath(os.path.expanduser(path))
+    if os.path.isdir(path) and path not in sys.path:
+      sys.path.append(path)
+  try:
+    return importlib.import_module(name)
+  except ImportError as error:
+    raise ImportError('RAVEN module "{}" not found: RAVEN needs to be installed (or on the python path), '.format(name) +
+                      'and TEAL in its plugin directory, to read XML input or run as a plugin!') from error
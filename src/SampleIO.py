@@ -0,0 +1,493 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+This module contains the reading of sample sets and the writing of their results for the
+stand-alone mode of the TEAL.CashFlow plugin module
+
+Samples are stored by variable, as (samples,) for scalars or (samples x entries) for vectors, which is
+what main.runBatch takes. They can be read from
+  - CSV files, with one row per sample, and vector entries named "name[i]";
+  - columnar binary files, with one array per variable: .npz archives, directories of .npy files,
+    and (if pyarrow and h5py are installed) Parquet and HDF5 files.
+Arrays in .npy files and in uncompressed .npz archives are memory-mapped rather than loaded.
+HDF5 datasets are read as they are needed, so the file stays open until the SampleSet is closed.
+
+Results are written as the chunks of samples are evaluated, to CSV files or to a .npz archive (see ResultWriter).
+"""
+import os
+import re
+import csv
+import shutil
+import zipfile
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+
+INDICATORS = ['NPV_mult', 'NPV', 'IRR', 'PI']
+
+_ENTRY = re.compile(r'^(.+)\[(\d+)\]$')
+
+class SampleSet(dict):
+  """
+    Variables of a sample set, as variable name: array, along with the file they are read from, if it has to
+    stay open while they are used (e.g. HDF5 datasets). Close it, or use it as a context manager, once done.
+  """
+  def __init__(self, samples, source=None):
+    """
+      Constructor.
+      @ In, samples, dict, variable name: array
+      @ In, source, object, optional, open file the arrays are read from, with a close method
+      @ Out, None
+    """
+    dict.__init__(self, samples)
+    self.source = source
+
+  def close(self):
+    """
+      Closes the file the samples are read from, if any
+      @ In, None
+      @ Out, None
+    """
+    if self.source is not None:
+      self.source.close()
+      self.source = None
+
+  def __enter__(self):
+    """
+      Context manager entry
+      @ In, None
+      @ Out, self, SampleSet, these samples
+    """
+    return self
+
+  def __exit__(self, *exc):
+    """
+      Context manager exit, closes the file the samples are read from
+      @ In, exc, tuple, exception information
+      @ Out, None
+    """
+    self.close()
+
+def readSamples(path):
+  """
+    Reads a sample set, in the format given by the file extension
+    @ In, path, str, path to a .csv, .npz, .parquet, .h5/.hdf5 file, or to a directory of .npy files
+    @ Out, samples, SampleSet, variable name: np.array, (samples,) for scalars or (samples x entries) for vectors
+  """
+  if os.path.isdir(path):
+    return SampleSet(readSamplesNpy(path))
+  extension = os.path.splitext(path)[1].lower()
+  readers = {'.csv': readSamplesCsv,
+             '.npz': readSamplesNpz,
+             '.parquet': readSamplesParquet,
+             '.h5': readSamplesHdf5,
+             '.hdf5': readSamplesHdf5}
+  if extension not in readers:
+    raise IOError('Unrecognized samples file format "{}" for "{}"; expected one of {} or a directory of .npy files!'.format(extension, path, sorted(readers)))
+  samples = readers[extension](path)
+  return samples if isinstance(samples, SampleSet) else SampleSet(samples)
+
+def readVariables(path):
+  """
+    Reads a single sample from a variable file, with one "name value, value, ..." line per variable
+    @ In, path, str, path to the variable file
+    @ Out, variables, dict, variable name: np.array of values
+  """
+  variables = {}
+  with open(path, 'r') as f:
+    for number, line in enumerate(f, start=1):
+      if not line.strip():
+        continue
+      key, values = line.split(' ', 1)
+      try:
+        variables[key] = np.array([float(value) for value in values.split(',')])
+      except ValueError as error:
+        raise IOError('Variable file "{}" line {}: bad value for variable "{}" ({})!'.format(path, number, key, error))
+  return variables
+
+def readSamplesCsv(path):
+  """
+    Reads a sample set from a CSV file, with one row per sample
+    @ In, path, str, path to the CSV file
+    @ Out, samples, dict, variable name: np.array, (samples,) for scalars or (samples x entries) for vectors
+  """
+  with open(path, 'r') as f:
+    header = [label.strip() for label in next(csv.reader(f))]
+  data = np.loadtxt(path, delimiter=',', skiprows=1, ndmin=2)
+  if data.shape[1] != len(header):
+    raise IOError('Samples file "{}" has {} columns but {} names in the header!'.format(path, data.shape[1], len(header)))
+  return _assembleColumns(path, header, lambda columns: data[:, columns])
+
+def readSamplesNpz(path):
+  """
+    Reads a sample set from a .npz archive, with one array per variable.
+    Arrays stored without compression (np.savez) are memory-mapped, compressed ones (np.savez_compressed) are loaded.
+    @ In, path, str, path to the .npz file
+    @ Out, samples, dict, variable name: np.array, (samples,) for scalars or (samples x entries) for vectors
+  """
+  samples = {}
+  with zipfile.ZipFile(path) as archive:
+    for info in archive.infolist():
+      name = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+      if info.compress_type == zipfile.ZIP_STORED:
+        samples[name] = _mapStoredArray(path, archive, info)
+      else:
+        with archive.open(info) as member:
+          samples[name] = np.lib.format.read_array(member, allow_pickle=False)
+  return _checkColumnar(path, samples)
+
+def readSamplesNpy(path):
+  """
+    Reads a sample set from a directory of .npy files, one per variable (named after the variable), memory-mapped
+    @ In, path, str, path to the directory
+    @ Out, samples, dict, variable name: np.array, (samples,) for scalars or (samples x entries) for vectors
+  """
+  samples = {}
+  for fileName in sorted(os.listdir(path)):
+    if fileName.endswith('.npy'):
+      samples[fileName[:-4]] = np.load(os.path.join(path, fileName), mmap_mode='r', allow_pickle=False)
+  if not samples:
+    raise IOError('No .npy files found in samples directory "{}"!'.format(path))
+  return _checkColumnar(path, samples)
+
+def readSamplesParquet(path):
+  """
+    Reads a sample set from a Parquet file (requires pyarrow), with one row per sample.
+    Vectors are either list columns or, like in CSV files, one column per entry named "name[i]".
+    @ In, path, str, path to the Parquet file
+    @ Out, samples, dict, variable name: np.array, (samples,) for scalars or (samples x entries) for vectors
+  """
+  try:
+    import pyarrow
+    import pyarrow.parquet as pq
+  except ImportError:
+    raise IOError('Reading samples from Parquet file "{}" requires the pyarrow package!'.format(path))
+  table = pq.read_table(path)
+  def getColumns(columns):
+    """
+      Gets columns of the table as an array
+      @ In, columns, int or list, column index, or list of column indices
+      @ Out, data, np.array, (samples,) for a single scalar column, (samples x entries) otherwise
+    """
+    single = not isinstance(columns, list)
+    if single:
+      columns = [columns]
+    arrays = []
+    for c in columns:
+      column = table.column(c).combine_chunks()
+      if pyarrow.types.is_list(column.type) or pyarrow.types.is_fixed_size_list(column.type):
+        # list column, one vector per sample
+        arrays.append(column.flatten().to_numpy(zero_copy_only=False).reshape(len(column), -1))
+      else:
+        arrays.append(column.to_numpy(zero_copy_only=False))
+    if single:
+      return np.asarray(arrays[0], dtype=float)
+    return np.column_stack(arrays).astype(float, copy=False)
+  return _assembleColumns(path, [name.strip() for name in table.column_names], getColumns)
+
+def readSamplesHdf5(path):
+  """
+    Reads a sample set from an HDF5 file (requires h5py), with one dataset per variable at the root.
+    The datasets are not loaded, but read chunk by chunk as the samples get evaluated, so the file stays
+    open until the samples are closed.
+    @ In, path, str, path to the HDF5 file
+    @ Out, samples, SampleSet, variable name: h5py.Dataset, (samples,) for scalars or (samples x entries) for vectors
+  """
+  try:
+    import h5py
+  except ImportError:
+    raise IOError('Reading samples from HDF5 file "{}" requires the h5py package!'.format(path))
+  hdf = h5py.File(path, 'r')
+  try:
+    samples = dict((name, item) for name, item in hdf.items() if isinstance(item, h5py.Dataset))
+    return SampleSet(_checkColumnar(path, samples), source=hdf)
+  except Exception:
+    hdf.close()
+    raise
+
+def _mapStoredArray(path, archive, info):
+  """
+    Memory-maps an array stored without compression in a .npz archive
+    @ In, path, str, path to the .npz file
+    @ In, archive, zipfile.ZipFile, the opened archive
+    @ In, info, zipfile.ZipInfo, the archive member with the array
+    @ Out, array, np.memmap, the array
+  """
+  with archive.open(info) as member:
+    version = np.lib.format.read_magic(member)
+    if version == (1, 0):
+      shape, fortranOrder, dtype = np.lib.format.read_array_header_1_0(member)
+    else:
+      shape, fortranOrder, dtype = np.lib.format.read_array_header_2_0(member)
+    headerSize = member.tell()
+  if dtype.hasobject:
+    raise IOError('Samples file "{}": member "{}" holds Python objects, not numbers!'.format(path, info.filename))
+  # the member data starts after its local file header, which has a fixed part and variable-length name and extra fields
+  with open(path, 'rb') as f:
+    f.seek(info.header_offset + 26)
+    nameLength, extraLength = np.frombuffer(f.read(4), dtype='<u2')
+  offset = info.header_offset + 30 + int(nameLength) + int(extraLength) + headerSize
+  return np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=shape, order='F' if fortranOrder else 'C')
+
+def _assembleColumns(path, header, getColumns):
+  """
+    Groups the columns of a table by variable, where vector entries are named "name[i]"
+    @ In, path, str, path to the samples file (for error messages)
+    @ In, header, list, column names
+    @ In, getColumns, callable, takes a column index and gives its values (samples,), or
+                      a list of column indices and gives their values (samples x columns)
+    @ Out, samples, dict, variable name: np.array, (samples,) for scalars or (samples x entries) for vectors
+  """
+  columns = OrderedDict() # name: list of (entry, column)
+  for c, label in enumerate(header):
+    match = _ENTRY.match(label)
+    if match:
+      columns.setdefault(match.group(1), []).append((int(match.group(2)), c))
+    else:
+      columns.setdefault(label, []).append((None, c))
+  samples = {}
+  for name, entries in columns.items():
+    if len(entries) == 1 and entries[0][0] is None:
+      samples[name] = getColumns(entries[0][1])
+      continue
+    indices = sorted(entries)
+    if any(entry is None for entry, _ in entries) or [entry for entry, _ in indices] != list(range(len(indices))):
+      raise IOError('Samples file "{}": entries of variable "{}" should be "{}[0]" to "{}[{}]"!'.format(path, name, name, name, len(indices)-1))
+    samples[name] = getColumns([c for _, c in indices])
+  return samples
+
+def _checkColumnar(path, samples):
+  """
+    Checks the shapes of variables read from a columnar file
+    @ In, path, str, path to the samples file (for error messages)
+    @ In, samples, dict, variable name: array
+    @ Out, samples, dict, the same samples
+  """
+  for name, value in samples.items():
+    if len(value.shape) not in [1, 2]:
+      raise IOError('Samples file "{}": variable "{}" should have shape (samples,) or (samples, entries), but has shape {}!'.format(path, name, value.shape))
+  return samples
+
+def resultColumns(results):
+  """
+    Gets the output columns for the indicator results of a chunk of samples
+    @ In, results, dict, indicator: np.array with one entry (or row, for several NPV_mult targets) per sample
+    @ Out, columns, list, (column name, indicator, entry or None)
+  """
+  columns = []
+  for indicator in INDICATORS:
+    if indicator not in results:
+      continue
+    value = np.asarray(results[indicator])
+    if value.ndim > 1:
+      columns.extend(('{}[{}]'.format(indicator, i), indicator, i) for i in range(value.shape[1]))
+    else:
+      columns.append((indicator, indicator, None))
+  return columns
+
+def openResultWriter(path):
+  """
+    Opens a result writer, in the format given by the file extension (.npz, or CSV otherwise)
+    @ In, path, str, path to the output file
+    @ Out, writer, ResultWriter, the writer
+  """
+  if os.path.splitext(path)[1].lower() == '.npz':
+    return NpzResultWriter(path)
+  return CsvResultWriter(path)
+
+class ResultWriter:
+  """
+    Writes results as they come, one chunk of samples at a time, so memory doesn't grow with the number of samples.
+    Besides the indicators, the yearly FCFF and project cash flows of each sample can be written too.
+  """
+  def __init__(self, path):
+    """
+      Constructor.
+      @ In, path, str, path to the output file (overwritten)
+      @ Out, None
+    """
+    self.path = path
+    self.numSamples = 0
+
+  def write(self, results, details=None):
+    """
+      Writes the results of a chunk of samples
+      @ In, results, dict, indicator: np.array with one entry (or row, for several NPV_mult targets) per sample
+      @ In, details, dict, optional, {'FCFF': np.array, 'cashflows': {name: np.array}} of (samples x years) values
+      @ Out, None
+    """
+    self._write(results, details)
+    self.numSamples += len(np.asarray(next(iter(results.values()))))
+
+  def _write(self, results, details):
+    """
+      Writes the results of a chunk of samples, to be implemented by each format
+      @ In, results, dict, indicator: np.array with one entry (or row, for several NPV_mult targets) per sample
+      @ In, details, dict, {'FCFF': np.array, 'cashflows': {name: np.array}} of (samples x years) values, or None
+      @ Out, None
+    """
+    raise NotImplementedError
+
+  def close(self):
+    """
+      Finishes writing
+      @ In, None
+      @ Out, None
+    """
+    pass
+
+  def __enter__(self):
+    """
+      Context manager entry
+      @ In, None
+      @ Out, self, ResultWriter, this writer
+    """
+    return self
+
+  def __exit__(self, *exc):
+    """
+      Context manager exit, finishes writing
+      @ In, exc, tuple, exception information
+      @ Out, None
+    """
+    self.close()
+
+class CsvResultWriter(ResultWriter):
+  """
+    Writes the results to CSV files, with one row per sample: the indicators to the given file and,
+    if provided, the yearly FCFF to "<name>_FCFF.csv" and the project cash flows to "<name>_cashflows.csv"
+  """
+  def __init__(self, path):
+    """
+      Constructor.
+      @ In, path, str, path to the indicators CSV file (overwritten)
+      @ Out, None
+    """
+    ResultWriter.__init__(self, path)
+    self._tables = {} # table: (file, csv writer)
+
+  def _write(self, results, details):
+    """
+      Writes the results of a chunk of samples
+      @ In, results, dict, indicator: np.array with one entry (or row, for several NPV_mult targets) per sample
+      @ In, details, dict, {'FCFF': np.array, 'cashflows': {name: np.array}} of (samples x years) values, or None
+      @ Out, None
+    """
+    columns = resultColumns(results)
+    self._writeTable('indicators', [name for name, _, _ in columns],
+                     np.column_stack([np.asarray(results[indicator]) if entry is None else np.asarray(results[indicator])[:, entry]
+                                      for _, indicator, entry in columns]))
+    if details is not None:
+      fcff = details['FCFF']
+      self._writeTable('FCFF', ['FCFF[{}]'.format(y) for y in range(fcff.shape[1])], fcff)
+      cashflows = details['cashflows']
+      self._writeTable('cashflows', ['{}[{}]'.format(name, y) for name, value in cashflows.items() for y in range(value.shape[1])],
+                       np.hstack(list(cashflows.values())))
+
+  def _writeTable(self, table, header, rows):
+    """
+      Appends rows to one of the CSV files, creating it with its header on first use
+      @ In, table, str, which file ('indicators', 'FCFF' or 'cashflows')
+      @ In, header, list, column names
+      @ In, rows, np.array, values (samples x columns)
+      @ Out, None
+    """
+    if table not in self._tables:
+      if table == 'indicators':
+        path = self.path
+      else:
+        root, extension = os.path.splitext(self.path)
+        path = '{}_{}{}'.format(root, table, extension or '.csv')
+      out = open(path, 'w', newline='')
+      writer = csv.writer(out)
+      writer.writerow(header)
+      self._tables[table] = (out, writer)
+    self._tables[table][1].writerows(rows.tolist())
+
+  def close(self):
+    """
+      Closes the files
+      @ In, None
+      @ Out, None
+    """
+    for out, _ in self._tables.values():
+      out.close()
+    self._tables = {}
+
+class NpzResultWriter(ResultWriter):
+  """
+    Writes the results to a .npz archive, with one (samples,) or (samples x entries) array per indicator and,
+    if provided, "FCFF" and one array per project cash flow ("Component|CashFlow").
+    Until closed, each array is spooled to a temporary file; closing then copies them into the (uncompressed)
+    archive behind an .npy header, so the arrays can later be memory-mapped (see readSamplesNpz).
+  """
+  def __init__(self, path):
+    """
+      Constructor.
+      @ In, path, str, path to the .npz file (overwritten)
+      @ Out, None
+    """
+    ResultWriter.__init__(self, path)
+    self._spools = OrderedDict() # name: (temporary file, shape of one sample)
+
+  def _write(self, results, details):
+    """
+      Writes the results of a chunk of samples
+      @ In, results, dict, indicator: np.array with one entry (or row, for several NPV_mult targets) per sample
+      @ In, details, dict, {'FCFF': np.array, 'cashflows': {name: np.array}} of (samples x years) values, or None
+      @ Out, None
+    """
+    for indicator in INDICATORS:
+      if indicator in results:
+        self._append(indicator, results[indicator])
+    if details is not None:
+      self._append('FCFF', details['FCFF'])
+      for name, value in details['cashflows'].items():
+        self._append(name, value)
+
+  def _append(self, name, value):
+    """
+      Appends the values of a chunk of samples to an array
+      @ In, name, str, array name
+      @ In, value, np.array, values (samples,) or (samples x entries)
+      @ Out, None
+    """
+    value = np.ascontiguousarray(value, dtype=float)
+    if name not in self._spools:
+      self._spools[name] = (tempfile.TemporaryFile(), value.shape[1:])
+    spool, shape = self._spools[name]
+    if value.shape[1:] != shape:
+      raise IOError('Result "{}" changed shape from {} to {} per sample!'.format(name, shape, value.shape[1:]))
+    spool.write(value.tobytes())
+
+  def close(self):
+    """
+      Builds the archive from the spooled arrays
+      @ In, None
+      @ Out, None
+    """
+    if not self._spools:
+      return
+    itemSize = np.dtype(float).itemsize
+    with zipfile.ZipFile(self.path, 'w', compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+      for name, (spool, shape) in self._spools.items():
+        numSamples = spool.tell() // (itemSize * int(np.prod(shape)))
+        header = {'descr': np.lib.format.dtype_to_descr(np.dtype(float)), 'fortran_order': False, 'shape': (numSamples,) + shape}
+        with archive.open(name + '.npy', 'w', force_zip64=True) as member:
+          np.lib.format.write_array_header_2_0(member, header)
+          spool.seek(0)
+          shutil.copyfileobj(spool, member)
+        spool.close()
+    self._spools = OrderedDict()
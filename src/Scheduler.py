@@ -0,0 +1,85 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+This module contains the ordering of the cash flow evaluations of TEAL.CashFlow plugin module
+
+Cash flows can be driven by other cash flows, so they have to be evaluated after them. The dependencies
+form a graph, given as {node: [nodes relying on it]}, which is sorted topologically (Kahn's algorithm).
+The nodes are also grouped in levels: each level only relies on the levels before it, so the nodes of
+a level don't depend on each other and can be evaluated together.
+"""
+
+def levels(graph):
+  """
+    Groups the nodes of a dependency graph in levels, each relying only on nodes of earlier levels.
+    Within a level, nodes keep the order in which they first appear in the graph.
+    @ In, graph, dict, {node: [nodes relying on node]}; nodes that only appear as relying on others are included
+    @ Out, levels, list, lists of nodes, in evaluation order
+  """
+  # every node, in order of appearance
+  nodes = dict.fromkeys(graph)
+  for relying in graph.values():
+    nodes.update(dict.fromkeys(relying))
+  dependencies = dict.fromkeys(nodes, 0)
+  for relying in graph.values():
+    for node in relying:
+      dependencies[node] += 1
+  level = list(node for node, count in dependencies.items() if count == 0)
+  grouped = []
+  while level:
+    grouped.append(level)
+    following = []
+    for node in level:
+      for relying in graph.get(node, ()):
+        dependencies[relying] -= 1
+        if dependencies[relying] == 0:
+          following.append(relying)
+    level = following
+  if sum(len(level) for level in grouped) < len(nodes):
+    cycle = findCycle(graph, set(node for node, count in dependencies.items() if count > 0))
+    raise RuntimeError('Circular dependency between cash flow drivers: {}'.format(' -> '.join(map(str, cycle))))
+  return grouped
+
+def topologicalSort(graph):
+  """
+    Orders the nodes of a dependency graph so each comes after the nodes it relies on
+    @ In, graph, dict, {node: [nodes relying on node]}; nodes that only appear as relying on others are included
+    @ Out, ordered, list, nodes in evaluation order, level by level (see levels)
+  """
+  return list(node for level in levels(graph) for node in level)
+
+def findCycle(graph, remaining):
+  """
+    Finds a dependency cycle among the nodes left over by the topological sort
+    @ In, graph, dict, {node: [nodes relying on node]}
+    @ In, remaining, set, nodes that couldn't be sorted; each relies on at least one other remaining node
+    @ Out, cycle, list, nodes of the cycle in dependency order, with the first one repeated at the end
+  """
+  # one remaining node each remaining node relies on
+  reliedOn = {}
+  for node, relying in graph.items():
+    if node in remaining:
+      for other in relying:
+        if other in remaining:
+          reliedOn.setdefault(other, node)
+  # walking back along the dependencies has to come around to a node already seen
+  path = []
+  position = {}
+  node = next(node for node in graph if node in remaining)
+  while node not in position:
+    position[node] = len(path)
+    path.append(node)
+    node = reliedOn[node]
+  cycle = path[position[node]:][::-1]
+  return cycle + cycle[:1]
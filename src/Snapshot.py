@@ -0,0 +1,156 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+This module contains the snapshots of the economics model of TEAL.CashFlow plugin module
+
+Reading and checking the <Economics> input, and compiling its evaluation plan, is the same for every job
+(and every worker) using that input. A snapshot keeps the outcome (global settings, components with their
+derived amortization cash flows, evaluation plan with the evaluation order) in a pickle file, along with a
+hash of the input it was taken from, so it is only used while the input doesn't change.
+Like any pickle, a snapshot file runs code when loaded, so only load snapshots written by TEAL itself.
+"""
+import os
+import pickle
+import hashlib
+import logging
+import tempfile
+import xml.etree.ElementTree as ET
+
+try:
+  from TEAL.src import main
+except (ImportError, ModuleNotFoundError):
+  import main
+
+logger = logging.getLogger('TEAL.Snapshot')
+logger.addHandler(logging.NullHandler())
+
+# change whenever the pickled classes change in a way older snapshots can't be loaded into
+SNAPSHOT_VERSION = 3
+
+def inputKey(econ):
+  """
+    Identifies an economics input, so a snapshot can tell if it was taken from it. The key only depends on
+    the content of the node, not on its layout, so the same input gives the same key in RAVEN and stand-alone.
+    @ In, econ, xml.etree.ElementTree.Element, <Economics> node
+    @ Out, key, str, hash of the input (and of the snapshot version)
+  """
+  digest = hashlib.blake2b(repr(_canonicalForm(econ)).encode(), digest_size=20)
+  digest.update(str(SNAPSHOT_VERSION).encode())
+  return digest.hexdigest()
+
+def _canonicalForm(node):
+  """
+    Describes an XML node by its content: tag, attributes (sorted) and text with its whitespace collapsed
+    (e.g. the indentation of lists spread over several lines), and its children in order; comments are left out.
+    @ In, node, xml.etree.ElementTree.Element, node
+    @ Out, form, tuple, nested description
+  """
+  children = tuple((_canonicalForm(child), ' '.join((child.tail or '').split())) for child in node if isinstance(child.tag, str))
+  return (node.tag, tuple(sorted(node.attrib.items())), ' '.join((node.text or '').split()), children)
+
+def save(path, key, settings, components, plan):
+  """
+    Writes a snapshot. The file is replaced at once, so other processes never read it partially written.
+    @ In, path, str, snapshot file
+    @ In, key, str, key of the input, from inputKey
+    @ In, settings, CashFlows.GlobalSettings, global settings (checked)
+    @ In, components, list, list of CashFlows.Component instances (checked)
+    @ In, plan, main.EvaluationPlan, plan compiled for settings and components
+    @ Out, None
+  """
+  # runs fill the memos of the plan, which only hold for that process
+  plan.lifetimeMemo.clear()
+  plan.projectMemo.clear()
+  plan.fcffMemo.clear()
+  plan.lastIrr = None
+  plan.timings = {}
+  snapshot = {'version': SNAPSHOT_VERSION, 'key': key, 'settings': settings, 'components': components, 'plan': plan}
+  directory = os.path.dirname(os.path.abspath(path))
+  handle, temp = tempfile.mkstemp(dir=directory, prefix='.teal_snapshot')
+  try:
+    with os.fdopen(handle, 'wb') as f:
+      pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp, path)
+  except BaseException:
+    os.remove(temp)
+    raise
+  logger.debug('Snapshot of the economics written to "%s"', path)
+
+def load(path, key):
+  """
+    Reads a snapshot, if there is one for the input
+    @ In, path, str, snapshot file
+    @ In, key, str, key of the input, from inputKey
+    @ Out, loaded, tuple, (settings, components, plan) as provided to save, or None if the file is missing,
+                   unreadable or taken from another input
+  """
+  if not os.path.isfile(path):
+    return None
+  try:
+    with open(path, 'rb') as f:
+      snapshot = pickle.load(f)
+  except Exception as error:
+    # e.g. written by a TEAL version whose classes changed since
+    logger.warning('Ignoring unreadable snapshot "%s": %s', path, error)
+    return None
+  if not isinstance(snapshot, dict) or snapshot.get('version') != SNAPSHOT_VERSION or snapshot.get('key') != key:
+    logger.debug('Snapshot "%s" was taken from another input, ignoring it', path)
+    return None
+  settings = snapshot['settings']
+  components = snapshot['components']
+  plan = snapshot['plan']
+  # the plan refers to the (loaded) settings and components by identity
+  plan.signature = main.planSignature(settings, components)
+  logger.debug('Economics loaded from snapshot "%s"', path)
+  return settings, components, plan
+
+def readFromXml(xml, path):
+  """
+    Reads the economics from the snapshot, if it was taken from the same input, otherwise from the XML
+    @ In, xml, xml.etree.ElementTree.Element, root node with the "Economics" node, as for main.readFromXml
+    @ In, path, str, snapshot file
+    @ Out, settings, CashFlows.GlobalSettings, global settings
+    @ Out, components, list, list of CashFlows.Component instances
+    @ Out, plan, main.EvaluationPlan, evaluation plan, None if not read from the snapshot (then the settings
+                 and components still have to be checked, and the plan compiled and saved)
+    @ Out, key, str, key of the input, for save
+  """
+  econ = xml.find('Economics')
+  key = inputKey(econ)
+  loaded = load(path, key)
+  if loaded is None:
+    return main.readFromXml(xml) + (None, key)
+  settings, components, plan = loaded
+  # as when reading the input (see main.readFromXml)
+  if 'verbosity' in econ.attrib:
+    main.setVerbosity(int(econ.attrib['verbosity']))
+  return settings, components, plan, key
+
+def readFromFile(xmlPath, path):
+  """
+    Reads the economics from the snapshot, if it was taken from the same input file, otherwise from the file.
+    The input is keyed like in readFromXml, so RAVEN and stand-alone runs share snapshots.
+    @ In, xmlPath, str, XML file with an <Economics> node (as root or anywhere below it), as for main.readFromFile
+    @ In, path, str, snapshot file
+    @ Out, settings, CashFlows.GlobalSettings, global settings
+    @ Out, components, list, list of CashFlows.Component instances
+    @ Out, plan, main.EvaluationPlan, evaluation plan, None if not read from the snapshot
+    @ Out, key, str, key of the input, for save
+  """
+  econ = next(ET.parse(xmlPath).getroot().iter('Economics'), None)
+  if econ is None:
+    raise IOError('No <Economics> node found in "{}"!'.format(xmlPath))
+  xml = ET.Element('ROOT')
+  xml.append(econ)
+  return readFromXml(xml, path)
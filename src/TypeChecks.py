@@ -0,0 +1,54 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+This module contains the checks on the types of values used by TEAL.CashFlow plugin module
+
+They follow the checks of RAVEN's mathUtils, without needing RAVEN: numbers include NumPy numbers,
+NaN and inf, but not booleans.
+"""
+import numpy as np
+
+def isAString(value):
+  """
+    Checks if a value is a string
+    @ In, value, object, value to check
+    @ Out, isAString, bool, result
+  """
+  return isinstance(value, str)
+
+def isABoolean(value):
+  """
+    Checks if a value is a boolean
+    @ In, value, object, value to check
+    @ Out, isABoolean, bool, result
+  """
+  return isinstance(value, (bool, np.bool_))
+
+def isAFloatOrInt(value):
+  """
+    Checks if a value is a single number (float or integer, NaN and inf included, booleans excluded)
+    @ In, value, object, value to check
+    @ Out, isAFloatOrInt, bool, result
+  """
+  return isinstance(value, (int, float, np.number)) and not isinstance(value, bool)
+
+def isSingleValued(value):
+  """
+    Checks if a value is a single entry: a number, boolean, string or None (zero-d arrays included)
+    @ In, value, object, value to check
+    @ Out, isSingleValued, bool, result
+  """
+  if isinstance(value, np.ndarray) and value.shape == ():
+    value = value.item()
+  return isAFloatOrInt(value) or isABoolean(value) or isAString(value) or value is None
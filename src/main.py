@@ -17,24 +17,37 @@
 Execution for TEAL (Tool for Economic AnaLysis)
 """
 
-import os
+import time
+# time taken to import TEAL (see importTime, at the end of this module)
+_importStart = time.perf_counter()
 import sys
+import hashlib
+import logging
 import functools
+import contextlib
 from collections import defaultdict
+import xml.etree.ElementTree as ET
 
 import numpy as np
 try:
   from TEAL.src import CashFlows
+  from TEAL.src import IrrSolver
+  from TEAL.src import Discounting
+  from TEAL.src import Profiling
+  from TEAL.src import Scheduler
+  from TEAL.src import TypeChecks
   # NOTE this import exception is ONLY to allow RAVEN to directly import this extmod.
   # In general, this should not exist, and RAVEN should import TEAL.CashFlow instead of importing Teal directly, implicitly.
 except (ImportError, ModuleNotFoundError):
   import CashFlows
+  import IrrSolver
+  import Discounting
+  import Profiling
+  import Scheduler
+  import TypeChecks
 
-raven_path= os.path.abspath(os.path.dirname(__file__)) + '/../../raven/framework'
-sys.path.append(raven_path) #'~/projects/raven/framework') # TODO generic RAVEN location
-
-from utils.graphStructure import graphObject
-from utils import mathUtils as utils
+logger = logging.getLogger('TEAL.main')
+logger.addHandler(logging.NullHandler())
 
 #=====================
 # UTILITIES
@@ -46,23 +59,92 @@ def readFromXml(xml):
     @ Out, globalSettings, CashFlows.GlobalSettings instance, settings for a run (None if none provided)
     @ Out, components, list, CashFlows.Components instances for a run
   """
+  econ = xml.find('Economics')
+  return _readEconomics(econ.attrib, econ, xml.attrib)
+
+def readFromFile(path):
+  """
+    reads in cash flow from an XML file, without holding the whole file in memory: each node under
+    <Economics> is read as soon as it is parsed, then dropped.
+    @ In, path, str, XML file with an <Economics> node (as root or anywhere below it)
+    @ Out, globalSettings, CashFlows.GlobalSettings instance, settings for a run (None if none provided)
+    @ Out, components, list, CashFlows.Components instances for a run
+  """
+  def economicsNodes(events):
+    """
+      Provides the complete nodes under <Economics> as they are parsed
+      @ In, events, iterator, (event, element) from ET.iterparse, for 'start' and 'end'
+      @ Out, nodes, generator, direct children of <Economics>
+    """
+    depth = 0 # below <Economics>
+    for event, elem in events:
+      if event == 'start':
+        depth += 1
+        continue
+      depth -= 1
+      if depth == 0:
+        yield elem
+        # done with it, free the memory
+        econ.remove(elem)
+      elif depth < 0:
+        # end of <Economics>
+        return
+  events = ET.iterparse(path, events=('start', 'end'))
+  econ = None
+  for event, elem in events:
+    if event == 'start' and elem.tag == 'Economics':
+      econ = elem
+      break
+  if econ is None:
+    raise IOError('No <Economics> node found in "{}"!'.format(path))
+  return _readEconomics(econ.attrib, economicsNodes(events), {})
+
+def _readEconomics(econAttrib, nodes, attr):
+  """
+    reads in cash flow from the nodes under <Economics>. All the nodes are checked before reporting
+    the problems found, so a large input only needs to be fixed once.
+    @ In, econAttrib, dict, attributes of the <Economics> node
+    @ In, nodes, iterable, xml.etree.ElementTree.Element nodes under <Economics>
+    @ In, attr, dict, keyword arguments for the settings and components
+    @ Out, globalSettings, CashFlows.GlobalSettings instance, settings for a run (None if none provided)
+    @ Out, components, list, CashFlows.Components instances for a run
+  """
   # read in XML to global settings, component list
-  attr = xml.attrib
   globalSettings = None
   components = []
-  econ = xml.find('Economics')
-  verb = int(econ.attrib.get('verbosity', 100))
-  for node in econ:
+  errors = []
+  verb = int(econAttrib.get('verbosity', 100))
+  if 'verbosity' in econAttrib:
+    setVerbosity(verb)
+  for node in nodes:
     if node.tag == 'Global':
-      globalSettings = CashFlows.GlobalSettings(**attr)
-      globalSettings.readInput(node)
-      globalSettings._verbosity = verb
+      new = CashFlows.GlobalSettings(**attr)
     elif node.tag == 'Component':
       new = CashFlows.Component(**attr)
-      new.readInput(node)
-      components.append(new)
     else:
-      raise IOError('Unrecognized node under <Economics>: {}'.format(node.tag))
+      errors.append('Unrecognized node under <Economics>: {}'.format(node.tag))
+      continue
+    # the specs are only built once, see CashFlows.cachedInputSpecs
+    specs = CashFlows.cachedInputSpecs(type(new))()
+    nodeErrors = []
+    try:
+      specs.parseNode(node, errorList=nodeErrors)
+      if not nodeErrors:
+        new.readInput(specs)
+    except (IOError, ValueError, TypeError) as error:
+      nodeErrors.append(str(error))
+    if nodeErrors:
+      errors.append('<{}> "{}": {}'.format(node.tag, node.attrib.get('name', ''), '; '.join(nodeErrors)))
+      continue
+    if node.tag == 'Global':
+      globalSettings = new
+      globalSettings._verbosity = verb
+    else:
+      components.append(new)
+  if len(errors) == 1:
+    raise IOError(errors[0])
+  if errors:
+    raise IOError('{} nodes under <Economics> have problems:\n  '.format(len(errors)) + '\n  '.join(errors))
   return globalSettings, components
 
 def checkRunSettings(settings, components):
@@ -105,47 +187,48 @@ def checkDrivers(settings, components, variables, v=100):
   #active = _get_active_drivers(settings, components)
   active = list(comp for comp in components if comp.name in settings.getActiveComponents())
   vprint(v, 0, m, '... creating evaluation sequence ...')
-  ordered = _createEvalProcess(active, variables)
-  vprint(v, 0, m, '... evaluation sequence:', ordered)
+  ordered = list(cfn for level in _createEvalProcess(active, variables) for cfn in level)
+  vprint(v, 0, m, '... evaluation sequence: %s', ordered)
   return ordered
 
 def _createEvalProcess(components, variables):
   """
     Sorts the cashflow evaluation process so sensible evaluation order is used
     @ In, components, list, list of CashFlows.Component instances
-    @ In, variables, dict, variable-value map from RAVEN
-    @ Out, ordered, list, list of ordered cashflows to evaluate (in order)
+    @ In, variables, dict, variable-value map from RAVEN (None if not known yet, see compilePlan)
+    @ Out, levels, list, lists of 'Component|CashFlow' names, each only driven by cash flows of earlier lists
   """
-  # TODO does this work with float drivers (e.g. already-evaluated drivers)?
-  # storage for creating graph sequence
-  driverGraph = defaultdict(list)
-  driverGraph['EndNode'] = []
-  evaluated = [] # for cashflows that have already been evaluated and don't need more treatment
+  # cross-referenced drivers are looked up by name
+  compByName = {}
+  for comp in components:
+    compByName.setdefault(comp.name, comp)
+  cashflowNames = dict((name, set(cf.name for cf in comp.getCashflows())) for name, comp in compByName.items())
+  # cash flow graph, as {cash flow: [cash flows it drives]}
+  driverGraph = {}
   for comp in components:
     lifetime = comp.getLifetime()
     # find multiplier variables
     multipliers = comp.getMultipliers()
     for mult in multipliers:
-      if mult is None:
+      if mult is None or variables is None:
         continue
       if mult not in variables.keys():
         raise RuntimeError('CashFlow: multiplier "{}" required for Component "{}" but not found among variables!'.format(mult, comp.name))
     # find order in which to evaluate cash flow components
     for c, cf in enumerate(comp.getCashflows()):
-      # keys for graph are drivers, cash flow names
       driver = cf.getParam('driver')
       # does the driver come from the variable list, or from another cashflow, or is it already evaluated?
       cfn = '{}|{}'.format(comp.name, cf.name)
-      found = False
-      if driver is None or utils.isAFloatOrInt(driver) or isinstance(driver, np.ndarray):
-        found = True
+      driverGraph.setdefault(cfn, [])
+      if driver is None or TypeChecks.isAFloatOrInt(driver) or isinstance(driver, np.ndarray):
         # TODO assert it's already filled?
-        evaluated.append(cfn)
         continue
-      elif driver in variables:
-        found = True
-        # check length of driver
-        n = len(np.atleast_1d(variables[driver]))
+      elif variables is None and '|' not in driver:
+        # variables are not known yet, so this driver is checked for each run (see EvaluationPlan)
+        continue
+      elif variables is not None and driver in variables:
+        # check length of driver (the last axis is the lifetime; a leading axis would be the samples of a batch)
+        n = np.atleast_1d(variables[driver]).shape[-1]
         if n > 1 and n != lifetime+1:
           raise RuntimeError(('Component "{c}" TEAL {cf} driver variable "{d}" has "{n}" entries, '+\
                               'but "{c}" has a lifetime of {el}!')
@@ -154,36 +237,24 @@ def _createEvalProcess(components, variables):
                                      d=driver,
                                      n=n,
                                      el=lifetime))
-      else:
-        # driver should be in cash flows if not in variables
-        driverComp, driverCf = driver.split('|')
-        for matchComp in components:
-          if matchComp.name == driverComp:
-            # for cross-referencing, component lifetimes have to be the same!
-            if matchComp.getLifetime() != comp.getLifetime():
-              raise RuntimeError(('Lifetimes for Component "{d}" and cross-referenced Component {m} ' +\
-                                  'do not match, so no cross-reference possible!')
-                                 .format(d=driverComp, m=matchComp.name))
-            found = True # here this means that so far the component was found, not the specific cash flow.
-            break
-        else:
-          found = False
-        # if the component was found, check the cash flow is part of the component
-        if found:
-          if driverCf not in list(m_cf.name for m_cf in matchComp.getCashflows()):
-            found = False
-      if not found:
+        continue
+      # driver should be in cash flows if not in variables
+      driverComp, _, driverCf = driver.partition('|')
+      matchComp = compByName.get(driverComp)
+      # for cross-referencing, component lifetimes have to be the same!
+      if matchComp is not None and matchComp.getLifetime() != comp.getLifetime():
+        raise RuntimeError(('Lifetimes for Component "{d}" and cross-referenced Component {m} ' +\
+                            'do not match, so no cross-reference possible!')
+                           .format(d=driverComp, m=matchComp.name))
+      if matchComp is None or driverCf not in cashflowNames[driverComp]:
         raise RuntimeError(('Component "{c}" TEAL {cf} driver variable "{d}" was not found ' +\
                             'among variables or other cashflows!')
                            .format(c=comp.name,
                                    cf=cf.name,
                                    d=driver))
-
-      # assure each cashflow is in the mix, and has an EndNode to rely on (helps graph construct accurately)
-      driverGraph[cfn].append('EndNode')
-      # each driver depends on its cashflow
-      driverGraph[driver].append(cfn)
-  return evaluated + graphObject(driverGraph).createSingleListOfVertices()
+      # each driving cash flow is evaluated before the cash flows it drives
+      driverGraph.setdefault(driver, []).append(cfn)
+  return Scheduler.levels(driverGraph)
 
 def componentLifeCashflow(comp, cf, variables, lifetimeCashflows, v=100):
   """
@@ -196,49 +267,52 @@ def componentLifeCashflow(comp, cf, variables, lifetimeCashflows, v=100):
   """
   m = 'compLife'
   vprint(v, 1, m, "-"*75)
-  print('DEBUGG comp:', comp.name, cf)
-  vprint(v, 1, m, 'Computing LIFETIME cash flow for Component "{}" CashFlow "{}" ...'.format(comp.name, cf.name))
+  vprint(v, 1, m, 'Computing LIFETIME cash flow for Component "%s" CashFlow "%s" ...', comp.name, cf.name)
   paramText = '... {:^10.10s}: {: 1.9e}'
+  # the summaries below are costly, so only build them (and have the cash flow keep its parts) if they'll be shown
+  summarize = v < 1 and logger.isEnabledFor(logLevel(1))
   # do cashflow
-  results = cf.calculateCashflow(variables, lifetimeCashflows, comp.getLifetime()+1, v)
+  results = cf.calculateCashflow(variables, lifetimeCashflows, comp.getLifetime()+1, v if summarize else 100)
   lifeCashflow = results['result']
 
-  if v < 1:
+  if summarize:
     # print out all of the parts of the cashflow calc
     for item, value in results.items():
       if item == 'result':
         continue
-      if utils.isAFloatOrInt(value):
-        vprint(v, 1, m, paramText.format(item, value))
+      if TypeChecks.isAFloatOrInt(value):
+        vprint(v, 1, m, '%s', paramText.format(item, value))
       else:
-        orig = cf.getParam(item)
-        if utils.isSingleValued(orig):
+        orig = cf.getMultiplier() if item == 'mult' else cf.getParam(item)
+        if TypeChecks.isSingleValued(orig):
           name = orig
         else:
           name = '(from input)'
-        vprint(v, 1, m, '... {:^10.10s}: {}'.format(item, name))
-        vprint(v, 1, m, '...           mean: {: 1.9e}'.format(value.mean()))
-        vprint(v, 1, m, '...           std : {: 1.9e}'.format(value.std()))
-        vprint(v, 1, m, '...           min : {: 1.9e}'.format(value.min()))
-        vprint(v, 1, m, '...           max : {: 1.9e}'.format(value.max()))
-        vprint(v, 1, m, '...           nonz: {:d}'.format(np.count_nonzero(value)))
+        vprint(v, 1, m, '%s', '... {:^10.10s}: {}'.format(item, name))
+        vprint(v, 1, m, '%s', '...           mean: {: 1.9e}'.format(value.mean()))
+        vprint(v, 1, m, '%s', '...           std : {: 1.9e}'.format(value.std()))
+        vprint(v, 1, m, '%s', '...           min : {: 1.9e}'.format(value.min()))
+        vprint(v, 1, m, '%s', '...           max : {: 1.9e}'.format(value.max()))
+        vprint(v, 1, m, '%s', '...           nonz: {:d}'.format(np.count_nonzero(value)))
 
+  # the yearly summary is only meaningful for a single sample
+  if summarize and np.ndim(lifeCashflow) == 1 and logger.isEnabledFor(logLevel(0)):
     yx = max(len(str(len(lifeCashflow))),4)
     vprint(v, 0, m, 'LIFETIME cash flow summary by year:')
-    vprint(v, 0, m, '    {y:^{yx}.{yx}s}, {a:^10.10s}, {d:^10.10s}, {c:^15.15s}'.format(y='year',
+    vprint(v, 0, m, '%s', '    {y:^{yx}.{yx}s}, {a:^10.10s}, {d:^10.10s}, {c:^15.15s}'.format(y='year',
                                                                                         yx=yx,
                                                                                         a='alpha',
                                                                                         d='driver',
                                                                                         c='cashflow'))
     for y, cash in enumerate(lifeCashflow):
       if cf.type in ['Capex']:
-        vprint(v, 1, m, '    {y:^{yx}d}, {a: 1.3e}, {d: 1.3e}, {c: 1.9e}'.format(y=y,
+        vprint(v, 1, m, '%s', '    {y:^{yx}d}, {a: 1.3e}, {d: 1.3e}, {c: 1.9e}'.format(y=y,
                                                                                  yx=yx,
                                                                                  a=results['alpha'][y],
                                                                                  d=results['driver'][y],
                                                                                  c=cash))
       elif cf.type == 'Recurring':
-        vprint(v, 1, m, '    {y:^{yx}d}, -- N/A -- , -- N/A -- , {c: 1.9e}'.format(y=y,
+        vprint(v, 1, m, '%s', '    {y:^{yx}d}, -- N/A -- , -- N/A -- , {c: 1.9e}'.format(y=y,
                                                            yx=yx,
                                                            c=cash))
   return lifeCashflow
@@ -259,7 +333,7 @@ def getProjectLength(settings, components, v=100):
     projectLength = lcmm(*lifetimes) + 1
   return int(projectLength)
 
-def projectLifeCashflows(settings, components, lifetimeCashflows, projectLength, v=100):
+def projectLifeCashflows(settings, components, lifetimeCashflows, projectLength, v=100, plan=None, profiler=None):
   """
     creates all cashflows for life of project, for all components
     @ In, settings, CashFlows.GlobalSettings, global settings
@@ -267,9 +341,38 @@ def projectLifeCashflows(settings, components, lifetimeCashflows, projectLength,
     @ In, lifetimeCashflows, dict, component: cashflow: np.array of annual economic values
     @ In, projectLength, int, project years
     @ In, v, int, verbosity level
+    @ In, plan, EvaluationPlan, optional, if provided then use its precomputed expansions and factors
+    @ In, profiler, Profiling.Profiler, optional, if provided then time each component and count the arrays created
     @ Out, projectCashflows, dict, dictionary of project-length cashflows (same structure as lifetime dict)
   """
   m = 'proj_life'
+  if plan is not None:
+    projectCashflows = defaultdict(dict)
+    for comp, cashflows, expansion, factors in plan.projection:
+      lifeCfs = tuple(lifetimeCashflows[comp.name][cf.name] for cf in cashflows)
+      # components whose lifetime cash flows were all reused (see EvaluationPlan.lifetimeMemo) keep their project cash flows
+      # (the ones that can't be memoized, e.g. filled intrayear, can change in place, so these are always projected again)
+      memo = plan.projectMemo.get(comp.name)
+      if memo is not None and all(a is b for a, b in zip(memo[0], lifeCfs)) and \
+         all(plan.lifetimeMemo.get((comp.name, cf.name), (None,))[0] is not None for cf in cashflows):
+        vprint(v, 0, m, 'Lifetime cash flows unchanged, reusing project cash flows for Component "%s"', comp.name)
+        projectCashflows[comp.name] = memo[1]
+        if profiler is not None:
+          profiler.count('components reused')
+        continue
+      with profiler.item('components', comp.name, 'project') if profiler is not None else contextlib.nullcontext():
+        # expand all cash flows of the component (and all samples) at once
+        projCfs = expansion.apply(np.stack(np.broadcast_arrays(*lifeCfs)))
+        projCfs *= factors.reshape((len(cashflows),) + (1,) * (projCfs.ndim - 2) + (projectLength,))
+      if profiler is not None:
+        profiler.count('components projected')
+        profiler.countArray(projCfs)
+      # shared with later runs, so keep it from being changed
+      projCfs.setflags(write=False)
+      for cf, projCf in zip(cashflows, projCfs):
+        projectCashflows[comp.name][cf.name] = projCf
+      plan.projectMemo[comp.name] = (lifeCfs, projectCashflows[comp.name])
+    return projectCashflows
   # apply tax, inflation
   projectCashflows = {} # same keys as lifetimeCashflows
   for comp in components:
@@ -292,8 +395,34 @@ def projectComponentCashflows(comp, tax, inflation, lifeCashflows, projectLength
   """
   m = 'proj comp'
   vprint(v, 1, m, "-"*75)
-  vprint(v, 1, m, 'Computing PROJECT cash flow for Component "{}" ...'.format(comp.name))
+  vprint(v, 1, m, 'Computing PROJECT cash flow for Component "%s" ...', comp.name)
   cashflows = {}
+  compStart, compEnd, compLife = componentSchedule(comp, projectLength)
+  vprint(v, 1, m, ' ... component start: %s', compStart)
+  vprint(v, 1, m, ' ... component end:   %s', compEnd)
+  for cf in comp.getCashflows():
+    taxMult, inflRate = cashflowFactors(cf, tax, inflation)
+    vprint(v, 1, m, ' ... inflation rate: %s', inflRate)
+    vprint(v, 1, m, ' ... tax rate: %s', taxMult)
+    lifeCf = lifeCashflows[cf.name]
+    single_cashflow = projectSingleCashflow(cf, compStart, compEnd, compLife, lifeCf, taxMult, inflRate, projectLength, v=v)
+    vprint(v, 0, m, 'Project Cashflow for Component "%s" CashFlow "%s":', comp.name, cf.name)
+    if v < 1 and single_cashflow.ndim == 1 and logger.isEnabledFor(logLevel(0)):
+      vprint(v, 0, m, 'Year, Time-Adjusted Value')
+      for y, val in enumerate(single_cashflow):
+        vprint(v, 0, m, '%s', '{:4d}: {: 1.9e}'.format(y, val))
+    cashflows[cf.name] = single_cashflow
+  return cashflows
+
+def componentSchedule(comp, projectLength):
+  """
+    Determines when a component operates during the project
+    @ In, comp, CashFlows.Component, component to run numbers for
+    @ In, projectLength, int, project years
+    @ Out, compStart, int, project year in which component begins operating
+    @ Out, compEnd, int, project year in which component ends operating
+    @ Out, compLife, int, lifetime of component
+  """
   # what is the first project year this component will be in existence?
   compStart = comp.getStartTime()
   # how long does each build of this component last?
@@ -302,47 +431,42 @@ def projectComponentCashflows(comp, tax, inflation, lifeCashflows, projectLength
   ## TODO will this work properly if start time is negative? Initial tests say yes ...
   ## note that we use projectLength as the default END of the component's cashflow life, NOT a decomission year!
   compEnd = projectLength if comp.getRepetitions() == 0 else compStart + compLife * comp.getRepetitions()
-  vprint(v, 1, m, ' ... component start: {}'.format(compStart))
-  vprint(v, 1, m, ' ... component end:   {}'.format(compEnd))
-  for cf in comp.getCashflows():
-    if cf.isTaxable():
-      taxMult = 1.0 - tax
-    else:
-      taxMult = 1.0
-    if cf.isInflated():
-      inflRate = inflation + 1.0
-    else:
-      inflRate = 1.0 # TODO nominal inflation rate?
-    vprint(v, 1, m, ' ... inflation rate: {}'.format(inflRate))
-    vprint(v, 1, m, ' ... tax rate: {}'.format(taxMult))
-    lifeCf = lifeCashflows[cf.name]
-    single_cashflow = projectSingleCashflow(cf, compStart, compEnd, compLife, lifeCf, taxMult, inflRate, projectLength, v=v)
-    vprint(v, 0, m, 'Project Cashflow for Component "{}" CashFlow "{}":'.format(comp.name, cf.name))
-    if v < 1:
-      vprint(v, 0, m, 'Year, Time-Adjusted Value')
-      for y, val in enumerate(single_cashflow):
-        vprint(v, 0, m, '{:4d}: {: 1.9e}'.format(y, val))
-    cashflows[cf.name] = single_cashflow
-  return cashflows
+  return compStart, compEnd, compLife
 
-def projectSingleCashflow(cf, start, end, life, lifeCf, taxMult, inflRate, projectLength, v=100):
+def cashflowFactors(cf, tax, inflation):
   """
-    does a single cashflow for the life of the project
-    @ In, cf, CashFlows.CashFlow, cash flow to extend to full project life
+    Determines the tax and inflation multipliers for a cash flow
+    @ In, cf, CashFlows.CashFlow, cash flow to get factors for
+    @ In, tax, float, tax rate for component as decimal
+    @ In, inflation, float, inflation rate as decimal
+    @ Out, taxMult, float, tax rate multiplyer (1 - tax)
+    @ Out, inflRate, float, inflation rate multiplier (1 + inflation)
+  """
+  if cf.isTaxable():
+    taxMult = 1.0 - tax
+  else:
+    taxMult = 1.0
+  if cf.isInflated():
+    inflRate = inflation + 1.0
+  else:
+    inflRate = 1.0 # TODO nominal inflation rate?
+  return taxMult, inflRate
+
+@functools.lru_cache(maxsize=256)
+def projectYearIndices(start, end, life, projectLength):
+  """
+    Determines which project years hold which year of the component lifetime.
+    These only depend on the arguments, so they're cached and shared by all cash flows (and samples)
+    of components with the same schedule; the returned arrays are read-only.
     @ In, start, int, project year in which component begins operating
     @ In, end, int, project year in which component ends operating
     @ In, life, int, lifetime of component
-    @ In, lifeCf, np.array, cashflow for lifetime of component
-    @ In, taxMult, float, tax rate multiplyer (1 - tax)
-    @ In, inflRate, float, inflation rate multiplier (1 - inflation)
     @ In, projectLength, int, total years of analysis
-    @ In, v, int, verbosity
-    @ Out, projCf, np.array, cashflow for project life of component
+    @ Out, newBuildYears, np.array, project years with a (re)build of the component
+    @ Out, decomissionYears, np.array, project years with a decomissioning of the component
+    @ Out, nonBuildYears, np.array, project years with regular operation of the component
+    @ Out, nonBuildLife, np.array, lifetime year of the component in each of the nonBuildYears
   """
-  m = 'proj c_fl'
-  vprint(v, 1, m, "-"*50)
-  vprint(v, 1, m, 'Computing PROJECT cash flow for CashFlow "{}" ...'.format(cf.name))
-  projCf = np.zeros(projectLength)
   years = np.arange(projectLength) # years in project time, year 0 is first year # TODO just indices, pandas?
   # before the project starts, after it ends are zero; we want the working part
   operatingMask = np.logical_and(years >= start, years <= end)
@@ -356,83 +480,303 @@ def projectSingleCashflow(cf, start, end, life, lifeCf, taxMult, inflRate, proje
   ### 2) decomission after last year ever running (assuming said decomission is inside the operational years)
   ### 3) years with both a decomissioning and a construction
   ## this is all years in which construction will occur (covers 1 and half of 3)
-  newBuildMask = [a[relativeOperation==0] for a in np.where(operatingMask)]
-  # NOTE make the decomissionMask BEFORE removing the last-year-rebuild, if present.
+  newBuildYears = operatingYears[relativeOperation==0]
+  # NOTE make the decomissionYears BEFORE removing the last-year-rebuild, if present.
   ## This lets us do smoother numpy operations.
-  decomissionMask = [newBuildMask[0][1:]]
+  decomissionYears = newBuildYears[1:]
   # if the last year is a rebuild year, don't rebuild, as it won't be operated.
-  if newBuildMask[0][-1] == years[-1]:
-    newBuildMask[0] = newBuildMask[0][:-1]
-  ## add construction costs for all of these new build years
-  projCf[newBuildMask] = lifeCf[0] * taxMult * np.power(inflRate, -1*years[newBuildMask])
-  #print(projCf)
+  if newBuildYears[-1] == years[-1]:
+    newBuildYears = newBuildYears[:-1]
   ## this is all the years in which decomissioning happens
-  ### note that the [0] index is sort of a dummy dimension to help the numpy handshakes
   ### if last decomission is within project life, include that too
   if operatingYears[-1] < years[-1]:
-    decomissionMask[0] = np.hstack((decomissionMask[0],np.atleast_1d(operatingYears[-1]+1)))
-  projCf[decomissionMask] += lifeCf[-1] * taxMult * np.power(inflRate, -1*years[decomissionMask])
-  #print(projCf)
+    decomissionYears = np.hstack((decomissionYears, np.atleast_1d(operatingYears[-1]+1)))
   ## handle the non-build operational years
-  nonBuildMask = [a[relativeOperation!=0] for a in np.where(operatingMask)]
-  projCf[nonBuildMask] += lifeCf[relativeOperation[relativeOperation!=0]] * taxMult * np.power(inflRate, -1*years[nonBuildMask])
+  nonBuildYears = operatingYears[relativeOperation!=0]
+  nonBuildLife = relativeOperation[relativeOperation!=0]
+  indices = (newBuildYears, decomissionYears, nonBuildYears, nonBuildLife)
+  for array in indices:
+    array.setflags(write=False)
+  return indices
+
+class ProjectExpansion:
+  """
+    Linear map from a component lifetime cash flow (life + 1 entries) to the project life (projectLength entries),
+    repeating the builds, operation and decomissioning according to the component schedule.
+    It's kept in sparse (index array) form: each project year takes at most one entry of the lifetime cash flow,
+    plus the decomissioning entry in years in which a build is decomissioned.
+  """
+  def __init__(self, start, end, life, projectLength):
+    """
+      Constructor.
+      @ In, start, int, project year in which component begins operating
+      @ In, end, int, project year in which component ends operating
+      @ In, life, int, lifetime of component
+      @ In, projectLength, int, total years of analysis
+      @ Out, None
+    """
+    newBuildYears, decomissionYears, nonBuildYears, nonBuildLife = projectYearIndices(start, end, life, projectLength)
+    self.lifetime = life + 1
+    self.projectLength = projectLength
+    # lifetime entry taken by each project year (new builds take entry 0)
+    self._lifeIndex = np.zeros(projectLength, dtype=int)
+    self._lifeIndex[nonBuildYears] = nonBuildLife
+    # project years outside of operation take nothing
+    operating = np.zeros(projectLength, dtype=bool)
+    operating[newBuildYears] = True
+    operating[nonBuildYears] = True
+    self._idleYears = np.flatnonzero(~operating)
+    # project years that also take the last (decomissioning) entry
+    self._decomissionYears = decomissionYears
+
+  def apply(self, lifeCf):
+    """
+      Expands lifetime cash flows to the project life
+      @ In, lifeCf, np.array, lifetime cash flows, with the lifetime as last axis (leading axes e.g. cash flows, samples)
+      @ Out, projCf, np.array, project cash flows, with the project years as last axis
+    """
+    projCf = lifeCf[..., self._lifeIndex]
+    projCf[..., self._idleYears] = 0.0
+    projCf[..., self._decomissionYears] += lifeCf[..., -1:]
+    return projCf
+
+  def toMatrix(self):
+    """
+      Provides the dense form of the map, such that projCf = lifeCf @ matrix
+      @ In, None
+      @ Out, matrix, np.array, (life + 1) x projectLength matrix
+    """
+    matrix = np.zeros((self.lifetime, self.projectLength))
+    matrix[self._lifeIndex, np.arange(self.projectLength)] = 1.0
+    matrix[:, self._idleYears] = 0.0
+    matrix[-1, self._decomissionYears] += 1.0
+    return matrix
+
+@functools.lru_cache(maxsize=256)
+def projectExpansion(start, end, life, projectLength):
+  """
+    Provides the (cached) lifetime-to-project map for a component schedule
+    @ In, start, int, project year in which component begins operating
+    @ In, end, int, project year in which component ends operating
+    @ In, life, int, lifetime of component
+    @ In, projectLength, int, total years of analysis
+    @ Out, expansion, ProjectExpansion, lifetime-to-project map
+  """
+  return ProjectExpansion(start, end, life, projectLength)
+
+@functools.lru_cache(maxsize=256)
+def inflationFactors(inflRate, projectLength):
+  """
+    Determines the (cached, read-only) inflation factors for each project year
+    @ In, inflRate, float, inflation rate multiplier (1 + inflation)
+    @ In, projectLength, int, total years of analysis
+    @ Out, factors, np.array, inflation factor for each project year
+  """
+  factors = np.power(inflRate, -1*np.arange(projectLength))
+  factors.setflags(write=False)
+  return factors
+
+@functools.lru_cache(maxsize=256)
+def presentValueWeights(start, end, life, projectLength, rate):
+  """
+    Determines the weight of each entry of a lifetime cash flow in the present value of its project cash flow,
+    so that presentValue = sum(lifeCf * weights). Equivalent to discounting the ProjectExpansion of the
+    lifetime cash flow, but since the builds repeat every "life" years, the discount factors of all the project
+    years taking the same lifetime entry form a geometric series, which is summed in closed form.
+    Cached like projectYearIndices; the returned array is read-only.
+    @ In, start, int, project year in which component begins operating
+    @ In, end, int, project year in which component ends operating
+    @ In, life, int, lifetime of component
+    @ In, projectLength, int, total years of analysis
+    @ In, rate, float, combined yearly discount multiplier (1 + inflation) * (1 + discount rate)
+    @ Out, weights, np.array, weight of each of the life + 1 lifetime entries
+  """
+  logRate = np.log(rate)
+  def series(first, last, offset):
+    """
+      Sums rate^-(offset + k * life) for k from first to last (elementwise for arrays)
+      @ In, first, np.array, first repetition
+      @ In, last, np.array, last repetition
+      @ In, offset, np.array, project year of repetition 0
+      @ Out, series, np.array, sums
+    """
+    count = np.maximum(last - first + 1, 0)
+    lead = np.exp(-logRate * (offset + first * life))
+    if logRate == 0.0:
+      return lead * count
+    # (1 - x^n) / (1 - x) for x = rate^-life, written to stay accurate as x approaches 1
+    return lead * np.expm1(-logRate * life * count) / np.expm1(-logRate * life)
+  weights = np.zeros(life + 1)
+  # operating project years, as in projectYearIndices
+  first = max(start, 0)
+  last = min(end, projectLength - 1)
+  if first > last:
+    weights.setflags(write=False)
+    return weights
+  # regular operation: lifetime entry j is taken in project years start + j + k * life
+  j = np.arange(1, life)
+  weights[1:life] = series(-((start + j - first) // life), (last - start - j) // life, start + j)
+  # builds: lifetime entry 0 is taken in project years start + k * life ...
+  firstBuild = -((start - first) // life)
+  lastBuild = (last - start) // life
+  ## ... except if the last build is in the last project year, as it won't be operated
+  lastNewBuild = lastBuild - 1 if start + lastBuild * life == projectLength - 1 else lastBuild
+  weights[0] = series(firstBuild, lastNewBuild, start)
+  # decomissioning: the last lifetime entry is taken whenever a build is replaced ...
+  weights[life] += series(firstBuild + 1, lastBuild, start)
+  ## ... and in the year after operation ends, if that's still in the project
+  if last < projectLength - 1:
+    weights[life] += np.exp(-logRate * (last + 1))
+  weights.setflags(write=False)
+  return weights
+
+def lifetimePresentValues(settings, components, lifetimeCashflows, projectLength, v=100):
+  """
+    Calculates the present value of each cash flow straight from its lifetime cash flow (see presentValueWeights),
+    without creating the project-length cash flows.
+    @ In, settings, CashFlows.GlobalSettings, global settings
+    @ In, components, list, list of CashFlows.Component instances
+    @ In, lifetimeCashflows, dict, component: cashflow: np.array of annual economic values
+    @ In, projectLength, int, project years
+    @ In, v, int, verbosity level
+    @ Out, presentValues, dict, component: cashflow: present value (one per sample for a batch)
+  """
+  m = 'present values'
+  discount = 1.0 + settings.getDiscountRate()
+  presentValues = defaultdict(dict)
+  for comp in components:
+    tax = comp.getTax() if comp.getTax() is not None else settings.getTax()
+    inflation = comp.getInflation() if comp.getInflation() is not None else settings.getInflation()
+    schedule = componentSchedule(comp, projectLength)
+    for cf in comp.getCashflows():
+      taxMult, inflRate = cashflowFactors(cf, tax, inflation)
+      weights = presentValueWeights(*schedule, projectLength, inflRate * discount)
+      lifeCf = lifetimeCashflows[comp.name][cf.name]
+      presentValues[comp.name][cf.name] = taxMult * np.dot(lifeCf, weights)
+      vprint(v, 1, m, 'Present value of Component "%s" CashFlow "%s": %s', comp.name, cf.name, presentValues[comp.name][cf.name])
+  return presentValues
+
+def projectSingleCashflow(cf, start, end, life, lifeCf, taxMult, inflRate, projectLength, v=100, expansion=None):
+  """
+    does a single cashflow for the life of the project
+    @ In, cf, CashFlows.CashFlow, cash flow to extend to full project life
+    @ In, start, int, project year in which component begins operating
+    @ In, end, int, project year in which component ends operating
+    @ In, life, int, lifetime of component
+    @ In, lifeCf, np.array, cashflow for lifetime of component (samples x lifetime for a batch)
+    @ In, taxMult, float, tax rate multiplyer (1 - tax)
+    @ In, inflRate, float, inflation rate multiplier (1 - inflation)
+    @ In, projectLength, int, total years of analysis
+    @ In, v, int, verbosity
+    @ In, expansion, ProjectExpansion, optional, lifetime-to-project map for this component
+    @ Out, projCf, np.array, cashflow for project life of component (samples x project years for a batch)
+  """
+  m = 'proj c_fl'
+  vprint(v, 1, m, "-"*50)
+  vprint(v, 1, m, 'Computing PROJECT cash flow for CashFlow "%s" ...', cf.name)
+  if expansion is None:
+    expansion = projectExpansion(start, end, life, projectLength)
+  projCf = expansion.apply(lifeCf)
+  projCf *= taxMult * inflationFactors(inflRate, projectLength)
   return projCf
 
-def npvSearch(settings, components, cashFlows, projectLength, v=100):
+def npvSearch(settings, components, cashFlows, projectLength, v=100, presentValues=None):
   """
-    Performs NPV matching search
-    TODO is the target value required to be 0?
+    Performs NPV matching search, for all the NPV targets at once.
+    The cash flows are stacked in two matrices, the ones that include the multiplier and the others,
+    which are discounted with a single discount vector.
     @ In, settings, CashFlows.GlobalSettings, global settings
     @ In, components, list, list of CashFlows.Component instances
-    @ In, cashFlows, dict, component: cashflow: np.array of annual economic values
+    @ In, cashFlows, dict, component: cashflow: np.array of annual economic values (None if presentValues given)
     @ In, projectLength, int, project years
     @ In, v, int, verbosity level
-    @ Out, mult, float, multiplier that causes the NPV to match the target value
+    @ In, presentValues, dict, optional, component: cashflow: present value, instead of discounting cashFlows
+    @ Out, mult, float or np.array, multiplier that causes the NPV to match the target value (one per sample for a batch,
+                 and with a trailing axis of one per target if more than one target is requested)
   """
   m = 'npv search'
-  multiplied = 0.0 # cash flows that are meant to include the multiplier
-  others = 0.0 # cash flows without the multiplier
-  years = np.arange(projectLength)
+  source = cashFlows if presentValues is None else presentValues
+  multiplied = [] # cash flows that are meant to include the multiplier
+  others = [] # cash flows without the multiplier
   for comp in components:
     for cf in comp.getCashflows():
-      data = cashFlows[comp.name][cf.name]
-      discountRates = np.power(1.0 + settings.getDiscountRate(), years)
-      discounted = np.sum(data/discountRates)
-      if cf.isMultTarget():
-        multiplied += discounted
-      else:
-        others += discounted
+      (multiplied if cf.isMultTarget() else others).append(source[comp.name][cf.name])
+  if presentValues is None:
+    # an empty group stays a plain zero, as discounting it would give it a year axis instead of the sample shape
+    discount = Discounting.discountFactors(settings.getDiscountRate(), projectLength)
+    multiplied = np.dot(stackedSum(multiplied), discount) if multiplied else 0.0
+    others = np.dot(stackedSum(others), discount) if others else 0.0
+  else:
+    multiplied = stackedSum(multiplied)
+    others = stackedSum(others)
   targetVal = settings.getMetricTarget()
+  # per-sample values get a trailing target axis
+  multiplied = np.asarray(multiplied)[..., np.newaxis]
+  others = np.asarray(others)[..., np.newaxis]
   mult = (targetVal - others)/multiplied # TODO div zero possible?
-  vprint(v, 0, m, '... NPV multiplier: {: 1.9e}'.format(mult))
+  if len(targetVal) == 1:
+    mult = mult[..., 0]
+    if mult.ndim == 0:
+      mult = float(mult)
+  vprint(v, 0, m, '... NPV multiplier: %s', mult)
   # SANITY CHECL -> FCFF with the multiplier, re-calculate NPV
   if v < 1:
-    npv = NPV(components, cashFlows, projectLength, settings.getDiscountRate(), mult=mult, v=v)
-    if npv != targetVal:
-      vprint(v, 1, m, 'NPV mismatch warning! Calculated NPV with mult: {: 1.9e}, target: {: 1.9e}'.format(npv, targetVal))
+    npv = np.reshape(mult, multiplied.shape[:-1] + (-1,)) * multiplied + others
+    if np.any(npv != targetVal):
+      vprint(v, 1, m, 'NPV mismatch warning! Calculated NPV with mult: %s, target: %s', npv, targetVal)
   return mult
 
-def FCFF(components, cashFlows, projectLength, mult=None, v=100):
+def stackedSum(arrays):
+  """
+    Sums cash flows (or their present values) by stacking them in a matrix.
+    @ In, arrays, list, np.array or float, values to sum, possibly with different (broadcastable) shapes
+    @ Out, total, np.array or float, sum of the values (0.0 if no values)
+  """
+  if not arrays:
+    return 0.0
+  return np.sum(np.stack(np.broadcast_arrays(*arrays)), axis=0)
+
+def FCFF(components, cashFlows, projectLength, mult=None, v=100, plan=None):
   """
     Calculates "free cash flow to the firm" (FCFF)
     @ In, settings, CashFlows.GlobalSettings, global settings
     @ In, cashFlows, dict, component: cashflow: np.array of annual economic values
     @ In, projectLength, int, project years
-    @ In, mult, float, optional, if provided then scale target cash flow by value
+    @ In, mult, float or np.array, optional, if provided then scale target cash flow by value (one per sample)
     @ In, v, int, verbosity level
-    @ Out, fcff, float, free cash flow to the firm
+    @ In, plan, EvaluationPlan, optional, if provided then reuse the contributions of components whose
+                project cash flows didn't change since the previous run (see projectLifeCashflows)
+    @ Out, fcff, np.array, free cash flow to the firm (samples x years for a batch)
   """
   m = 'FCFF'
+  if plan is not None and mult is None:
+    # sum of the yearly contributions of each component, only adding up again the ones of changed components
+    fcff = np.zeros(projectLength)
+    for comp in components:
+      if not comp.getCashflows():
+        continue
+      compCashflows = cashFlows[comp.name]
+      memo = plan.fcffMemo.get(comp.name)
+      if memo is None or memo[0] is not compCashflows:
+        memo = (compCashflows, FCFF([comp], cashFlows, projectLength, v=100))
+        plan.fcffMemo[comp.name] = memo
+      fcff = fcff + memo[1]
+    vprint(v, 1, m, 'FCFF yearly (not discounted):\n%s', fcff)
+    return fcff
   # FCFF_R for each year
   fcff = np.zeros(projectLength)
+  if mult is not None:
+    # per-sample multipliers have to broadcast along the project years
+    mult = np.asarray(mult)[..., np.newaxis]
   for comp in components:
     for cf in comp.getCashflows():
       data = cashFlows[comp.name][cf.name]
+      # not in-place, since batched cash flows extend the shape by the sample axis
       if mult is not None and cf.isMultTarget():
-        fcff += data * mult
+        fcff = fcff + data * mult
       else:
-        fcff += data
-  vprint(v, 1, m, 'FCFF yearly (not discounted):\n{}'.format(fcff))
+        fcff = fcff + data
+  vprint(v, 1, m, 'FCFF yearly (not discounted):\n%s', fcff)
   return fcff
 
 def NPV(components, cashFlows, projectLength, discountRate, mult=None, v=100, returnFcff=False):
@@ -445,37 +789,44 @@ def NPV(components, cashFlows, projectLength, discountRate, mult=None, v=100, re
     @ In, mult, float, optional, if provided then scale target cash flow by value
     @ In, returnFcff, bool, optional, if True then provide calculated FCFF as well
     @ In, v, int, verbosity level
-    @ Out, npv, float, net-present value of system
-    @ Out, fcff, float, optional, free cash flow to the firm for same system
+    @ Out, npv, float or np.array, net-present value of system (one per sample for a batch)
+    @ Out, fcff, np.array, optional, free cash flow to the firm for same system
   """
   m = 'NPV'
   fcff = FCFF(components, cashFlows, projectLength, mult=mult, v=v)
-  npv = np.npv(discountRate, fcff)
-  vprint(v, 0, m, '... NPV: {: 1.9e}'.format(npv))
+  npv, _ = discountedIndicators(fcff, discountRate)
+  vprint(v, 0, m, '... NPV: %s', npv)
   if not returnFcff:
     return npv
   else:
     return npv, fcff
 
-def IRR(components, cashFlows, projectLength, v=100):
+def IRR(components, cashFlows, projectLength, v=100, guess=None, tol=IrrSolver.DEFAULT_TOL, returnStatus=False, fcff=None):
   """
     Calculates internal rate of return for system of cash flows
     @ In, components, list, list of CashFlows.Component instances
     @ In, cashFlows, dict, component: cashflow: np.array of annual economic values
     @ In, projectLength, int, project years
     @ In, v, int, verbosity level
-    @ Out, irr, float, internal rate of return
+    @ In, guess, float or np.array, optional, starting IRR, e.g. the one of the previous sample in a sweep
+                 (it only sets where the search starts, never which root is found, see IrrSolver.solve)
+    @ In, tol, float, optional, absolute tolerance on the IRR
+    @ In, returnStatus, bool, optional, if True then provide the IrrSolver diagnostic code as well
+    @ In, fcff, np.array, optional, free cash flow to the firm if already known (then cashFlows isn't used)
+    @ Out, irr, float or np.array, internal rate of return (one per sample for a batch), NaN if not found
+    @ Out, status, int or np.array, optional, IrrSolver diagnostic code (IrrSolver.CONVERGED if found)
   """
   m = 'IRR'
-  fcff = FCFF(components, cashFlows, projectLength, mult=None, v=v) # TODO mult is none always?
-  # this method can crash if no solution exists!
-  #try:
-  irr = np.irr(fcff)
-  vprint(v, 1, m, '... IRR: {: 1.9e}'.format(irr))
-  #except: # TODO what kind of crash? General catching is bad practice.
-  #  vprint(v, 99, m, 'IRR search failed! No solution found. Setting IRR to -10 for debugging.')
-  #  irr = -10.0
-  return irr
+  if fcff is None:
+    fcff = FCFF(components, cashFlows, projectLength, mult=None, v=v) # TODO mult is none always?
+  irr, status = IrrSolver.solve(fcff, guess=guess, tol=tol)
+  vprint(v, 1, m, '... IRR: %s', irr)
+  if np.any(status != IrrSolver.CONVERGED):
+    vprint(v, 99, m, 'IRR search failed for some cash flows! No solution found, IRR set to NaN (IrrSolver codes: %s).', status)
+  if not returnStatus:
+    return irr
+  else:
+    return irr, status
 
 def PI(components, cashFlows, projectLength, discountRate, mult=None, v=100):
   """
@@ -486,14 +837,28 @@ def PI(components, cashFlows, projectLength, discountRate, mult=None, v=100):
     @ In, discountRate, float, firm discount rate to use in discounting future dollars value
     @ In, mult, float, optional, if provided then scale target cash flow by value
     @ In, v, int, verbosity level
-    @ Out, pi, float, profitability index
+    @ Out, pi, float or np.array, profitability index (one per sample for a batch)
   """
   m = 'PI'
-  npv, fcff = NPV(components, cashFlows, projectLength, discountRate, mult=mult, v=v, returnFcff=True)
-  pi = -1.0 * npv / fcff[0] # yes, really! This seems strange, but it also seems to be right.
-  vprint(v, 1, m, '... PI: {: 1.9e}'.format(pi))
+  fcff = FCFF(components, cashFlows, projectLength, mult=mult, v=v)
+  _, pi = discountedIndicators(fcff, discountRate)
+  vprint(v, 1, m, '... PI: %s', pi)
   return pi
 
+def discountedIndicators(fcff, discountRate):
+  """
+    Gets the NPV and PI from one discounting pass of the FCFF
+    @ In, fcff, np.array, free cash flow to the firm (years,) or (samples x years)
+    @ In, discountRate, float, firm discount rate to use in discounting future dollars value
+    @ Out, npv, float or np.array, net-present value of system (one per sample for a batch)
+    @ Out, pi, float or np.array, profitability index (one per sample for a batch)
+  """
+  if fcff.ndim > 1:
+    npv, pi, _ = Discounting.evaluateBatch(fcff, discountRate)
+  else:
+    npv, pi, _ = Discounting.evaluate(fcff, discountRate)
+  return npv, pi
+
 def gcd(a, b):
   """
     Find greatest common denominator
@@ -522,24 +887,233 @@ def lcmm(*args):
   """
   return functools.reduce(lcm, args)
 
+#=====================
+# EVALUATION PLAN
+#=====================
+class EvaluationPlan:
+  """
+    Everything about evaluating a set of settings and components that doesn't change from one
+    run to the next: the order in which cash flows are evaluated, the project length, and the
+    lifetime-to-project expansion of each component, and the tax and inflation factors of each cash flow.
+    Created by compilePlan, then executed for each set of variables by run.
+  """
+  def __init__(self, signature, ordered, projectLength, projection, requiredParameters, requiredMultipliers, levels):
+    """
+      Constructor.
+      @ In, signature, tuple, description of the settings and components this plan was compiled for
+      @ In, ordered, list, (component, cashflow) pairs in evaluation order
+      @ In, projectLength, int, project years
+      @ In, projection, list, (component, cashflows, ProjectExpansion, tax and inflation factors per cash flow and year)
+      @ In, requiredParameters, list, (variable, component, cashflow, parameter) for cash flow parameters (driver,
+                    alpha, reference, X) taken from the variables
+      @ In, requiredMultipliers, list, (variable, component) for multipliers taken from the variables
+      @ In, levels, list, the same pairs in lists that only rely on earlier lists, so each can be evaluated together
+      @ Out, None
+    """
+    self.signature = signature
+    self.ordered = ordered
+    self.levels = levels
+    self.projectLength = projectLength
+    self.projection = projection
+    self.requiredParameters = requiredParameters
+    self.requiredMultipliers = requiredMultipliers
+    self.lastIrr = None # latest IRR found, to start the next IRR search from
+    self.timings = {} # seconds per stage (see Profiling.Profiler.stages) of the latest profiled run
+    self.lifetimeMemo = {} # (component, cashflow) names: (input fingerprint, lifetime cash flow) of the latest run
+    self.projectMemo = {} # component name: (lifetime cash flows, project cash flows) of the latest run
+    self.fcffMemo = {} # component name: (project cash flows, contribution to the FCFF) of the latest run
+
+  def isValid(self, settings, components):
+    """
+      Checks if this plan still describes the provided settings and components
+      @ In, settings, CashFlows.GlobalSettings, global settings
+      @ In, components, list, list of CashFlows.Component instances
+      @ Out, isValid, bool, True if the plan can be used for these settings and components
+    """
+    return self.signature == planSignature(settings, components)
+
+  def checkVariables(self, variables):
+    """
+      Checks if all the variables needed by the plan are present and sensible.
+      Errors out if any problems are found.
+      @ In, variables, dict, variable-value map from RAVEN
+      @ Out, None
+    """
+    for mult, comp in self.requiredMultipliers:
+      if mult not in variables:
+        raise RuntimeError('CashFlow: multiplier "{}" required for Component "{}" but not found among variables!'.format(mult, comp.name))
+    for name, comp, cf, param in self.requiredParameters:
+      if name not in variables:
+        raise RuntimeError(('Component "{c}" TEAL {cf} {p} variable "{d}" was not found ' +\
+                            'among variables or other cashflows!')
+                           .format(c=comp.name,
+                                   cf=cf.name,
+                                   p=param,
+                                   d=name))
+      # check length of variable (the last axis is the lifetime; a leading axis would be the samples of a batch)
+      n = np.atleast_1d(variables[name]).shape[-1]
+      if n > 1 and n != comp.getLifetime()+1:
+        raise RuntimeError(('Component "{c}" TEAL {cf} {p} variable "{d}" has "{n}" entries, '+\
+                            'but "{c}" has a lifetime of {el}!')
+                           .format(c=comp.name,
+                                   cf=cf.name,
+                                   p=param,
+                                   d=name,
+                                   n=n,
+                                   el=comp.getLifetime()))
+
+  def lifetimeFingerprint(self, cf, variables, fingerprints):
+    """
+      Fingerprints everything the lifetime cash flow of a cash flow is computed from: its own parameters, the
+      variables it takes, and (through their fingerprints) the cash flows it is driven by.
+      @ In, cf, CashFlows.CashFlow, cash flow
+      @ In, variables, dict, variable-value map from RAVEN
+      @ In, fingerprints, dict, (component, cashflow) names: fingerprint of the cash flows evaluated so far in this run
+      @ Out, fingerprint, tuple, fingerprint (None if the cash flow can't be memoized)
+    """
+    # recurring cash flows without alpha and driver are filled from outside (see Recurring.computeIntrayearCashflow)
+    if cf.type == 'Recurring' and cf.getParam('alpha') is None and cf.getParam('driver') is None:
+      return None
+    fingerprint = []
+    for source in (cf.getParam('alpha'), cf.getParam('driver'), cf.getMultiplier(), cf.getParam('reference'), cf.getParam('scale')):
+      if not TypeChecks.isAString(source):
+        fingerprint.append(inputFingerprint(source))
+      elif source in variables:
+        fingerprint.append(inputFingerprint(variables[source]))
+      else:
+        # cross-referenced cash flow, as 'Component|CashFlow'
+        upstream = fingerprints.get(tuple(source.split('|')))
+        if upstream is None:
+          return None
+        fingerprint.append(upstream)
+    return tuple(fingerprint)
+
+def inputFingerprint(value):
+  """
+    Summarizes an input value so that changes to it are cheap to tell apart
+    @ In, value, object, None, number or array (one row per sample for a batch)
+    @ Out, fingerprint, object, hashable summary
+  """
+  if value is None or TypeChecks.isAString(value):
+    return value
+  value = np.ascontiguousarray(value)
+  return (value.shape, value.dtype.str, hashlib.blake2b(value.data, digest_size=16).digest())
+
+def planSignature(settings, components):
+  """
+    Describes everything about the settings and components that an EvaluationPlan depends on
+    @ In, settings, CashFlows.GlobalSettings, global settings
+    @ In, components, list, list of CashFlows.Component instances
+    @ Out, signature, tuple, hashable description
+  """
+  active = tuple((comp, tuple(cfs)) for comp, cfs in settings.getActiveComponents().items())
+  signature = [id(settings), active, settings.getProjectTime(), settings.getTax(), settings.getInflation()]
+  for comp in components:
+    cashflows = tuple((id(cf), cf.name, cf.getParam('driver') if TypeChecks.isAString(cf.getParam('driver')) else None,
+                       cf.getMultiplier(), cf.isTaxable(), cf.isInflated()) for cf in comp.getCashflows())
+    signature.append((id(comp), comp.name, comp.getLifetime(), comp.getStartTime(), comp.getRepetitions(),
+                      comp.getTax(), comp.getInflation(), cashflows))
+  return tuple(signature)
+
+def compilePlan(settings, components, v=100):
+  """
+    Compiles the parts of the evaluation that don't depend on the variables, so they can be reused by every run
+    @ In, settings, CashFlows.GlobalSettings, global settings
+    @ In, components, list, list of CashFlows.Component instances
+    @ In, v, int, verbosity level
+    @ Out, plan, EvaluationPlan, compiled evaluation plan
+  """
+  m = 'compilePlan'
+  vprint(v, 0, m, '... creating evaluation sequence ...')
+  active = list(comp for comp in components if comp.name in settings.getActiveComponents())
+  # cash flows in evaluation order, grouped in levels of cash flows that don't drive each other
+  cashflows = dict(('{}|{}'.format(comp.name, cf.name), (comp, cf)) for comp in active for cf in comp.getCashflows())
+  levels = list(list(cashflows[cfn] for cfn in level) for level in _createEvalProcess(active, None))
+  ordered = list(pair for level in levels for pair in level)
+  vprint(v, 0, m, '... evaluation sequence: %s', list(list('{}|{}'.format(comp.name, cf.name) for comp, cf in level) for level in levels))
+  # variables that have to be provided to each run
+  requiredParameters = []
+  requiredMultipliers = []
+  for comp in active:
+    for mult in comp.getMultipliers():
+      if mult is not None:
+        requiredMultipliers.append((mult, comp))
+    for cf in comp.getCashflows():
+      # named as in the input; cross-referenced cash flows ('Component|CashFlow') are checked by _createEvalProcess
+      for param in ('driver', 'alpha', 'reference', 'X'):
+        value = cf.getParam(param)
+        if TypeChecks.isAString(value) and '|' not in value:
+          requiredParameters.append((value, comp, cf, param))
+  # project length and how each cash flow is taken to the project life
+  projectLength = getProjectLength(settings, components, v=v)
+  projection = []
+  for comp in components:
+    cashflows = comp.getCashflows()
+    if not cashflows:
+      continue
+    tax = comp.getTax() if comp.getTax() is not None else settings.getTax()
+    inflation = comp.getInflation() if comp.getInflation() is not None else settings.getInflation()
+    expansion = projectExpansion(*componentSchedule(comp, projectLength), projectLength)
+    factors = np.empty((len(cashflows), projectLength))
+    for c, cf in enumerate(cashflows):
+      taxMult, inflRate = cashflowFactors(cf, tax, inflation)
+      factors[c] = taxMult * inflationFactors(inflRate, projectLength)
+    factors.setflags(write=False)
+    projection.append((comp, list(cashflows), expansion, factors))
+  return EvaluationPlan(planSignature(settings, components), ordered, projectLength, projection,
+                        requiredParameters, requiredMultipliers, levels)
+
+def getPlan(settings, components, plan=None, v=100):
+  """
+    Provides an evaluation plan for the settings and components, reusing the provided one if still valid
+    @ In, settings, CashFlows.GlobalSettings, global settings
+    @ In, components, list, list of CashFlows.Component instances
+    @ In, plan, EvaluationPlan, optional, previously compiled plan
+    @ In, v, int, verbosity level
+    @ Out, plan, EvaluationPlan, plan valid for the settings and components
+  """
+  if plan is None or not plan.isValid(settings, components):
+    plan = compilePlan(settings, components, v=v)
+  return plan
+
 #=====================
 # MAIN METHOD
 #=====================
-def run(settings, components, variables):
+def run(settings, components, variables, plan=None, analytic=False, returnDetails=False, profile=False, returnPlan=False):
   """
     @ In, settings, CashFlows.GlobalSettings, global settings
     @ In, components, list, list of CashFlows.Component instances
     @ In, variables, dict, variables from RAVEN
+    @ In, plan, EvaluationPlan, optional, plan compiled for settings and components (compiled here if missing or outdated)
+    @ In, analytic, bool, optional, if True then get NPV and NPV_search straight from the lifetime cash flows
+                    (see lifetimePresentValues); project cash flows are then only created if IRR or PI are requested
+    @ In, returnDetails, bool, optional, if True then provide the yearly FCFF and project cash flows as well
+    @ In, profile, bool or Profiling.Profiler, optional, if True (or a Profiler to add to) then provide the
+                   profiling report as well, with the time of each stage, component and cash flow
+    @ In, returnPlan, bool, optional, if True then provide the plan used as well, to keep for the next runs
     @ Out, results, dict, economic metric results
+    @ Out, details, dict, optional, {'FCFF': np.array, 'cashflows': {'Component|CashFlow': np.array}} of yearly values
+    @ Out, report, dict, optional, profiling report (see Profiling.Profiler.report)
+    @ Out, plan, EvaluationPlan, optional, plan used, compiled here if the one provided was missing or outdated
   """
-  # make a dictionary mapping component names to components
-  compsByName = dict((c.name, c) for c in components)
+  # NOTE every stage below also accepts variables with a leading sample axis (see runBatch)
   v = settings._verbosity
   m = 'run'
   vprint(v, 0, m, 'Starting CashFlow Run ...')
-  # check mapping of drivers and determine order in which they should be evaluated
+  # profiling is opt-in; otherwise the stages below go through a profiler that does nothing
+  if isinstance(profile, Profiling.Profiler):
+    profiler = profile
+  elif profile:
+    profiler = Profiling.Profiler()
+  else:
+    profiler = Profiling.NullProfiler()
+  # the evaluation order, project length etc. only change with the settings and components
+  with profiler.stage('plan'):
+    plan = getPlan(settings, components, plan=plan, v=v)
+  # check mapping of drivers
   vprint(v, 0, m, '... Checking if all drivers present ...')
-  ordered = checkDrivers(settings, components, variables, v=v)
+  with profiler.stage('checkVariables'):
+    plan.checkVariables(variables)
 
   # compute project cashflows
   ## this comes in multiple styles!
@@ -553,62 +1127,206 @@ def run(settings, components, variables):
   vprint(v, 0, m, 'Component Lifetime Cashflow Calculations')
   vprint(v, 0, m, '='*90)
   lifetimeCashflows = defaultdict(dict) # keys are component, cashflow, then indexed by lifetime
-  for ocf in ordered:
-    if ocf in variables or ocf == 'EndNode': # TODO why this check for ocf in variables? Should it be comp, or cf?
-      continue
-    compName, cfName = ocf.split('|')
-    comp = compsByName[compName]
-    print('DEBUGG getting', cfName)
-    cf = comp.getCashflow(cfName)
-    # if this component is a "recurring" type, then we don't need to do the lifetime cashflow bit
-    #if cf.type == 'Recurring':
-    #  raise NotImplementedError # FIXME how to do this right?
-    # calculate cash flow for component's lifetime for this cash flow
-    print('jz is compName',compName)
-    print('jz is cfName',cfName)
-    lifeCf = componentLifeCashflow(comp, cf, variables, lifetimeCashflows, v=0)
-    print('jz is lifecf',lifeCf)
-    lifetimeCashflows[compName][cfName] = lifeCf
+  # lifetime cash flows whose inputs (including upstream cash flows) didn't change since the last run are reused
+  fingerprints = {}
+  with profiler.stage('lifetime'):
+    for comp, cf in plan.ordered:
+      # if this component is a "recurring" type, then we don't need to do the lifetime cashflow bit
+      #if cf.type == 'Recurring':
+      #  raise NotImplementedError # FIXME how to do this right?
+      key = (comp.name, cf.name)
+      fingerprint = plan.lifetimeFingerprint(cf, variables, fingerprints)
+      fingerprints[key] = fingerprint
+      memo = plan.lifetimeMemo.get(key)
+      if fingerprint is not None and memo is not None and memo[0] == fingerprint:
+        lifeCf = memo[1]
+        vprint(v, 0, m, 'Inputs unchanged, reusing lifetime cash flow for Component "%s" CashFlow "%s"', comp.name, cf.name)
+        profiler.count('cashflows reused')
+      else:
+        # calculate cash flow for component's lifetime for this cash flow
+        with profiler.item('cashflows', '{}|{}'.format(comp.name, cf.name), 'lifetime', type=cf.type):
+          lifeCf = componentLifeCashflow(comp, cf, variables, lifetimeCashflows, v=v)
+        plan.lifetimeMemo[key] = (fingerprint, lifeCf)
+        profiler.count('cashflows evaluated')
+        profiler.countArray(lifeCf)
+      vprint(v, 0, m, 'Lifetime cash flow for Component "%s" CashFlow "%s": %s', comp.name, cf.name, lifeCf)
+      lifetimeCashflows[comp.name][cf.name] = lifeCf
 
   vprint(v, 0, m, '='*90)
   vprint(v, 0, m, 'Project Lifetime Cashflow Calculations')
   vprint(v, 0, m, '='*90)
-  # determine how the project life is calculated.
-  projectLength = getProjectLength(settings, components, v=v)
-  vprint(v, 0, m, ' ... project length: {} years'.format(projectLength))
-  projectCashflows = projectLifeCashflows(settings, components, lifetimeCashflows, projectLength, v=v)
+  projectLength = plan.projectLength
+  vprint(v, 0, m, ' ... project length: %d years', projectLength)
+  indicators = settings.getIndicators()
+  presentValues = None
+  if analytic:
+    with profiler.stage('presentValues'):
+      presentValues = lifetimePresentValues(settings, components, lifetimeCashflows, projectLength, v=v)
+  projectCashflows = None
+  if not analytic or 'IRR' in indicators or 'PI' in indicators or returnDetails:
+    with profiler.stage('project'):
+      projectCashflows = projectLifeCashflows(settings, components, lifetimeCashflows, projectLength, v=v, plan=plan,
+                                              profiler=profiler)
 
   vprint(v, 0, m, '='*90)
   vprint(v, 0, m, 'Economic Indicator Calculations')
   vprint(v, 0, m, '='*90)
-  indicators = settings.getIndicators()
   results = {}
   if 'NPV_search' in indicators:
-    metric = npvSearch(settings, components, projectCashflows, projectLength, v=v)
-    results['NPV_mult'] = metric
+    with profiler.stage('NPV_search'):
+      metric = npvSearch(settings, components, projectCashflows, projectLength, v=v, presentValues=presentValues)
+      results['NPV_mult'] = metric
+  # the FCFF and its discounting are shared by all the other indicators
+  if ('NPV' in indicators and not analytic) or 'IRR' in indicators or 'PI' in indicators or returnDetails:
+    with profiler.stage('FCFF'):
+      fcff = FCFF(components, projectCashflows, projectLength, v=v, plan=plan)
+  if ('NPV' in indicators and not analytic) or 'PI' in indicators:
+    with profiler.stage('discounting'):
+      npv, pi = discountedIndicators(fcff, settings.getDiscountRate())
   if 'NPV' in indicators:
-    metric = NPV(components, projectCashflows, projectLength, settings.getDiscountRate(), v=v)
-    results['NPV'] = metric
+    with profiler.stage('NPV'):
+      if analytic:
+        npv = sum(pv for comp in components for pv in presentValues[comp.name].values())
+      vprint(v, 0, 'NPV', '... NPV: %s', npv)
+      results['NPV'] = npv
   if 'IRR' in indicators:
-    metric = IRR(components, projectCashflows, projectLength, v=v)
-    results['IRR'] = metric
+    with profiler.stage('IRR'):
+      metric, status = IRR(components, projectCashflows, projectLength, v=v, guess=plan.lastIrr, returnStatus=True, fcff=fcff)
+      # warm start for the next run of a sweep; the root found is the same with or without it
+      found = np.atleast_1d(metric)[np.atleast_1d(status) == IrrSolver.CONVERGED]
+      if len(found):
+        plan.lastIrr = found[-1]
+      results['IRR'] = metric
   if 'PI' in indicators:
-    metric = PI(components, projectCashflows, projectLength, settings.getDiscountRate(), v=v)
-    results['PI'] = metric
-  return results
+    with profiler.stage('PI'):
+      vprint(v, 1, 'PI', '... PI: %s', pi)
+      results['PI'] = pi
+  if profiler.stages:
+    plan.timings = dict(profiler.stages)
+    for name, seconds in plan.timings.items():
+      vprint(v, 1, m, '... time for %s: %1.3e s', name, seconds)
+  if not returnDetails and not profile and not returnPlan:
+    return results
+  outputs = (results,)
+  if returnDetails:
+    cashflows = dict(('{}|{}'.format(comp.name, cf.name), projectCashflows[comp.name][cf.name])
+                     for comp in components for cf in comp.getCashflows())
+    outputs += ({'FCFF': fcff, 'cashflows': cashflows},)
+  if profile:
+    outputs += (profiler.report(),)
+  if returnPlan:
+    outputs += (plan,)
+  return outputs
 
 
+def runBatch(settings, components, variables, plan=None, analytic=False, returnDetails=False, profile=False, returnPlan=False):
+  """
+    Evaluates many samples at once, vectorized along the sample axis.
+    @ In, settings, CashFlows.GlobalSettings, global settings
+    @ In, components, list, list of CashFlows.Component instances
+    @ In, variables, dict, variables stacked by sample, as (samples,) for scalars or (samples x years) for arrays
+    @ In, plan, EvaluationPlan, optional, plan compiled for settings and components (compiled here if missing or outdated)
+    @ In, analytic, bool, optional, if True then get NPV and NPV_search straight from the lifetime cash flows
+    @ In, returnDetails, bool, optional, if True then provide the yearly FCFF and project cash flows as well
+    @ In, profile, bool or Profiling.Profiler, optional, if True (or a Profiler to add to) then provide the profiling report as well
+    @ In, returnPlan, bool, optional, if True then provide the plan used as well, to keep for the next runs
+    @ Out, results, dict, economic metric results as np.array with one entry per sample
+                     (samples x targets for NPV_mult with more than one target)
+    @ Out, details, dict, optional, as from run, with (samples x years) arrays
+    @ Out, report, dict, optional, profiling report, as from run
+    @ Out, plan, EvaluationPlan, optional, plan used, as from run
+  """
+  batch, numSamples = stackSamples(variables)
+  outputs = run(settings, components, batch, plan=plan, analytic=analytic, returnDetails=returnDetails, profile=profile,
+                returnPlan=returnPlan)
+  if not returnDetails and not profile and not returnPlan:
+    outputs = (outputs,)
+  results = outputs[0]
+  if returnDetails:
+    details = outputs[1]
+    projectLength = details['FCFF'].shape[-1]
+    details['FCFF'] = np.broadcast_to(details['FCFF'], (numSamples, projectLength)).copy()
+    for name, value in details['cashflows'].items():
+      details['cashflows'][name] = np.broadcast_to(value, (numSamples, projectLength)).copy()
+  # metrics that don't depend on any sampled variable still need an entry per sample
+  for name, value in results.items():
+    value = np.asarray(value)
+    if name == 'NPV_mult' and len(settings.getMetricTarget()) > 1:
+      # one multiplier per sample and target
+      results[name] = np.broadcast_to(value, (numSamples, value.shape[-1])).copy()
+    else:
+      results[name] = np.broadcast_to(value, (numSamples,)).copy()
+  if not returnDetails and not profile and not returnPlan:
+    return results
+  return (results,) + tuple(outputs[1:])
+
+def stackSamples(variables):
+  """
+    Reshapes variables stacked by sample so they broadcast against the component lifetimes,
+    i.e. each entry becomes a (samples x 1) or (samples x years) array.
+    @ In, variables, dict, variables stacked by sample, as (samples,) for scalars or (samples x years) for arrays
+    @ Out, batch, dict, reshaped variables
+    @ Out, numSamples, int, number of samples
+  """
+  batch = {}
+  numSamples = None
+  for name, value in variables.items():
+    value = np.asarray(value, dtype=float)
+    if value.ndim == 0 or value.ndim > 2:
+      raise IOError('Batched variable "{}" should have shape (samples,) or (samples, years), but has shape {}!'.format(name, value.shape))
+    if numSamples is None:
+      numSamples = value.shape[0]
+    elif value.shape[0] != numSamples:
+      raise IOError('Batched variable "{}" has {} samples, but other variables have {}!'.format(name, value.shape[0], numSamples))
+    batch[name] = value.reshape(numSamples, -1)
+  if numSamples is None:
+    raise IOError('No variables provided to evaluate as a batch!')
+  return batch, numSamples
+
 #=====================
 # PRINTING STUFF
 #=====================
-def vprint(threshold, desired, method, *msg):
+def vprint(threshold, desired, method, msg, *args):
   """
-    Light wrapper for printing that considers verbosity levels
+    Light wrapper for logging that considers verbosity levels.
+    The message is only formatted if it actually gets emitted, so pass values as args rather than formatting them.
     @ In, threshold, int, cutoff verbosity
     @ In, desired, int, requested message verbosity level
     @ In, method, str, name of method raising print
-    @ In, msg, list(str), messages to print
+    @ In, msg, str, message, with %-style placeholders for args
+    @ In, args, list, values for the placeholders in msg
     @ Out, None
   """
   if desired >= threshold:
-    print('CashFlow INFO ({}):'.format(method), *msg)
+    logger.log(logLevel(desired), '(%s): ' + msg, method, *args)
+
+def logLevel(verbosity):
+  """
+    Maps a TEAL verbosity level onto a logging level: messages of verbosity 0 are the most detailed (DEBUG),
+    up to 99 for warnings
+    @ In, verbosity, int, TEAL verbosity level
+    @ Out, level, int, logging level
+  """
+  if verbosity < 1:
+    return logging.DEBUG
+  if verbosity < 99:
+    return logging.INFO
+  return logging.WARNING
+
+def setVerbosity(verbosity):
+  """
+    Applies the TEAL verbosity to the TEAL loggers. The level is set on the "TEAL" parent logger, so
+    it can still be changed for each module (e.g. "TEAL.CashFlows"). Unless the application already
+    handles logging, the emitted messages are printed to stdout.
+    @ In, verbosity, int, TEAL verbosity level (100 for none)
+    @ Out, None
+  """
+  teal = logging.getLogger('TEAL')
+  teal.setLevel(logLevel(verbosity))
+  if verbosity < 100 and not teal.handlers and not logging.getLogger().handlers:
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter('CashFlow %(levelname)s %(message)s'))
+    teal.addHandler(handler)
+
+# seconds taken to import this module, with the TEAL modules it needs (RAVEN is only imported when needed, see Raven)
+importTime = time.perf_counter() - _importStart
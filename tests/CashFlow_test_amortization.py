@@ -0,0 +1,68 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Unit test for the amortization schedules.
+Checks that schedules are shared and read-only, and that many initial values are amortized at once.
+"""
+import os
+import sys
+import numpy as np
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import Amortization
+
+if __name__ == '__main__':
+  failed = 0
+  life = 30
+  for scheme, plan in [('MACRS', [15]), ('macrs', np.array([7])), ('custom', [10.0, 20.0, 30.0, 40.0])]:
+    fractions = Amortization.schedule(scheme, plan, life)
+    if Amortization.schedule(scheme, list(plan), life) is not fractions:
+      print('ERROR: {} {} schedule not shared'.format(scheme, plan))
+      failed += 1
+    if fractions.flags.writeable:
+      print('ERROR: {} {} schedule is writeable'.format(scheme, plan))
+      failed += 1
+    if len(fractions) != life + 1 or fractions[0] != 0.0 or abs(fractions.sum() - 1.0) > 1e-3:
+      print('ERROR: {} {} schedule does not amortize the full value: {}'.format(scheme, plan, fractions))
+      failed += 1
+    # one value, as before
+    single = Amortization.amortize(scheme, plan, 2.5e8, life)
+    if single.shape != (life + 1,) or not np.allclose(single, 2.5e8 * fractions, rtol=1e-15, atol=0.0):
+      print('ERROR: {} {} amortization of a single value'.format(scheme, plan))
+      failed += 1
+    single[1] = 0.0 # the result is not shared
+    # many values at once
+    values = np.linspace(1.0e8, 3.0e8, 1000)
+    batch = Amortization.amortize(scheme, plan, values, life)
+    expected = np.array([Amortization.amortize(scheme, plan, value, life) for value in values])
+    if batch.shape != (len(values), life + 1) or not np.array_equal(batch, expected):
+      print('ERROR: {} {} amortization of many values'.format(scheme, plan))
+      failed += 1
+  try:
+    Amortization.schedule('MACRS', [4], life)
+    print('ERROR: MACRS 4 accepted')
+    failed += 1
+  except IOError:
+    pass
+  if failed:
+    sys.exit(1)
+  print('Success!')
+  sys.exit(0)
+
+#  <TestInfo>
+#    <name>CashFlow_test_amortization</name>
+#    <description>
+#      This input tests the shared amortization schedules of TEAL, for single and many initial values.
+#    </description>
+#    <classesTested>TEAL.Amortization</classesTested>
+#  </TestInfo>
@@ -0,0 +1,71 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Integration test for the analytic NPV mode.
+Checks the present values taken straight from the lifetime cash flows against discounting the project cash flows.
+"""
+import os
+import sys
+import numpy as np
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import main
+from CashFlow_test_batch import load, sampleVariables
+
+def checkSchedules():
+  """
+    Compares the present value weights against discounting the expanded lifetime entries, for many schedules
+    @ In, None
+    @ Out, failed, int, number of mismatching schedules
+  """
+  failed = 0
+  for projectLength in [1, 2, 7, 30]:
+    for life in [1, 2, 3, 10, 40]:
+      for start in [-12, -1, 0, 1, 5]:
+        for end in [start + life, start + 3 * life, projectLength]:
+          builds = np.arange(start, min(end, projectLength - 1) + 1, life)
+          if not np.any(builds >= 0):
+            # the project path needs a build inside the project
+            continue
+          for rate in [1.0, 1.07, 0.97]:
+            expansion = main.projectExpansion(start, end, life, projectLength).toMatrix()
+            expected = expansion.dot(np.power(rate, -np.arange(projectLength, dtype=float)))
+            weights = main.presentValueWeights(start, end, life, projectLength, rate)
+            if not np.allclose(weights, expected, rtol=1e-10, atol=1e-12):
+              print('ERROR: schedule start {} end {} life {} length {} rate {}: {} vs {}'.format(start, end, life, projectLength, rate, weights, expected))
+              failed += 1
+  return failed
+
+if __name__ == '__main__':
+  variables = dict((name, value[0]) for name, value in sampleVariables(1).items())
+  failed = checkSchedules()
+  for xmlFile in ['Cash_Flow_input_NPV.xml', 'Cash_Flow_input_NPVsearch.xml', 'Cash_Flow_input_PI.xml']:
+    settings, components = load(xmlFile)
+    projected = main.run(settings, components, variables)
+    analytic = main.run(settings, components, variables, analytic=True)
+    for metric, value in projected.items():
+      if abs(analytic[metric] - value) > 1e-9 * max(abs(value), 1.0):
+        print('ERROR: {} metric {}: analytic {:1.9e}, projected {:1.9e}'.format(xmlFile, metric, analytic[metric], value))
+        failed += 1
+  if failed:
+    sys.exit(1)
+  print('Success!')
+  sys.exit(0)
+
+#  <TestInfo>
+#    <name>CashFlow_test_analyticNPV</name>
+#    <description>
+#      This input tests the analytic NPV mode of TEAL against discounting the project cash flows.
+#    </description>
+#    <classesTested>TEAL.main</classesTested>
+#  </TestInfo>
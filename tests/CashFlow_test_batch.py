@@ -0,0 +1,76 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Integration test for the batched evaluation API.
+Evaluates several samples at once and checks them against one-at-a-time evaluations.
+"""
+import os
+import sys
+import xml.etree.ElementTree as ET
+import numpy as np
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import main
+
+def load(xmlFile):
+  """
+    Loads the economics from an input file
+    @ In, xmlFile, str, path to the economics input file
+    @ Out, settings, CashFlows.GlobalSettings, settings
+    @ Out, components, list, CashFlows.Component instances
+  """
+  root = ET.Element('ROOT')
+  root.append(ET.parse(xmlFile).getroot())
+  settings, components = main.readFromXml(root)
+  main.checkRunSettings(settings, components)
+  return settings, components
+
+def sampleVariables(numSamples):
+  """
+    Creates stacked samples of the variables needed by the test inputs
+    @ In, numSamples, int, number of samples
+    @ Out, variables, dict, variables stacked by sample
+  """
+  rng = np.random.RandomState(42)
+  variables = {'BOP_capacity': 300.0e6 * rng.uniform(0.8, 1.2, numSamples),
+               'BOP_TOT_revenueEL': 350.0e6 * rng.uniform(0.8, 1.2, (numSamples, 61)),
+               'IP_capacity': 51.0e6 * rng.uniform(0.8, 1.2, numSamples),
+               'IP_TOT_revenueBY': 31.5e6 * rng.uniform(0.8, 1.2, numSamples),
+               'Multiplier': rng.uniform(0.9, 1.1, numSamples)}
+  return variables
+
+if __name__ == '__main__':
+  numSamples = 5
+  variables = sampleVariables(numSamples)
+  failed = 0
+  for xmlFile in ['Cash_Flow_input_NPV.xml', 'Cash_Flow_input_NPVsearch.xml', 'Cash_Flow_input_PI.xml']:
+    settings, components = load(xmlFile)
+    batched = main.runBatch(settings, components, variables)
+    for s in range(numSamples):
+      single = main.run(settings, components, dict((k, v[s]) for k, v in variables.items()))
+      for metric, value in single.items():
+        if abs(batched[metric][s] - value) > 1e-10 * abs(value):
+          print('ERROR: {} sample {} metric {}: batched {:1.9e}, single {:1.9e}'.format(xmlFile, s, metric, batched[metric][s], value))
+          failed += 1
+  if failed:
+    sys.exit(1)
+  print('Success!')
+  sys.exit(0)
+
+#  <TestInfo>
+#    <name>CashFlow_test_batch</name>
+#    <description>
+#      This input tests the batched (multi-sample) evaluation of TEAL against single-sample evaluations.
+#    </description>
+#    <classesTested>TEAL.main</classesTested>
+#  </TestInfo>
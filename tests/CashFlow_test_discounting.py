@@ -0,0 +1,62 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Unit test for the discounting kernel.
+Checks the indicators against discounting year by year, for single and batched cash flows.
+"""
+import os
+import sys
+import numpy as np
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import Discounting
+
+if __name__ == '__main__':
+  failed = 0
+  discountRate = 0.08
+  rng = np.random.RandomState(11)
+  fcff = rng.uniform(-1.0, 1.0, (6, 41)) * 1.0e6
+  fcff[:, 0] = -5.0e6
+  expected = np.array([sum(sample[y] / (1.0 + discountRate)**y for y in range(fcff.shape[1])) for sample in fcff])
+  # single cash flows
+  for s, sample in enumerate(fcff):
+    npv, pi, discounted = Discounting.evaluate(sample, discountRate)
+    if abs(npv - expected[s]) > 1e-9 * abs(expected[s]) or abs(pi + npv / sample[0]) > 1e-12 or abs(discounted.sum() - npv) > 1e-6:
+      print('ERROR: sample {}: NPV {:1.9e} expected {:1.9e}, PI {}'.format(s, npv, expected[s], pi))
+      failed += 1
+  # batched cash flows
+  for keep in [False, True]:
+    npv, pi, discounted = Discounting.evaluateBatch(fcff, discountRate, keepDiscounted=keep)
+    if np.max(np.abs(npv - expected) / np.abs(expected)) > 1e-9 or np.max(np.abs(pi + npv / fcff[:, 0])) > 1e-12:
+      print('ERROR: batched NPV {} expected {}'.format(npv, expected))
+      failed += 1
+    if keep != (discounted is not None):
+      print('ERROR: discounted cash flows kept: {}, requested: {}'.format(discounted is not None, keep))
+      failed += 1
+  # cached factors are shared, so they can't be changed
+  factors = Discounting.discountFactors(discountRate, fcff.shape[1])
+  if factors is not Discounting.discountFactors(discountRate, fcff.shape[1]) or factors.flags.writeable:
+    print('ERROR: discount factors are not cached read-only arrays')
+    failed += 1
+  if failed:
+    sys.exit(1)
+  print('Success!')
+  sys.exit(0)
+
+#  <TestInfo>
+#    <name>CashFlow_test_discounting</name>
+#    <description>
+#      This input tests the discounting kernel of TEAL for single and batched cash flows.
+#    </description>
+#    <classesTested>TEAL.Discounting</classesTested>
+#  </TestInfo>
@@ -0,0 +1,100 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Unit test for the numeric core of TEAL without RAVEN.
+Checks that the object-oriented API runs without importing any RAVEN module, and checks the built-in
+type checks and topological sort.
+"""
+import os
+import sys
+import subprocess
+import numpy as np
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import TypeChecks
+import Scheduler
+
+# run in a fresh interpreter, so no RAVEN module is loaded yet
+objectOriented = """
+import sys
+sys.path.append({src!r})
+import numpy as np
+import main
+import CashFlows
+settings = CashFlows.GlobalSettings()
+settings.setParams({{'DiscountRate': 0.1, 'tax': 0.21, 'inflation': 0.02, 'ProjectTime': 5,
+                     'Indicator': {{'name': ['NPV'], 'active': ['Plant|Cap', 'Plant|Sales']}}}})
+comp = CashFlows.Component()
+comp.setParams({{'name': 'Plant', 'Life_time': 4}})
+cap = CashFlows.Capex()
+cap.name = 'Cap'
+cap.initParams(4)
+cap.setParams({{'name': 'Cap', 'alpha': -100.0, 'driver': 1.0, 'reference': 1.0, 'X': 0.8, 'mult_target': None, 'inflation': False}})
+sales = CashFlows.Recurring()
+sales.setParams({{'name': 'Sales', 'X': 1, 'mult_target': None, 'inflation': False}})
+sales.computeYearlyCashflow(np.array([0.0, 30.0, 30.0, 30.0, 30.0]), np.ones(5))
+comp.addCashflows([cap, sales])
+npv = main.run(settings, [comp], {{}})['NPV']
+raven = sorted(name for name in sys.modules if name.split('.')[0] in ('utils', 'ravenframework', 'PluginsBaseClasses'))
+print(repr((float(npv), raven, main.importTime)))
+""".format(src=os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+if __name__ == '__main__':
+  failed = 0
+  output = subprocess.run([sys.executable, '-c', objectOriented], stdout=subprocess.PIPE, check=True).stdout
+  npv, raven, importTime = eval(output.decode().strip().splitlines()[-1])
+  print('TEAL import time: {:1.3f} s'.format(importTime))
+  if raven:
+    print('ERROR: RAVEN modules imported: {}'.format(raven))
+    failed += 1
+  if not np.isfinite(npv):
+    print('ERROR: NPV not computed')
+    failed += 1
+
+  # type checks, as in RAVEN's mathUtils
+  checks = [(1, True, True), (1.5, True, True), (np.float32(2.0), True, True), (np.int64(3), True, True), (np.nan, True, True),
+            (True, False, True), (np.bool_(False), False, True), ('a', False, True), (None, False, True),
+            (np.array(2.0), False, True), (np.ones(3), False, False), ([1], False, False)]
+  for value, number, single in checks:
+    if TypeChecks.isAFloatOrInt(value) != number or TypeChecks.isSingleValued(value) != single:
+      print('ERROR: wrong type checks for {!r}'.format(value))
+      failed += 1
+
+  # topological sort: drivers before the cash flows they drive
+  graph = {'A|a': ['EndNode'], 'x': ['A|a'], 'A|a2': ['EndNode'], 'B|b': ['EndNode']}
+  graph['A|a'].append('A|a2')
+  graph['A|a2'].append('B|b')
+  ordered = Scheduler.topologicalSort(graph)
+  if sorted(ordered) != sorted(['A|a', 'x', 'A|a2', 'B|b', 'EndNode']) or \
+     not ordered.index('x') < ordered.index('A|a') < ordered.index('A|a2') < ordered.index('B|b') < ordered.index('EndNode'):
+    print('ERROR: wrong evaluation order {}'.format(ordered))
+    failed += 1
+  try:
+    Scheduler.topologicalSort({'A|a': ['B|b'], 'B|b': ['A|a']})
+    print('ERROR: circular dependency not found')
+    failed += 1
+  except RuntimeError:
+    pass
+
+  if failed:
+    sys.exit(1)
+  print('Success!')
+  sys.exit(0)
+
+#  <TestInfo>
+#    <name>CashFlow_test_imports</name>
+#    <description>
+#      This input tests that the numeric core of TEAL runs without RAVEN, and its built-in type checks and topological sort.
+#    </description>
+#    <classesTested>TEAL.main, TEAL.TypeChecks, TEAL.Scheduler</classesTested>
+#  </TestInfo>
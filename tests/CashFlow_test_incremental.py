@@ -0,0 +1,118 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Integration test for the incremental evaluation of runs that share a plan.
+Sweeps only the revenue, and checks that the capex and its amortization are computed once,
+that unchanged components keep their project cash flows and FCFF contribution, that
+the results match runs with a fresh plan, and that an outdated plan is replaced.
+"""
+import os
+import sys
+import numpy as np
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import main
+from CashFlow_test_batch import load, sampleVariables
+
+def countCalls(comp, cf, calls):
+  """
+    Counts the lifetime evaluations of a cash flow
+    @ In, comp, CashFlows.Component, component of the cash flow
+    @ In, cf, CashFlows.CashFlow, cash flow to watch
+    @ In, calls, dict, 'Component|CashFlow': number of evaluations, updated
+    @ Out, None
+  """
+  original = cf.calculateCashflow
+  name = '{}|{}'.format(comp.name, cf.name)
+  def counted(*args, **kwargs):
+    """
+      Counts, then evaluates
+      @ In, args, list, positional arguments
+      @ In, kwargs, dict, keyword arguments
+      @ Out, ret, dict, as from calculateCashflow
+    """
+    calls[name] = calls.get(name, 0) + 1
+    return original(*args, **kwargs)
+  cf.calculateCashflow = counted
+
+if __name__ == '__main__':
+  numRuns = 4
+  variables = dict((name, value[0]) for name, value in sampleVariables(1).items())
+  # only the BOP revenue is swept
+  revenues = sampleVariables(numRuns + 1)['BOP_TOT_revenueEL']
+  settings, components = load('Cash_Flow_input_NPV.xml')
+  calls = {}
+  for comp in components:
+    for cf in comp.getCashflows():
+      countCalls(comp, cf, calls)
+  plan = main.compilePlan(settings, components, v=settings._verbosity)
+
+  failed = 0
+  for revenue in revenues[:numRuns]:
+    variables['BOP_TOT_revenueEL'] = revenue
+    memoized = main.run(settings, components, variables, plan=plan)
+    fresh = main.run(settings, components, variables)
+    for metric, value in fresh.items():
+      if abs(memoized[metric] - value) > 1e-12 * abs(value):
+        print('ERROR: metric {}: reused {:1.9e}, fresh {:1.9e}'.format(metric, memoized[metric], value))
+        failed += 1
+  # only the BOP revenue changes every run; everything else only in the fresh runs (plus the first reusing one)
+  expected = {'BOP|RE': 2 * numRuns, 'BOP|CA': numRuns + 1, 'BOP|BOP_amortize_CA': numRuns + 1,
+              'BOP|BOP_depreciate_CA': numRuns + 1, 'IP|CA': numRuns + 1, 'IP|RE': numRuns + 1}
+  for name, count in expected.items():
+    if calls.get(name) != count:
+      print('ERROR: cash flow {} evaluated {} times, expected {}'.format(name, calls.get(name), count))
+      failed += 1
+  # the unchanged component keeps its project cash flows and its contribution to the FCFF
+  ipCashflows = plan.projectMemo['IP'][1]
+  variables['BOP_TOT_revenueEL'] = revenues[numRuns]
+  memoized, details = main.run(settings, components, variables, plan=plan, returnDetails=True)
+  fresh, freshDetails = main.run(settings, components, variables, returnDetails=True)
+  if plan.projectMemo['IP'][1] is not ipCashflows or plan.fcffMemo['IP'][0] is not ipCashflows:
+    print('ERROR: project cash flows of the unchanged component IP evaluated again')
+    failed += 1
+  if not np.allclose(details['FCFF'], freshDetails['FCFF'], rtol=1e-14, atol=0.0):
+    print('ERROR: FCFF from reused contributions differs from the fresh one')
+    failed += 1
+  # changing the capex driver is seen by the amortization downstream
+  variables['BOP_capacity'] *= 1.05
+  memoized = main.run(settings, components, variables, plan=plan)
+  fresh = main.run(settings, components, variables)
+  if calls['BOP|BOP_depreciate_CA'] != numRuns + 4:
+    print('ERROR: depreciation not evaluated again after its upstream capex driver changed')
+    failed += 1
+  for metric, value in fresh.items():
+    if abs(memoized[metric] - value) > 1e-12 * abs(value):
+      print('ERROR: metric {} after driver change: reused {:1.9e}, fresh {:1.9e}'.format(metric, memoized[metric], value))
+      failed += 1
+  # an outdated plan is compiled again, and the new one is provided to keep for the next runs
+  newSettings, newComponents = load('Cash_Flow_input_NPV.xml')
+  results, newPlan = main.run(newSettings, newComponents, variables, plan=plan, returnPlan=True)
+  if newPlan is plan or not newPlan.isValid(newSettings, newComponents):
+    print('ERROR: no valid plan provided for outdated settings and components')
+    failed += 1
+  elif main.run(newSettings, newComponents, variables, plan=newPlan, returnPlan=True)[1] is not newPlan:
+    print('ERROR: valid plan not reused')
+    failed += 1
+  if failed:
+    sys.exit(1)
+  print('Success!')
+  sys.exit(0)
+
+#  <TestInfo>
+#    <name>CashFlow_test_incremental</name>
+#    <description>
+#      This input tests that TEAL only evaluates again the cash flows whose inputs changed.
+#    </description>
+#    <classesTested>TEAL.main</classesTested>
+#  </TestInfo>
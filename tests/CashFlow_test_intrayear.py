@@ -0,0 +1,153 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Integration test for the chunked intrayear aggregation of recurring cash flows.
+Aggregates memory-mapped hourly data in chunks that don't line up with the years, and checks
+the yearly cash flows against a year-by-year aggregation. Then aggregates many samples at once,
+and checks a batched evaluation against one-at-a-time evaluations.
+"""
+import os
+import sys
+import tempfile
+import numpy as np
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import CashFlows
+import Intrayear
+import main
+
+def createRecurring(name, life):
+  """
+    Constructs a recurring cash flow to be filled with intrayear data
+    @ In, name, str, cash flow name
+    @ In, life, int, component lifetime
+    @ Out, cf, CashFlows.Recurring, cash flow
+  """
+  cf = CashFlows.Recurring()
+  cf.setParams({'name': name, 'X': 1, 'mult_target': None, 'inflation': False})
+  cf.initParams(life)
+  return cf
+
+def build(recurring, life):
+  """
+    Constructs the settings and the component of an hourly recurring cash flow and a capex
+    @ In, recurring, CashFlows.Recurring, filled recurring cash flow
+    @ In, life, int, component lifetime
+    @ Out, settings, CashFlows.GlobalSettings, settings
+    @ Out, components, list, CashFlows.Component instances
+  """
+  settings = CashFlows.GlobalSettings()
+  settings.setParams({'DiscountRate': 0.10,
+                      'tax': 0.21,
+                      'inflation': 0.02184,
+                      'ProjectTime': life + 1,
+                      'Indicator': {'name': ['NPV', 'IRR'],
+                                    'active': ['Main|Hourly', 'Main|Cap']}})
+  comp = CashFlows.Component()
+  comp.setParams({'name': 'Main', 'Life_time': life})
+  capex = CashFlows.Capex()
+  capex.initParams(life)
+  capex.setParams({'name': 'Cap', 'alpha': -2.0e8, 'driver': 'capacity', 'reference': 1.0, 'X': 0.8,
+                   'mult_target': None, 'inflation': False})
+  comp.addCashflows([recurring, capex])
+  return settings, [comp]
+
+if __name__ == '__main__':
+  life = 4
+  firstYear = 2018
+  # hourly data from 2019 to 2024 (one year more than the lifetime, and a leap year)
+  timestamps = np.arange(np.datetime64('2019-01-01T00'), np.datetime64('2025-01-01T00'), np.timedelta64(1, 'h'))
+  rng = np.random.RandomState(3)
+  alpha = rng.uniform(20.0, 40.0, len(timestamps))
+  driver = rng.uniform(0.0, 500.0, len(timestamps))
+  workDir = tempfile.mkdtemp()
+  for name, value in [('time', timestamps.astype('datetime64[ns]')), ('alpha', alpha), ('driver', driver)]:
+    np.save(os.path.join(workDir, name + '.npy'), value)
+  mappedTime, mappedAlpha, mappedDriver = (np.load(os.path.join(workDir, name + '.npy'), mmap_mode='r')
+                                           for name in ['time', 'alpha', 'driver'])
+
+  failed = 0
+  # year by year, with all of each year in memory
+  expected = createRecurring('ByYear', life)
+  calendar = timestamps.astype('datetime64[Y]').astype(int) + 1970
+  for year in np.unique(calendar):
+    y = year - firstYear
+    if y > life:
+      break
+    inYear = calendar == year
+    expected.computeIntrayearCashflow(y, alpha[inYear], driver[inYear])
+  years = Intrayear.yearIndices(mappedTime[:3], firstYear)
+  if list(years) != [1, 1, 1]:
+    print('ERROR: project years of timestamps: {}'.format(years))
+    failed += 1
+  for chunkSize in [1000, 8760, 100000]:
+    chunked = createRecurring('Chunked', life)
+    chunked.accumulateIntrayearCashflows(Intrayear.intrayearChunks(mappedTime, mappedAlpha, mappedDriver,
+                                                                   firstYear=firstYear, chunkSize=chunkSize))
+    if not np.allclose(chunked._yearlyCashflow, expected._yearlyCashflow, rtol=1e-12, atol=0.0):
+      print('ERROR: chunks of {}: yearly cash flow {}, expected {}'.format(chunkSize, chunked._yearlyCashflow, expected._yearlyCashflow))
+      failed += 1
+  # chunks can also be provided directly, with project years instead of timestamps and a constant price
+  chunked = createRecurring('Direct', life)
+  chunks = ((calendar[i:i+5000] - firstYear, 30.0, driver[i:i+5000]) for i in range(0, len(driver), 5000))
+  chunked.accumulateIntrayearCashflows(chunks)
+  sums = np.array([0.0] + [30.0 * driver[calendar == firstYear + y].sum() for y in range(1, life + 1)])
+  if not np.allclose(chunked._yearlyCashflow, sums, rtol=1e-12, atol=0.0):
+    print('ERROR: direct chunks: yearly cash flow {}, expected {}'.format(chunked._yearlyCashflow, sums))
+    failed += 1
+  # many samples at once, for all years in one pass
+  numSamples = 5
+  factors = rng.uniform(0.5, 1.5, (numSamples, 1))
+  sampledAlpha = alpha * factors
+  sampledDriver = driver * factors[::-1]
+  batch = createRecurring('Hourly', life)
+  batch.computeIntrayearCashflowBatch(calendar - firstYear, sampledAlpha, sampledDriver)
+  if batch._yearlyCashflow.shape != (numSamples, life + 1):
+    print('ERROR: batched yearly cash flow has shape {}'.format(batch._yearlyCashflow.shape))
+    failed += 1
+  # same, from unordered data
+  order = rng.permutation(len(calendar))
+  shuffled = createRecurring('Hourly', life)
+  shuffled.computeIntrayearCashflowBatch(calendar[order] - firstYear, sampledAlpha[:, order], sampledDriver[:, order])
+  if not np.allclose(shuffled._yearlyCashflow, batch._yearlyCashflow, rtol=1e-12, atol=0.0):
+    print('ERROR: batched yearly cash flow depends on the order of the entries')
+    failed += 1
+  capacity = rng.uniform(0.8, 1.2, numSamples)
+  settings, components = build(batch, life)
+  batched = main.runBatch(settings, components, {'capacity': capacity})
+  for s in range(numSamples):
+    single = createRecurring('Hourly', life)
+    for y in range(1, life + 1):
+      inYear = calendar == firstYear + y
+      single.computeIntrayearCashflow(y, sampledAlpha[s, inYear], sampledDriver[s, inYear])
+    if not np.allclose(batch._yearlyCashflow[s], single._yearlyCashflow, rtol=1e-12, atol=0.0):
+      print('ERROR: sample {}: yearly cash flow {}, expected {}'.format(s, batch._yearlyCashflow[s], single._yearlyCashflow))
+      failed += 1
+    settings, components = build(single, life)
+    results = main.run(settings, components, {'capacity': capacity[s]})
+    for metric, value in results.items():
+      if abs(batched[metric][s] - value) > 1e-10 * abs(value):
+        print('ERROR: sample {} metric {}: batched {:1.9e}, single {:1.9e}'.format(s, metric, batched[metric][s], value))
+        failed += 1
+  if failed:
+    sys.exit(1)
+  print('Success!')
+  sys.exit(0)
+
+#  <TestInfo>
+#    <name>CashFlow_test_intrayear</name>
+#    <description>
+#      This input tests the chunked and multi-sample aggregation of intrayear (hourly) data into yearly recurring cash flows of TEAL.
+#    </description>
+#    <classesTested>TEAL.Intrayear, TEAL.CashFlows.Recurring, TEAL.main</classesTested>
+#  </TestInfo>
@@ -0,0 +1,138 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Unit test for the IRR solver.
+Checks known rates, NPVs at the found rates, failure codes and warm starts, including cash flows with
+more than one rate of return, where a sweep of runs has to agree with the batched evaluation.
+"""
+import os
+import sys
+import numpy as np
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import IrrSolver
+import CashFlows
+import main
+
+def npv(fcff, rate):
+  """
+    Net present value of yearly cash flows
+    @ In, fcff, np.array, yearly cash flows (samples x years)
+    @ In, rate, np.array, discount rate per sample
+    @ Out, npv, np.array, net present value per sample
+  """
+  years = np.arange(fcff.shape[-1])
+  return np.sum(fcff / np.power(1.0 + rate[:, np.newaxis], years), axis=-1)
+
+def twoRoots(low, high):
+  """
+    Yearly cash flows whose NPV is zero at two rates
+    @ In, low, float, lower rate of return
+    @ In, high, float, higher rate of return
+    @ Out, fcff, np.array, yearly cash flows (3,)
+  """
+  # NPV = -(x - x1)(x - x2) in x = 1 / (1 + r)
+  x1, x2 = 1.0 / (1.0 + low), 1.0 / (1.0 + high)
+  return np.array([-x1 * x2, x1 + x2, -1.0])
+
+def flowModel():
+  """
+    Creates a single component whose yearly cash flows are taken from the variables "invest" (first year)
+    and "flow" (following years)
+    @ Out, settings, CashFlows.GlobalSettings, settings
+    @ Out, components, list, CashFlows.Component instances
+  """
+  settings = CashFlows.GlobalSettings()
+  settings.setParams({'DiscountRate': 0.1, 'tax': 0.0, 'inflation': 0.0, 'ProjectTime': 4,
+                      'Indicator': {'name': ['IRR'], 'active': ['Project|Invest', 'Project|Flow']}})
+  comp = CashFlows.Component()
+  comp.setParams({'name': 'Project', 'Life_time': 4})
+  invest = CashFlows.Capex()
+  invest.name = 'Invest'
+  invest.initParams(4)
+  invest.setParams({'name': 'Invest', 'alpha': 1.0, 'driver': 'invest', 'reference': 1.0, 'X': 1.0, 'mult_target': None,
+                    'inflation': False, 'tax': False})
+  flow = CashFlows.Recurring()
+  flow.setParams({'name': 'Flow', 'alpha': 1.0, 'driver': 'flow', 'X': 1, 'mult_target': None, 'inflation': False, 'tax': False})
+  comp.addCashflows([invest, flow])
+  return settings, [comp]
+
+if __name__ == '__main__':
+  failed = 0
+  # known rates
+  for fcff, expected in [([-1.0, 2.0], 1.0),
+                         ([-100.0, 110.0], 0.1),
+                         ([-100.0, 0.0, 121.0], 0.1),
+                         ([-100.0, 60.0, 60.0], (np.sqrt(0.25 + 100.0 / 60.0) - 0.5)**-1 - 1.0)]:
+    irr, status = IrrSolver.solve(np.array(fcff))
+    if status != IrrSolver.CONVERGED or abs(irr - expected) > 1e-9:
+      print('ERROR: IRR of {}: expected {}, got {} (status {})'.format(fcff, expected, irr, status))
+      failed += 1
+  # no solution or bad cash flows give NaN and a code instead of an error
+  for fcff, expected in [(np.ones(10), IrrSolver.NO_ROOT),
+                         (np.zeros(10), IrrSolver.INVALID),
+                         (np.array([-1.0, np.nan, 2.0]), IrrSolver.INVALID)]:
+    irr, status = IrrSolver.solve(fcff)
+    if status != expected or not np.isnan(irr):
+      print('ERROR: IRR of {}: expected NaN with status {}, got {} with status {}'.format(fcff, expected, irr, status))
+      failed += 1
+  # many long projects at once, cold and warm started
+  rng = np.random.RandomState(3)
+  fcff = rng.uniform(0.5, 1.5, (200, 121)) * 10.0
+  fcff[:, 0] = -rng.uniform(50.0, 150.0, 200)
+  irr, status = IrrSolver.solve(fcff)
+  if np.any(status != IrrSolver.CONVERGED) or np.max(np.abs(npv(fcff, irr))) > 1e-6:
+    print('ERROR: batched IRRs not converged, max NPV at IRR {}'.format(np.max(np.abs(npv(fcff, irr)))))
+    failed += 1
+  warm, status = IrrSolver.solve(fcff, guess=irr + 0.01)
+  if np.any(status != IrrSolver.CONVERGED) or np.max(np.abs(warm - irr)) > 1e-9:
+    print('ERROR: warm started IRRs differ by up to {}'.format(np.max(np.abs(warm - irr))))
+    failed += 1
+  # with two roots, a guess at the farther one still gives the root closest to zero
+  fcff = twoRoots(-0.15, 0.02)
+  for guess in (None, -0.15, -0.14, 0.5):
+    irr, status = IrrSolver.solve(fcff, guess=guess)
+    if status != IrrSolver.CONVERGED or abs(irr - 0.02) > 1e-9:
+      print('ERROR: IRR of two roots with guess {}: expected 0.02, got {} (status {})'.format(guess, irr, status))
+      failed += 1
+  # a sweep of runs sharing a plan (and so warm started) agrees with the batch, whatever the sample order
+  flows = np.zeros((3, 5))
+  flows[0, :2] = [-1.0, 0.85] # single root at -0.15, right next to the farther root of the next sample
+  flows[1, :3] = twoRoots(-0.15, 0.02)
+  flows[2, :3] = twoRoots(-0.3, -0.05)
+  settings, components = flowModel()
+  variables = {'invest': flows[:, 0], 'flow': flows}
+  batched = main.runBatch(settings, components, variables)['IRR']
+  for order in ([0, 1, 2], [2, 1, 0], [1, 0, 2]):
+    plan = main.compilePlan(settings, components)
+    for s in order:
+      sample = dict((name, value[s]) for name, value in variables.items())
+      single = main.run(settings, components, sample, plan=plan)['IRR']
+      if abs(single - batched[s]) > 1e-9:
+        print('ERROR: sample {} (order {}): run IRR {}, batched IRR {}'.format(s, order, single, batched[s]))
+        failed += 1
+  if abs(batched[1] - 0.02) > 1e-9 or abs(batched[2] + 0.05) > 1e-9:
+    print('ERROR: batched IRRs {} are not the roots closest to zero'.format(batched))
+    failed += 1
+  if failed:
+    sys.exit(1)
+  print('Success!')
+  sys.exit(0)
+
+#  <TestInfo>
+#    <name>CashFlow_test_irrSolver</name>
+#    <description>
+#      This input tests the IRR solver of TEAL, including failures, warm starts and cash flows with several rates of return.
+#    </description>
+#    <classesTested>TEAL.IrrSolver, TEAL.main</classesTested>
+#  </TestInfo>
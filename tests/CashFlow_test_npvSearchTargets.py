@@ -0,0 +1,95 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Integration test for NPV_search with several targets.
+Checks the multipliers for all targets at once against searching one target at a time, and the
+search with every cash flow as a multiplier target.
+"""
+import os
+import sys
+import xml.etree.ElementTree as ET
+import numpy as np
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import main
+
+def load(xmlFile, targets, allMultTargets=False):
+  """
+    Loads the economics from an input file, replacing the NPV_search targets
+    @ In, xmlFile, str, path to the economics input file
+    @ In, targets, list, NPV targets
+    @ In, allMultTargets, bool, optional, if True then make every cash flow a multiplier target
+    @ Out, settings, CashFlows.GlobalSettings, settings
+    @ Out, components, list, CashFlows.Component instances
+  """
+  root = ET.Element('ROOT')
+  root.append(ET.parse(xmlFile).getroot())
+  root.find('.//Indicator').set('target', ','.join(repr(t) for t in targets))
+  settings, components = main.readFromXml(root)
+  if allMultTargets:
+    # including the amortization cash flows created from the input
+    for comp in components:
+      for cf in comp.getCashflows():
+        cf.setParams({'mult_target': True})
+  main.checkRunSettings(settings, components)
+  return settings, components
+
+if __name__ == '__main__':
+  targets = [0.0, 1.0e9, -2.5e8]
+  numSamples = 4
+  rng = np.random.RandomState(7)
+  variables = {'BOP_capacity': 300.0e6 * rng.uniform(0.8, 1.2, numSamples),
+               'BOP_TOT_revenueEL': 350.0e6 * rng.uniform(0.8, 1.2, (numSamples, 61)),
+               'IP_capacity': 51.0e6 * rng.uniform(0.8, 1.2, numSamples),
+               'IP_TOT_revenueBY': 31.5e6 * rng.uniform(0.8, 1.2, numSamples),
+               'Multiplier': rng.uniform(0.9, 1.1, numSamples)}
+  failed = 0
+  xmlFile = 'Cash_Flow_input_NPVsearch.xml'
+  settings, components = load(xmlFile, targets)
+  batched = main.runBatch(settings, components, variables)['NPV_mult']
+  if batched.shape != (numSamples, len(targets)):
+    print('ERROR: expected multipliers with shape {}, got {}'.format((numSamples, len(targets)), batched.shape))
+    sys.exit(1)
+  for t, target in enumerate(targets):
+    settings, components = load(xmlFile, [target])
+    for s in range(numSamples):
+      sample = dict((k, v[s]) for k, v in variables.items())
+      single = main.run(settings, components, sample)['NPV_mult']
+      if abs(batched[s, t] - single) > 1e-10 * abs(single):
+        print('ERROR: sample {} target {}: batched {:1.9e}, single {:1.9e}'.format(s, target, batched[s, t], single))
+        failed += 1
+  # with every cash flow as a multiplier target, there are no other cash flows to discount
+  settings, components = load(xmlFile, [1.0e9], allMultTargets=True)
+  batched = main.runBatch(settings, components, variables)['NPV_mult']
+  if batched.shape != (numSamples,):
+    print('ERROR: all mult targets: expected multipliers with shape {}, got {}'.format((numSamples,), batched.shape))
+    failed += 1
+  else:
+    for s in range(numSamples):
+      sample = dict((k, v[s]) for k, v in variables.items())
+      single = main.run(settings, components, sample)['NPV_mult']
+      if not isinstance(single, float) or abs(batched[s] - single) > 1e-10 * abs(single):
+        print('ERROR: all mult targets, sample {}: batched {}, single {!r}'.format(s, batched[s], single))
+        failed += 1
+  if failed:
+    sys.exit(1)
+  print('Success!')
+  sys.exit(0)
+
+#  <TestInfo>
+#    <name>CashFlow_test_npvSearchTargets</name>
+#    <description>
+#      This input tests NPV_search with several targets against searching each target separately.
+#    </description>
+#    <classesTested>TEAL.main</classesTested>
+#  </TestInfo>
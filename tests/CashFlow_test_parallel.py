@@ -0,0 +1,73 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Integration test for the parallel evaluation of sample sets in stand-alone mode.
+Reads samples from CSV, evaluates them over a process pool, and checks the written results
+against one-at-a-time evaluations.
+"""
+import os
+import sys
+import csv
+import tempfile
+import numpy as np
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import main
+import SampleIO
+import ParallelDriver
+from CashFlow_test_batch import load, sampleVariables
+
+if __name__ == '__main__':
+  numSamples = 10
+  variables = sampleVariables(numSamples)
+  workDir = tempfile.mkdtemp()
+  samplesFile = os.path.join(workDir, 'samples.csv')
+  outFile = os.path.join(workDir, 'results.csv')
+  header = ['BOP_capacity'] + ['BOP_TOT_revenueEL[{}]'.format(i) for i in range(61)] + ['IP_capacity', 'IP_TOT_revenueBY', 'Multiplier']
+  table = np.column_stack([variables['BOP_capacity'], variables['BOP_TOT_revenueEL'], variables['IP_capacity'],
+                           variables['IP_TOT_revenueBY'], variables['Multiplier']])
+  np.savetxt(samplesFile, table, delimiter=',', header=','.join(header), comments='')
+
+  failed = 0
+  samples = SampleIO.readSamplesCsv(samplesFile)
+  for name, value in variables.items():
+    if not np.array_equal(samples[name], value):
+      print('ERROR: variable {} not read back from the samples file'.format(name))
+      failed += 1
+  settings, components = load('Cash_Flow_input_NPV.xml')
+  with SampleIO.CsvResultWriter(outFile) as writer:
+    for results in ParallelDriver.runSamples(settings, components, samples, workers=2, chunkSize=3):
+      writer.write(results)
+  with open(outFile, 'r') as f:
+    rows = list(csv.DictReader(f))
+  if len(rows) != numSamples:
+    print('ERROR: expected {} results, got {}'.format(numSamples, len(rows)))
+    failed += 1
+  for s, row in enumerate(rows):
+    single = main.run(settings, components, dict((k, v[s]) for k, v in variables.items()))
+    for metric, value in single.items():
+      if abs(float(row[metric]) - value) > 1e-10 * abs(value):
+        print('ERROR: sample {} metric {}: parallel {}, single {:1.9e}'.format(s, metric, row[metric], value))
+        failed += 1
+  if failed:
+    sys.exit(1)
+  print('Success!')
+  sys.exit(0)
+
+#  <TestInfo>
+#    <name>CashFlow_test_parallel</name>
+#    <description>
+#      This input tests the parallel evaluation of sample sets of TEAL in stand-alone mode.
+#    </description>
+#    <classesTested>TEAL.ParallelDriver, TEAL.SampleIO</classesTested>
+#  </TestInfo>
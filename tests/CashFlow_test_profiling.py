@@ -0,0 +1,117 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Integration test for the profiling of runs.
+Checks the stages, counters and breakdowns of the profiling report, and its JSON and Chrome trace outputs.
+"""
+import os
+import sys
+import json
+import tempfile
+import numpy as np
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import main
+from CashFlow_test_batch import load, sampleVariables
+
+def check(condition, message):
+  """
+    Reports a failed check
+    @ In, condition, bool, check outcome
+    @ In, message, str, description of the failure
+    @ Out, failed, int, 1 if the check failed, 0 otherwise
+  """
+  if not condition:
+    print('ERROR: {}'.format(message))
+    return 1
+  return 0
+
+if __name__ == '__main__':
+  failed = 0
+  settings, components = load('Cash_Flow_input_NPV.xml')
+  variables = dict((name, value[0]) for name, value in sampleVariables(1).items())
+  names = ['{}|{}'.format(comp.name, cf.name) for comp in components for cf in comp.getCashflows()]
+
+  # results don't change, and the report comes last
+  plain = main.run(settings, components, variables)
+  plan = main.compilePlan(settings, components)
+  results, report = main.run(settings, components, variables, plan=plan, profile=True)
+  for metric, value in plain.items():
+    failed += check(abs(results[metric] - value) <= 1e-10 * abs(value), 'profiled {} differs'.format(metric))
+  for stage in ['plan', 'checkVariables', 'lifetime', 'project', 'FCFF', 'discounting', 'NPV']:
+    failed += check(stage in report['stages'] and report['stages'][stage] >= 0.0, 'missing stage {}'.format(stage))
+  failed += check(report['counters']['cashflows evaluated'] == len(names), 'wrong count of evaluated cash flows')
+  failed += check(report['counters']['bytes'] > 0, 'no bytes counted')
+  failed += check(sorted(report['cashflows']) == sorted(names), 'wrong cash flow breakdown')
+  failed += check(set(report['components']) <= set(comp.name for comp in components) and report['components'],
+                  'wrong component breakdown')
+  failed += check(set(plan.timings) == set(report['stages']), 'plan timings differ from the stages')
+
+  # without profiling, nothing is timed
+  timings = plan.timings
+  created = []
+  original = main.Profiling.Profiler.__init__
+  def watched(self, *args, **kwargs):
+    """
+      Records that a Profiler is created, then creates it
+      @ In, args, list, positional arguments
+      @ In, kwargs, dict, keyword arguments
+      @ Out, None
+    """
+    created.append(self)
+    original(self, *args, **kwargs)
+  main.Profiling.Profiler.__init__ = watched
+  main.run(settings, components, variables, plan=plan)
+  main.Profiling.Profiler.__init__ = original
+  failed += check(not created, 'profiler created without profiling')
+  failed += check(plan.timings is timings, 'stages timed without profiling')
+
+  # a second run with the same inputs reuses everything
+  _, details, report = main.run(settings, components, variables, plan=plan, returnDetails=True, profile=True)
+  failed += check(report['counters'].get('cashflows reused') == len(names), 'wrong count of reused cash flows')
+  failed += check('cashflows evaluated' not in report['counters'], 'cash flows evaluated again')
+  failed += check('FCFF' in details, 'details missing with profiling')
+
+  # batches, and profilers shared over runs
+  profiler = main.Profiling.Profiler()
+  batch = sampleVariables(3)
+  results, report = main.runBatch(settings, components, batch, profile=profiler)
+  failed += check(len(results['NPV']) == 3, 'wrong batch results')
+  main.runBatch(settings, components, batch, plan=plan, profile=profiler)
+  failed += check(profiler.report()['counters']['cashflows evaluated'] == 2 * len(names), 'profiler not shared')
+
+  # outputs
+  with tempfile.TemporaryDirectory() as tmp:
+    jsonPath = os.path.join(tmp, 'profile.json')
+    main.Profiling.dumpJson(report, jsonPath)
+    with open(jsonPath) as f:
+      failed += check(json.load(f)['stages'] == report['stages'], 'wrong JSON output')
+    tracePath = os.path.join(tmp, 'profile.trace.json')
+    main.Profiling.dumpChromeTrace(report, tracePath)
+    with open(tracePath) as f:
+      events = json.load(f)['traceEvents']
+    failed += check(len(events) == len(report['events']) and all(e['ph'] == 'X' and e['dur'] >= 0 for e in events),
+                    'wrong trace output')
+
+  if failed:
+    sys.exit(1)
+  print('Success!')
+  sys.exit(0)
+
+#  <TestInfo>
+#    <name>CashFlow_test_profiling</name>
+#    <description>
+#      This input tests the profiling report of TEAL runs, and its JSON and Chrome trace outputs.
+#    </description>
+#    <classesTested>TEAL.main, TEAL.Profiling</classesTested>
+#  </TestInfo>
@@ -0,0 +1,89 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Unit test for reading the economics input as it is parsed.
+Checks that the settings and components read from a file match the ones read from the whole XML tree,
+and that the problems of all the components are reported together.
+"""
+import os
+import sys
+import tempfile
+import xml.etree.ElementTree as ET
+import numpy as np
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import main
+
+def describe(obj):
+  """
+    Describes the state of an object read from the input, for comparison
+    @ In, obj, object, settings, component or cash flow
+    @ Out, description, dict, attribute: value, with nested objects also described
+  """
+  description = {}
+  for name, value in vars(obj).items():
+    if isinstance(value, list):
+      value = [describe(item) if hasattr(item, '__dict__') else item for item in value]
+    elif isinstance(value, np.ndarray):
+      value = value.tolist()
+    elif hasattr(value, '__dict__'):
+      value = describe(value)
+    description[name] = value
+  return description
+
+if __name__ == '__main__':
+  failed = 0
+  for xmlFile in ['Cash_Flow_input_NPV.xml', 'Cash_Flow_input_NPVsearch.xml', 'Cash_Flow_input_custom_macrs_NPV.xml']:
+    root = ET.Element('ROOT')
+    root.append(ET.parse(xmlFile).getroot())
+    settings, components = main.readFromXml(root)
+    fromFile = main.readFromFile(xmlFile)
+    if describe(settings) != describe(fromFile[0]) or \
+       [describe(comp) for comp in components] != [describe(comp) for comp in fromFile[1]]:
+      print('ERROR: {} read differently from file'.format(xmlFile))
+      failed += 1
+
+  # <Economics> below the root, with problems in two components
+  bad = """<Simulation><Models><Economics verbosity="100">
+             <Global><DiscountRate>0.1</DiscountRate><tax>0.2</tax><inflation>0</inflation><Indicator name="NPV">A|a</Indicator></Global>
+             <Component name="A"><Life_time>10</Life_time><CashFlows>
+               <Recurring name="a" tax="maybe"><driver>1</driver><alpha>1</alpha></Recurring>
+             </CashFlows></Component>
+             <Component name="B"><Life_time>10</Life_time><Extra/></Component>
+             <Component name="C"><Life_time>10</Life_time></Component>
+           </Economics></Models></Simulation>"""
+  with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, 'bad.xml')
+    with open(path, 'w') as f:
+      f.write(bad)
+    try:
+      main.readFromFile(path)
+      print('ERROR: problems in the input not found')
+      failed += 1
+    except IOError as error:
+      message = str(error)
+      if not message.startswith('2 nodes') or '"A"' not in message or 'Extra' not in message:
+        print('ERROR: unexpected report of the problems: {}'.format(message))
+        failed += 1
+  if failed:
+    sys.exit(1)
+  print('Success!')
+  sys.exit(0)
+
+#  <TestInfo>
+#    <name>CashFlow_test_readFromFile</name>
+#    <description>
+#      This input tests reading the TEAL economics from a file as it is parsed, against reading the whole XML tree.
+#    </description>
+#    <classesTested>TEAL.main</classesTested>
+#  </TestInfo>
@@ -0,0 +1,89 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Integration test for the result writers of the stand-alone mode.
+Writes the indicators, yearly FCFF and project cash flows of a sample set to CSV and to NPZ,
+and checks them against a batched evaluation.
+"""
+import os
+import sys
+import tempfile
+import numpy as np
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import main
+import SampleIO
+import ParallelDriver
+from CashFlow_test_batch import load, sampleVariables
+
+def compare(label, found, expected):
+  """
+    Compares written values to the expected ones
+    @ In, label, str, what is compared
+    @ In, found, np.array, values read back
+    @ In, expected, np.array, expected values
+    @ Out, failed, int, 1 if they differ, 0 otherwise
+  """
+  if found.shape != expected.shape or not np.allclose(found, expected, rtol=1e-12, atol=0.0):
+    print('ERROR: {} not written as expected'.format(label))
+    return 1
+  return 0
+
+if __name__ == '__main__':
+  numSamples = 10
+  variables = sampleVariables(numSamples)
+  settings, components = load('Cash_Flow_input_NPV.xml')
+  expected, details = main.runBatch(settings, components, variables, returnDetails=True)
+  workDir = tempfile.mkdtemp()
+
+  failed = 0
+  for outFile in [os.path.join(workDir, 'results.csv'), os.path.join(workDir, 'results.npz')]:
+    with SampleIO.openResultWriter(outFile) as writer:
+      for results, chunkDetails in ParallelDriver.runSamples(settings, components, variables, workers=2, chunkSize=3, details=True):
+        writer.write(results, chunkDetails)
+    if writer.numSamples != numSamples:
+      print('ERROR: {}: expected {} samples written, got {}'.format(outFile, numSamples, writer.numSamples))
+      failed += 1
+    if outFile.endswith('.npz'):
+      # memory-mapped, and readable by numpy as well
+      written = SampleIO.readSamples(outFile)
+      if not isinstance(written['FCFF'], np.memmap):
+        print('ERROR: FCFF not memory-mapped from {}'.format(outFile))
+        failed += 1
+      with np.load(outFile) as archive:
+        failed += compare('numpy FCFF', archive['FCFF'], details['FCFF'])
+      cashflows = dict((name, written[name]) for name in details['cashflows'])
+    else:
+      written = SampleIO.readSamplesCsv(outFile)
+      written.update(SampleIO.readSamplesCsv(os.path.join(workDir, 'results_FCFF.csv')))
+      cashflows = SampleIO.readSamplesCsv(os.path.join(workDir, 'results_cashflows.csv'))
+    for metric, value in expected.items():
+      failed += compare('{} {}'.format(outFile, metric), np.asarray(written[metric]), value)
+    failed += compare('{} FCFF'.format(outFile), np.asarray(written['FCFF']), details['FCFF'])
+    if sorted(cashflows) != sorted(details['cashflows']):
+      print('ERROR: {}: cash flows {} written, expected {}'.format(outFile, sorted(cashflows), sorted(details['cashflows'])))
+      failed += 1
+    for name, value in details['cashflows'].items():
+      failed += compare('{} {}'.format(outFile, name), np.asarray(cashflows[name]), value)
+  if failed:
+    sys.exit(1)
+  print('Success!')
+  sys.exit(0)
+
+#  <TestInfo>
+#    <name>CashFlow_test_resultWriters</name>
+#    <description>
+#      This input tests the CSV and NPZ result writers of TEAL in stand-alone mode, including the yearly details.
+#    </description>
+#    <classesTested>TEAL.SampleIO, TEAL.ParallelDriver</classesTested>
+#  </TestInfo>
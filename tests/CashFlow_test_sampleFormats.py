@@ -0,0 +1,144 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Unit test for the sample set readers of the stand-alone mode.
+Writes the same samples in each supported format and checks they are read back the same, and that
+malformed values in a variable file are reported.
+"""
+import os
+import sys
+import tempfile
+import numpy as np
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import SampleIO
+
+def compare(fmt, samples, expected):
+  """
+    Compares samples read back against the written ones
+    @ In, fmt, str, name of the format
+    @ In, samples, dict, samples read back
+    @ In, expected, dict, samples written
+    @ Out, failed, int, number of mismatching variables
+  """
+  failed = 0
+  if sorted(samples) != sorted(expected):
+    print('ERROR: {}: read variables {}, expected {}'.format(fmt, sorted(samples), sorted(expected)))
+    return 1
+  for name, value in expected.items():
+    if not np.array_equal(np.asarray(samples[name][:]), value):
+      print('ERROR: {}: variable "{}" not read back'.format(fmt, name))
+      failed += 1
+  return failed
+
+if __name__ == '__main__':
+  numSamples = 7
+  rng = np.random.RandomState(9)
+  expected = {'capacity': rng.uniform(1.0, 2.0, numSamples),
+              'revenue': rng.uniform(1.0, 2.0, (numSamples, 12)),
+              'Multiplier': rng.uniform(1.0, 2.0, numSamples)}
+  workDir = tempfile.mkdtemp()
+  failed = 0
+
+  # CSV
+  path = os.path.join(workDir, 'samples.csv')
+  header = ['capacity'] + ['revenue[{}]'.format(i) for i in range(12)] + ['Multiplier']
+  np.savetxt(path, np.column_stack([expected['capacity'], expected['revenue'], expected['Multiplier']]),
+             delimiter=',', header=','.join(header), comments='')
+  failed += compare('csv', SampleIO.readSamples(path), expected)
+
+  # npz, memory-mapped if not compressed
+  path = os.path.join(workDir, 'samples.npz')
+  np.savez(path, **expected)
+  samples = SampleIO.readSamples(path)
+  failed += compare('npz', samples, expected)
+  if not all(isinstance(value, np.memmap) for value in samples.values()):
+    print('ERROR: npz: uncompressed arrays are not memory-mapped')
+    failed += 1
+  path = os.path.join(workDir, 'compressed.npz')
+  np.savez_compressed(path, **expected)
+  failed += compare('compressed npz', SampleIO.readSamples(path), expected)
+
+  # directory of npy, memory-mapped
+  path = os.path.join(workDir, 'npy')
+  os.mkdir(path)
+  for name, value in expected.items():
+    np.save(os.path.join(path, name + '.npy'), value)
+  samples = SampleIO.readSamples(path)
+  failed += compare('npy', samples, expected)
+  if not all(isinstance(value, np.memmap) for value in samples.values()):
+    print('ERROR: npy: arrays are not memory-mapped')
+    failed += 1
+
+  # optional formats, only if their packages are installed
+  try:
+    import pyarrow
+    import pyarrow.parquet
+    path = os.path.join(workDir, 'samples.parquet')
+    table = pyarrow.table({'capacity': expected['capacity'],
+                           'revenue': list(expected['revenue']),
+                           'Multiplier': expected['Multiplier']})
+    pyarrow.parquet.write_table(table, path)
+    failed += compare('parquet', SampleIO.readSamples(path), expected)
+  except ImportError:
+    print('pyarrow not installed, skipping Parquet')
+  try:
+    import h5py
+    path = os.path.join(workDir, 'samples.h5')
+    with h5py.File(path, 'w') as hdf:
+      for name, value in expected.items():
+        hdf.create_dataset(name, data=value)
+    with SampleIO.readSamples(path) as samples:
+      failed += compare('hdf5', samples, expected)
+    # the file is closed along with the samples, so it can be written again
+    try:
+      h5py.File(path, 'w').close()
+    except OSError:
+      print('ERROR: hdf5: file still open after closing the samples')
+      failed += 1
+  except ImportError:
+    print('h5py not installed, skipping HDF5')
+
+  # single sample variable file
+  variables = SampleIO.readVariables('VarInp.txt')
+  with open('VarInp.txt') as f:
+    for line in f:
+      key, val = line.split(' ', 1)
+      if not np.array_equal(variables[key], np.array([float(n) for n in val.split(',')])):
+        print('ERROR: variable file: "{}" not read correctly'.format(key))
+        failed += 1
+  # a malformed value is an error, not the end of the values
+  path = os.path.join(workDir, 'malformed.txt')
+  with open(path, 'w') as f:
+    f.write('good 1,2,3\nbad 1,2,x,4\n')
+  try:
+    SampleIO.readVariables(path)
+    print('ERROR: variable file: malformed value not reported')
+    failed += 1
+  except IOError as error:
+    if 'line 2' not in str(error) or '"bad"' not in str(error):
+      print('ERROR: variable file: unclear message for a malformed value: {}'.format(error))
+      failed += 1
+
+  if failed:
+    sys.exit(1)
+  print('Success!')
+  sys.exit(0)
+
+#  <TestInfo>
+#    <name>CashFlow_test_sampleFormats</name>
+#    <description>
+#      This input tests reading sample sets from CSV, npz, npy, Parquet and HDF5 files for the stand-alone mode of TEAL.
+#    </description>
+#    <classesTested>TEAL.SampleIO</classesTested>
+#  </TestInfo>
@@ -0,0 +1,93 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Integration test for capital expenditures with sampled reference and economy of scale exponent.
+Evaluates several samples at once and checks them against one-at-a-time evaluations and
+against the cash flow equation, and that missing sampled parameters are reported.
+"""
+import os
+import sys
+import xml.etree.ElementTree as ET
+import numpy as np
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import main
+
+def load(xmlFile):
+  """
+    Loads the economics from an input file, with the reference and X of the BOP capital cost
+    taken from the variables
+    @ In, xmlFile, str, path to the economics input file
+    @ Out, settings, CashFlows.GlobalSettings, settings
+    @ Out, components, list, CashFlows.Component instances
+  """
+  econ = ET.parse(xmlFile).getroot()
+  capex = econ.find("./Component[@name='BOP']/CashFlows/Capex[@name='CA']")
+  capex.find('reference').text = 'BOP_reference'
+  capex.find('X').text = 'BOP_scale'
+  root = ET.Element('ROOT')
+  root.append(econ)
+  settings, components = main.readFromXml(root)
+  main.checkRunSettings(settings, components)
+  return settings, components
+
+if __name__ == '__main__':
+  numSamples = 6
+  rng = np.random.RandomState(11)
+  variables = {'BOP_capacity': 300.0e6 * rng.uniform(0.8, 1.2, numSamples),
+               'BOP_reference': 1100.0e6 * rng.uniform(0.9, 1.1, numSamples),
+               'BOP_scale': rng.uniform(0.5, 0.8, numSamples),
+               'BOP_TOT_revenueEL': 350.0e6 * rng.uniform(0.8, 1.2, (numSamples, 61)),
+               'IP_capacity': 51.0e6 * rng.uniform(0.8, 1.2, numSamples),
+               'IP_TOT_revenueBY': 31.5e6 * rng.uniform(0.8, 1.2, numSamples),
+               'Multiplier': rng.uniform(0.9, 1.1, numSamples)}
+  failed = 0
+  for xmlFile in ['Cash_Flow_input_NPV.xml', 'Cash_Flow_input_PI.xml']:
+    settings, components = load(xmlFile)
+    capex = [cf for comp in components if comp.name == 'BOP' for cf in comp.getCashflows() if cf.name == 'CA'][0]
+    # the capital cost of all samples at once
+    lifeCf = capex.calculateCashflow(main.stackSamples(variables)[0], {}, 61, 100)['result']
+    expected = variables['Multiplier'] * np.atleast_1d(capex.getParam('alpha'))[0] * \
+               (variables['BOP_capacity'] / variables['BOP_reference']) ** variables['BOP_scale']
+    if lifeCf.shape != (numSamples, 61) or not np.allclose(lifeCf[:, 0], expected, rtol=1e-14, atol=0.0) or np.any(lifeCf[:, 1:]):
+      print('ERROR: {} batched capital cost does not follow the cash flow equation'.format(xmlFile))
+      failed += 1
+    batched = main.runBatch(settings, components, variables)
+    for s in range(numSamples):
+      single = main.run(settings, components, dict((k, v[s]) for k, v in variables.items()))
+      for metric, value in single.items():
+        if abs(batched[metric][s] - value) > 1e-10 * abs(value):
+          print('ERROR: {} sample {} metric {}: batched {:1.9e}, single {:1.9e}'.format(xmlFile, s, metric, batched[metric][s], value))
+          failed += 1
+  # a missing reference is reported when the variables are checked, like a missing driver
+  sample = dict((k, v[0]) for k, v in variables.items() if k != 'BOP_reference')
+  try:
+    main.run(settings, components, sample)
+    print('ERROR: missing reference variable not reported')
+    failed += 1
+  except RuntimeError as error:
+    if 'reference variable "BOP_reference" was not found' not in str(error):
+      print('ERROR: wrong message for a missing reference variable: {}'.format(error))
+      failed += 1
+  if failed:
+    sys.exit(1)
+  print('Success!')
+  sys.exit(0)
+
+#  <TestInfo>
+#    <name>CashFlow_test_sampledCapex</name>
+#    <description>
+#      This input tests capital expenditures of TEAL whose reference and economy of scale exponent are sampled variables.
+#    </description>
+#    <classesTested>TEAL.CashFlows.Capex, TEAL.main</classesTested>
+#  </TestInfo>
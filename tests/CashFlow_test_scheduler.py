@@ -0,0 +1,132 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Unit test for the scheduling of the cash flow evaluations.
+Checks that cross-referenced cash flows are evaluated after their drivers, level by level whatever the
+order of the components, and that circular dependencies are reported with the offending cycle.
+"""
+import os
+import sys
+import numpy as np
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import main
+import CashFlows
+import Scheduler
+
+def capex(name, alpha, driver):
+  """
+    Creates a capital expense cash flow
+    @ In, name, str, cash flow name
+    @ In, alpha, float, cost per unit of driver
+    @ In, driver, float or str, driver value or driving 'Component|CashFlow'
+    @ Out, cf, CashFlows.Capex, cash flow
+  """
+  cf = CashFlows.Capex()
+  cf.name = name
+  cf.initParams(4)
+  cf.setParams({'name': name, 'alpha': alpha, 'driver': driver, 'reference': 1.0, 'X': 1.0, 'mult_target': None, 'inflation': False})
+  return cf
+
+def build(feeDriver='Plant|Cap', reverse=False):
+  """
+    Creates a plant whose fee is driven by its capital cost, and a grid link driven by the plant fee
+    @ In, feeDriver, str, optional, driver of the plant fee
+    @ In, reverse, bool, optional, if True then list the grid before the plant
+    @ Out, settings, CashFlows.GlobalSettings, settings
+    @ Out, components, list, CashFlows.Component instances
+  """
+  settings = CashFlows.GlobalSettings()
+  settings.setParams({'DiscountRate': 0.1, 'tax': 0.21, 'inflation': 0.02, 'ProjectTime': 5,
+                      'Indicator': {'name': ['NPV'], 'active': ['Plant|Cap', 'Plant|Fee', 'Plant|Sales', 'Grid|Link', 'Grid|Base']}})
+  plant = CashFlows.Component()
+  plant.setParams({'name': 'Plant', 'Life_time': 4})
+  sales = CashFlows.Recurring()
+  sales.setParams({'name': 'Sales', 'X': 1, 'mult_target': None, 'inflation': False})
+  sales.computeYearlyCashflow(np.array([0.0, 60.0, 60.0, 60.0, 60.0]), np.ones(5))
+  plant.addCashflows([capex('Cap', -100.0, 1.0), capex('Fee', 0.05, feeDriver), sales])
+  grid = CashFlows.Component()
+  grid.setParams({'name': 'Grid', 'Life_time': 4})
+  grid.addCashflows([capex('Link', 0.5, 'Plant|Fee'), capex('Base', -10.0, 1.0)])
+  components = [grid, plant] if reverse else [plant, grid]
+  return settings, components
+
+def names(level):
+  """
+    Names the cash flows of a plan level
+    @ In, level, list, (component, cashflow) pairs
+    @ Out, names, list, 'Component|CashFlow' names
+  """
+  return list('{}|{}'.format(comp.name, cf.name) for comp, cf in level)
+
+if __name__ == '__main__':
+  failed = 0
+  # levels of a plain graph
+  levels = Scheduler.levels({'a': ['c'], 'b': ['c', 'd'], 'c': ['e'], 'd': []})
+  if levels != [['a', 'b'], ['c', 'd'], ['e']]:
+    print('ERROR: wrong levels {}'.format(levels))
+    failed += 1
+
+  # the same portfolio, whatever the order of its components
+  npvs = []
+  for reverse in (False, True):
+    settings, components = build(reverse=reverse)
+    plan = main.compilePlan(settings, components)
+    levels = list(sorted(names(level)) for level in plan.levels)
+    if levels != [['Grid|Base', 'Plant|Cap', 'Plant|Sales'], ['Plant|Fee'], ['Grid|Link']]:
+      print('ERROR: wrong plan levels {} (reversed: {})'.format(levels, reverse))
+      failed += 1
+    if names(plan.ordered) != list(name for level in plan.levels for name in names(level)):
+      print('ERROR: plan order {} does not follow its levels'.format(names(plan.ordered)))
+      failed += 1
+    npvs.append(main.run(settings, components, {}, plan=plan)['NPV'])
+  if not np.isfinite(npvs[0]) or abs(npvs[0] - npvs[1]) > 1e-10 * abs(npvs[0]):
+    print('ERROR: NPV depends on the order of the components: {}'.format(npvs))
+    failed += 1
+
+  # a cycle across components is named in the error
+  settings, components = build(feeDriver='Grid|Link')
+  try:
+    main.compilePlan(settings, components)
+    print('ERROR: circular dependency not found')
+    failed += 1
+  except RuntimeError as error:
+    message = str(error)
+    cycle = message.split(': ', 1)[-1].split(' -> ')
+    if len(cycle) != 3 or cycle[0] != cycle[-1] or sorted(cycle[:2]) != ['Grid|Link', 'Plant|Fee']:
+      print('ERROR: cycle not named: {}'.format(message))
+      failed += 1
+
+  # a cross-reference to a missing cash flow
+  settings, components = build(feeDriver='Plant|Missing')
+  try:
+    main.compilePlan(settings, components)
+    print('ERROR: missing driver not found')
+    failed += 1
+  except RuntimeError as error:
+    if 'Plant|Missing' not in str(error):
+      print('ERROR: wrong message for a missing driver: {}'.format(error))
+      failed += 1
+
+  if failed:
+    sys.exit(1)
+  print('Success!')
+  sys.exit(0)
+
+#  <TestInfo>
+#    <name>CashFlow_test_scheduler</name>
+#    <description>
+#      This input tests the evaluation order of cross-referenced cash flows, its levels, and the report of circular dependencies.
+#    </description>
+#    <classesTested>TEAL.main, TEAL.Scheduler</classesTested>
+#  </TestInfo>
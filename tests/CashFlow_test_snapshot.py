@@ -0,0 +1,104 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Unit test for the snapshots of the economics model.
+Checks that a snapshot is only used for the input it was taken from, and gives the same results.
+"""
+import os
+import logging
+import sys
+import tempfile
+import xml.etree.ElementTree as ET
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import main
+import Snapshot
+from CashFlow_test_batch import sampleVariables
+
+def loadRoot(xmlFile):
+  """
+    Loads an input file as RAVEN provides it to the plugin
+    @ In, xmlFile, str, path to the economics input file
+    @ Out, root, xml.etree.ElementTree.Element, root node with the <Economics> node
+  """
+  root = ET.Element('ROOT')
+  root.append(ET.parse(xmlFile).getroot())
+  return root
+
+if __name__ == '__main__':
+  failed = 0
+  variables = dict((name, value[0]) for name, value in sampleVariables(1).items())
+  with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, 'economics.pkl')
+    # no snapshot yet
+    settings, components, plan, key = Snapshot.readFromXml(loadRoot('Cash_Flow_input_NPV.xml'), path)
+    if plan is not None:
+      print('ERROR: plan loaded without a snapshot')
+      failed += 1
+    main.checkRunSettings(settings, components)
+    plan = main.compilePlan(settings, components)
+    expected = main.run(settings, components, variables, plan=plan)
+    Snapshot.save(path, key, settings, components, plan)
+    # same input
+    settings, components, plan, _ = Snapshot.readFromXml(loadRoot('Cash_Flow_input_NPV.xml'), path)
+    if plan is None or not plan.isValid(settings, components) or plan.lifetimeMemo:
+      print('ERROR: snapshot not loaded for the same input')
+      failed += 1
+    else:
+      order = ['{}|{}'.format(comp.name, cf.name) for comp, cf in plan.ordered]
+      if not any('_amortize_' in name for name in order):
+        print('ERROR: amortization cash flows missing from the snapshot')
+        failed += 1
+      results = main.run(settings, components, variables, plan=plan)
+      for metric, value in expected.items():
+        if abs(results[metric] - value) > 1e-10 * abs(value):
+          print('ERROR: {} from snapshot {:1.9e}, expected {:1.9e}'.format(metric, results[metric], value))
+          failed += 1
+    # the same input, laid out differently in a stand-alone file, uses the snapshot taken through RAVEN
+    standalone = os.path.join(tmp, 'standalone.xml')
+    with open('Cash_Flow_input_NPV.xml', 'r') as f:
+      text = f.read()
+    with open(standalone, 'w') as f:
+      f.write('<Simulation>\n  <Models>\n    ' + text.strip().replace('\n', '\n    ') + '\n  </Models>\n</Simulation>\n')
+    main.setVerbosity(100)
+    settings, components, plan, _ = Snapshot.readFromFile(standalone, path)
+    if plan is None:
+      print('ERROR: snapshot not loaded for the same input in a stand-alone file')
+      failed += 1
+    elif logging.getLogger('TEAL').level != main.logLevel(0):
+      print('ERROR: verbosity of the input not applied when loading the snapshot')
+      failed += 1
+    # changed input
+    root = loadRoot('Cash_Flow_input_NPV.xml')
+    root.find('Economics/Global/DiscountRate').text = '0.2'
+    if Snapshot.readFromXml(root, path)[2] is not None:
+      print('ERROR: snapshot used for a changed input')
+      failed += 1
+    # unreadable snapshot
+    with open(path, 'wb') as f:
+      f.write(b'not a snapshot')
+    if Snapshot.readFromXml(loadRoot('Cash_Flow_input_NPV.xml'), path)[2] is not None:
+      print('ERROR: unreadable snapshot used')
+      failed += 1
+  if failed:
+    sys.exit(1)
+  print('Success!')
+  sys.exit(0)
+
+#  <TestInfo>
+#    <name>CashFlow_test_snapshot</name>
+#    <description>
+#      This input tests the snapshots of the TEAL economics model, used instead of the XML input while it doesn't change.
+#    </description>
+#    <classesTested>TEAL.Snapshot</classesTested>
+#  </TestInfo>